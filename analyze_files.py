@@ -9,10 +9,17 @@
 import os
 import sys
 import time
-import hashlib
+import tempfile
 from datetime import datetime
 from pathlib import Path
 
+from model.hash_engine import HashEngine, HASH_ERROR, available_algorithms
+from model.scan_cache import ScanCache
+from model.fs_walker import walk_files, WalkState
+from model.scan_checkpoint import ScanCheckpoint
+from model.catalog import FileCatalog
+from utils.helpers import ColumnWidthTracker, match_file_mode
+
 try:
     import openpyxl
     from openpyxl import Workbook, load_workbook
@@ -29,15 +36,32 @@ class FileAnalyzer:
         self.start_time = None
         self.max_seconds = 30
         self.in_transaction = True
-        self.results = []
+        self.results = FileCatalog('.')
         self.total_size_bytes = 0
         self.file_count = 0
         self.errors = []
+        self.hash_workers = 8
+        self.hash_algorithm = "md5"
+        self.use_cache = True
+        self.timed_out = False
+        self.walk_complete = False
+        self.deleted_files = []
+        self.resume = True
+        self.resumed = False
+        self.checkpoint = None
+        self.walk_state = None
+        self.hashes_incomplete = False
+        # "Инкрементальная запись" экономит только правки ячеек в памяти:
+        # книга все равно читается и сохраняется целиком, время записи O(строк)
+        self.incremental = True
+        self.workbook = None
         
     def read_settings(self):
         """Читает настройки из Excel файла"""
         try:
+            # Книга загружается один раз: write_results запишет в нее же
             wb = load_workbook(self.excel_file)
+            self.workbook = wb
             ws = wb["Настройки"]
             
             # Проходим по строкам листа Настройки
@@ -57,39 +81,48 @@ class FileAnalyzer:
                         self.max_seconds = 30
                 elif param == "В транзакции":
                     self.in_transaction = value.upper() == "ДА" if value else True
+                elif param == "Потоков хеширования":
+                    try:
+                        self.hash_workers = max(1, int(value)) if value else 8
+                    except ValueError:
+                        self.hash_workers = 8
+                elif param == "Алгоритм хеша":
+                    algorithm = value.lower() if value else "md5"
+                    if algorithm in available_algorithms():
+                        self.hash_algorithm = algorithm
+                    else:
+                        print(f"Алгоритм '{value}' недоступен, использую md5")
+                        self.hash_algorithm = "md5"
+                elif param == "Использовать кэш":
+                    self.use_cache = value.upper() == "ДА" if value else True
+                elif param == "Продолжать обход":
+                    self.resume = value.upper() == "ДА" if value else True
+                elif param == "Инкрементальная запись":
+                    self.incremental = value.upper() == "ДА" if value else True
             
-            wb.close()
-            print(f"Настройки загружены: Отсечка={self.max_seconds}с, Транзакция={'ДА' if self.in_transaction else 'НЕТ'}")
+            print(f"Настройки загружены: Отсечка={self.max_seconds}с, Транзакция={'ДА' if self.in_transaction else 'НЕТ'}, "
+                  f"Хеш={self.hash_algorithm}")
             
         except Exception as e:
             print(f"Ошибка при чтении настроек: {e}")
             print("Использую настройки по умолчанию")
     
-    def calculate_md5(self, filepath):
-        """Вычисляет MD5 хеш файла"""
-        try:
-            hash_md5 = hashlib.md5()
-            with open(filepath, "rb") as f:
-                # Читаем файл блоками для больших файлов
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except Exception as e:
-            self.errors.append(f"Ошибка MD5 для {filepath}: {str(e)}")
-            return "ОШИБКА"
+    def calculate_hash(self, filepath):
+        """Вычисляет хеш файла алгоритмом из настроек"""
+        return HashEngine(self.hash_algorithm, errors=self.errors).hash_one(filepath)
     
-    def analyze_file(self, filepath, rel_path):
-        """Анализирует один файл и возвращает данные"""
+    def analyze_file(self, filepath, rel_path, stat=None):
+        """
+        Анализирует один файл и возвращает данные.
+        Хеш не вычисляется - его заполняет scan_directory через пул потоков.
+        stat можно передать из обхода, чтобы не вызывать os.stat повторно.
+        """
         try:
-            stat = os.stat(filepath)
-            
-            # Получаем дату создания (в зависимости от ОС)
-            try:
-                created_timestamp = os.path.getctime(filepath)
-            except:
-                created_timestamp = stat.st_ctime
+            if stat is None:
+                stat = os.stat(filepath)
             
-            created_date = datetime.fromtimestamp(created_timestamp)
+            # Дата создания (в зависимости от ОС)
+            created_date = datetime.fromtimestamp(stat.st_ctime)
             
             # Имя и расширение
             filename = os.path.basename(filepath)
@@ -99,9 +132,6 @@ class FileAnalyzer:
             size_bytes = stat.st_size
             size_mb = round(size_bytes / (1024 * 1024), 2)
             
-            # MD5 хеш
-            md5_hash = self.calculate_md5(filepath)
-            
             # Форматируем дату
             formatted_date = created_date.strftime("%d.%m.%Y %H:%M")
             
@@ -111,8 +141,10 @@ class FileAnalyzer:
                 'created_date': formatted_date,
                 'size_mb': size_mb,
                 'extension': extension.lower(),
-                'hash_md5': md5_hash,
-                'size_bytes': size_bytes
+                'hash': '',
+                'size_bytes': size_bytes,
+                'mtime_ns': stat.st_mtime_ns,
+                'inode': stat.st_ino
             }
             
         except Exception as e:
@@ -124,64 +156,136 @@ class FileAnalyzer:
         print(f"Начинаю анализ текущей папки: {os.getcwd()}")
         self.start_time = time.time()
         
+        # Обход и хеширование идут конвейером: пока пул считает хеши,
+        # обход продолжает собирать метаданные следующих файлов
+        pending = {}
+        engine = HashEngine(self.hash_algorithm, workers=self.hash_workers, errors=self.errors)
+        cache = ScanCache() if self.use_cache else None
+        self.timed_out = False
+        self.walk_complete = False
+        self.hashes_incomplete = False
+        self._load_checkpoint()
+        
         try:
-            # Получаем все файлы в текущей папке и подпапках
-            for root, dirs, files in os.walk('.'):
-                # Игнорируем скрытые папки (начинающиеся с .)
-                dirs[:] = [d for d in dirs if not d.startswith('.')]
-                
-                for filename in files:
-                    # Проверяем время
-                    if time.time() - self.start_time > self.max_seconds:
-                        print(f"Достигнут лимит времени ({self.max_seconds}с)")
-                        return
-                    
-                    # Игнорируем скрытые файлы и сам Excel файл
-                    if filename.startswith('.') or filename == self.excel_file:
-                        continue
-                    
-                    full_path = os.path.join(root, filename)
-                    
-                    # Пропускаем папки и специальные файлы
-                    if not os.path.isfile(full_path):
-                        continue
-                    
-                    # Относительный путь
-                    rel_path = os.path.relpath(full_path, '.')
-                    
-                    # Анализируем файл
-                    file_data = self.analyze_file(full_path, rel_path)
-                    
-                    if file_data:
-                        self.results.append(file_data)
-                        self.total_size_bytes += file_data['size_bytes']
-                        self.file_count += 1
-                        
-                        # Выводим прогресс каждые 50 файлов
-                        if self.file_count % 50 == 0:
-                            print(f"Проанализировано файлов: {self.file_count}")
+            results = self.results
+            for full_path, file_hash in engine.hash_files(self._walk_files(pending, cache)):
+                index = pending.pop(full_path)
+                results.hashes[index] = file_hash
+                if cache and file_hash != HASH_ERROR:
+                    cache.store(os.path.abspath(full_path), results.sizes[index],
+                                results.mtimes_ns[index], results.inodes[index],
+                                file_hash=file_hash, algorithm=self.hash_algorithm)
+            
+            self.walk_complete = not self.timed_out
+            
+            # Удаленные файлы можно определить только после полного обхода за один запуск
+            if cache and self.walk_complete and not self.resumed:
+                self.deleted_files = cache.finish_run(os.path.abspath('.'))
         
         except KeyboardInterrupt:
             print("\nАнализ прерван пользователем")
+            # Обход уже отметил эти файлы обработанными, а хеши не посчитаны
+            self.hashes_incomplete = bool(pending)
         except Exception as e:
             self.errors.append(f"Ошибка сканирования: {str(e)}")
+        finally:
+            if cache:
+                cache.close()
+    
+    def _load_checkpoint(self):
+        """
+        Если прошлый запуск остановился по лимиту времени - продолжаем
+        обход с сохраненной позиции, а счетчики - с сохраненных значений
+        """
+        self.resumed = False
+        self.checkpoint = ScanCheckpoint('.', scope="analyze_files") if self.resume else None
+        self.walk_state = None
+        if not self.checkpoint:
+            return
+        
+        self.walk_state, saved = self.checkpoint.load()
+        if self.walk_state:
+            self.resumed = True
+            self.file_count = saved.get('file_count', 0)
+            self.total_size_bytes = saved.get('total_size_bytes', 0)
+            print(f"Продолжаю обход с места остановки (уже обработано файлов: {self.file_count})")
+        else:
+            self.walk_state = WalkState()
+    
+    def save_checkpoint(self):
+        """
+        Сохраняет позицию обхода, если он не завершен (лимит времени,
+        прерывание), или удаляет ее, если завершен. Вызывается после записи
+        результатов, чтобы файлы текущего запуска не потерялись при ошибке записи.
+        Если прерывание оборвало хеширование, позиция не меняется: иначе
+        продолженный обход пропустил бы файлы, оставшиеся без хеша.
+        """
+        if not self.checkpoint:
+            return
+        if self.hashes_incomplete:
+            print("Хеширование прервано - позиция обхода не сохранена")
+            return
+        if not self.walk_state.finished:
+            self.checkpoint.save(self.walk_state, {
+                'file_count': self.file_count,
+                'total_size_bytes': self.total_size_bytes
+            })
+            print("Позиция обхода сохранена, следующий запуск продолжит с нее")
+        else:
+            self.checkpoint.clear()
+    
+    def _walk_files(self, pending, cache=None):
+        """
+        Обходит текущую директорию, добавляет файлы в каталог результатов
+        и отдает пути для хеширования (pending: путь -> номер в каталоге).
+        Файлы, не изменившиеся с прошлого запуска, берут хеш из кэша.
+        """
+        # Получаем все файлы в текущей папке и подпапках,
+        # скрытые файлы и папки и сам Excel файл пропускаются
+        for index, entry in enumerate(walk_files('.', skip_names={self.excel_file},
+                                                 errors=self.errors, state=self.walk_state)):
+            # Проверяем время (хотя бы один файл за запуск - иначе продолженный
+            # обход с маленьким лимитом не сдвинется с места)
+            if index and time.time() - self.start_time > self.max_seconds:
+                print(f"Достигнут лимит времени ({self.max_seconds}с)")
+                self.timed_out = True
+                return
+            
+            full_path = entry.path
+            stat = entry.stat
+            
+            # Метаданные файла - в колонки каталога
+            index = self.results.add(entry.rel_path, stat)
+            self.total_size_bytes += stat.st_size
+            self.file_count += 1
+            
+            cached = cache.lookup(os.path.abspath(full_path), stat.st_size,
+                                  stat.st_mtime_ns, stat.st_ino,
+                                  self.hash_algorithm) if cache else None
+            if cached and cached['hash']:
+                self.results.hashes[index] = cached['hash']
+            else:
+                pending[full_path] = index
+                yield full_path
+            
+            # Выводим прогресс каждые 50 файлов
+            if self.file_count % 50 == 0:
+                print(f"Проанализировано файлов: {self.file_count}")
     
     def write_results(self):
-        """Записывает результаты в Excel файл"""
+        """
+        Записывает результаты в Excel файл.
+        В транзакции книга сохраняется во временный файл рядом и атомарно
+        заменяет исходный: при ошибке записи исходный файл не меняется.
+        """
         try:
-            # Создаем резервную копию если в транзакции
-            backup_file = None
-            if self.in_transaction:
-                backup_file = f"{self.excel_file}.backup"
-                import shutil
-                shutil.copy2(self.excel_file, backup_file)
-                print(f"Создана резервная копия: {backup_file}")
-            
-            # Загружаем или создаем workbook
-            try:
-                wb = load_workbook(self.excel_file)
-            except:
-                wb = Workbook()
+            # Книга уже загружена в read_settings
+            wb = self.workbook
+            if wb is None:
+                try:
+                    wb = load_workbook(self.excel_file)
+                except Exception:
+                    wb = Workbook()
             
             # --- Сводная страница ---
             if "Сводная" not in wb.sheetnames:
@@ -214,7 +318,8 @@ class FileAnalyzer:
                     ws_summary.cell(row=i, column=2, value=summary_data[param_cell.value])
             
             # --- Страница файлов ---
-            if "Файлы" not in wb.sheetnames:
+            new_sheet = "Файлы" not in wb.sheetnames
+            if new_sheet:
                 ws_files = wb.create_sheet("Файлы")
                 # Удаляем дефолтный лист если он есть
                 if "Sheet" in wb.sheetnames:
@@ -222,65 +327,153 @@ class FileAnalyzer:
             else:
                 ws_files = wb["Файлы"]
             
-            # Очищаем старые данные (кроме заголовка)
-            ws_files.delete_rows(2, ws_files.max_row)
+            # Заголовки (колонка хеша подписывается выбранным алгоритмом)
+            headers = ["Имя файла", "Путь к файлу", "Дата создания", "Размер МБ", "Расширение",
+                       f"Хеш ({self.hash_algorithm.upper()})"]
+            for col, header in enumerate(headers, 1):
+                ws_files.cell(row=1, column=col, value=header)
             
-            # Заголовки
-            headers = ["Имя файла", "Путь к файлу", "Дата создания", "Размер МБ", "Расширение", "Хеш (MD5)"]
-            if ws_files.max_row == 0:
-                ws_files.append(headers)
+            # Ширина колонок считается по ходу записи, а не повторным проходом по листу
+            widths = ColumnWidthTracker(len(headers))
+            widths.update(headers)
             
-            # Записываем данные файлов
-            for file_data in self.results:
-                ws_files.append([
-                    file_data['filename'],
-                    file_data['path'],
-                    file_data['created_date'],
-                    file_data['size_mb'],
-                    file_data['extension'],
-                    file_data['hash_md5']
-                ])
+            if self.incremental and not new_sheet:
+                self._update_rows(ws_files, widths)
+            else:
+                self._rewrite_rows(ws_files, widths)
             
             # Автонастройка ширины колонок
-            for column in ws_files.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws_files.column_dimensions[column_letter].width = adjusted_width
+            for col, width in enumerate(widths.widths(), 1):
+                ws_files.column_dimensions[get_column_letter(col)].width = width
             
             # Сохраняем файл
-            wb.save(self.excel_file)
+            self._save_workbook(wb)
             wb.close()
+            self.workbook = None
             
             print(f"Результаты сохранены в {self.excel_file}")
-            
-            # Удаляем резервную копию если всё успешно
-            if backup_file and os.path.exists(backup_file):
-                os.remove(backup_file)
-                print("Резервная копия удалена (успешное завершение)")
-            
             return True
             
         except Exception as e:
             print(f"Ошибка при записи результатов: {e}")
-            
-            # Восстанавливаем из резервной копии если в транзакции
-            if self.in_transaction and backup_file and os.path.exists(backup_file):
-                try:
-                    import shutil
-                    shutil.copy2(backup_file, self.excel_file)
-                    print("Выполнен откат к резервной копии (транзакция)")
-                except Exception as restore_error:
-                    print(f"Ошибка при восстановлении из резервной копии: {restore_error}")
-            
+            if self.in_transaction:
+                print("Исходный файл не изменен (транзакция)")
             return False
     
+    def _result_rows(self):
+        """Строки листа "Файлы" из каталога результатов"""
+        results = self.results
+        for index in range(len(results)):
+            yield [
+                results.names[index],
+                results.relative_path(index),
+                datetime.fromtimestamp(results.ctimes[index]).strftime("%d.%m.%Y %H:%M"),
+                round(results.sizes[index] / (1024 * 1024), 2),
+                results.extensions[results.ext_ids[index]],
+                results.hashes[index] or ''
+            ]
+    
+    def _rewrite_rows(self, ws_files, widths):
+        """Полная перезапись листа "Файлы" результатами"""
+        # Продолженный обход дописывает строки к записанным прошлым запуском
+        if not self.resumed:
+            ws_files.delete_rows(2, ws_files.max_row)
+        
+        for row in self._result_rows():
+            ws_files.append(row)
+            widths.update(row)
+    
+    def _update_rows(self, ws_files, widths):
+        """
+        Инкрементальная запись: строки прошлого запуска сопоставляются
+        с результатами по пути файла, меняются только отличающиеся ячейки,
+        новые файлы дописываются в конец. Строки файлов, которых больше нет,
+        удаляются только после полного обхода за один запуск.
+        Это обновление листа в памяти, а не файла на диске: книга загружается
+        и сохраняется целиком (_save_workbook), так что запись остается O(строк).
+        Выигрыш - сохраненные форматирование и правки пользователя в строках,
+        а не время ввода-вывода.
+        """
+        ncols = len(widths.widths())
+        
+        # Путь -> номер строки; повторы путей - лишние строки
+        existing = {}
+        stale = []
+        for row_idx, row in enumerate(ws_files.iter_rows(min_row=2, max_col=ncols,
+                                                         values_only=True), start=2):
+            path = row[1]
+            if path is None or path in existing:
+                stale.append(row_idx)
+                continue
+            existing[path] = (row_idx, row)
+        
+        updated = added = 0
+        for row in self._result_rows():
+            widths.update(row)
+            found = existing.pop(row[1], None)
+            if found is None:
+                ws_files.append(row)
+                added += 1
+                continue
+            
+            row_idx, old_row = found
+            changed = False
+            for col, (old, new) in enumerate(zip(old_row, row), 1):
+                if old != new:
+                    ws_files.cell(row=row_idx, column=col, value=new)
+                    changed = True
+            updated += changed
+        
+        # Файлы, не встретившиеся при полном обходе, удалены с диска
+        if self.walk_complete and not self.resumed:
+            stale.extend(row_idx for row_idx, _ in existing.values())
+        else:
+            for _, old_row in existing.values():
+                widths.update(old_row)
+        
+        removed = self._remove_rows(ws_files, stale, ncols)
+        print(f"Строк в листе \"Файлы\": обновлено {updated}, добавлено {added}, удалено {removed}")
+    
+    def _remove_rows(self, ws, rows, ncols):
+        """
+        Удаляет строки листа: строки ниже первой удаляемой сдвигаются вверх
+        одним проходом, вместо delete_rows на каждую строку
+        """
+        if not rows:
+            return 0
+        remove = set(rows)
+        target = min(remove)
+        for row_idx in range(target, ws.max_row + 1):
+            if row_idx in remove:
+                continue
+            if row_idx != target:
+                for col in range(1, ncols + 1):
+                    ws.cell(row=target, column=col, value=ws.cell(row=row_idx, column=col).value)
+            target += 1
+        ws.delete_rows(target, ws.max_row - target + 1)
+        return len(remove)
+    
+    def _save_workbook(self, wb):
+        """
+        Сохраняет книгу. В транзакции - во временный файл в той же папке
+        и атомарная замена (os.replace), без резервной копии исходного
+        """
+        if not self.in_transaction:
+            wb.save(self.excel_file)
+            return
+        
+        directory = os.path.dirname(os.path.abspath(self.excel_file))
+        # Имя с точкой: обход пропускает скрытые файлы, даже если временный остался
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{self.excel_file}.", suffix=".part", dir=directory)
+        os.close(fd)
+        try:
+            wb.save(tmp_path)
+            match_file_mode(tmp_path, self.excel_file)
+            os.replace(tmp_path, self.excel_file)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    
     def run(self):
         """Основной метод запуска анализа"""
         print("=" * 50)
@@ -305,6 +498,8 @@ class FileAnalyzer:
         print(f"  Файлов проанализировано: {self.file_count}")
         print(f"  Общий размер: {round(self.total_size_bytes / (1024 * 1024), 2)} МБ")
         print(f"  Ошибок: {len(self.errors)}")
+        if self.deleted_files:
+            print(f"  Удалено с прошлого запуска: {len(self.deleted_files)}")
         
         if self.errors:
             print("\nОшибки во время анализа:")
@@ -316,6 +511,7 @@ class FileAnalyzer:
         # Записываем результаты
         print("\nСохраняю результаты в Excel...")
         if self.write_results():
+            self.save_checkpoint()
             print("\n✓ Готово!")
             return True
         else:
@@ -323,26 +519,45 @@ class FileAnalyzer:
             return False
 
 
+def wait_for_exit(no_wait):
+    """
+    Ждет Enter перед закрытием окна (если запущено двойным кликом).
+    Без терминала (планировщик, cron, перенаправленный ввод) и с --no-wait не ждет.
+    """
+    if no_wait or not sys.stdin or not sys.stdin.isatty():
+        return
+    try:
+        input("\nНажмите Enter для выхода...")
+    except EOFError:
+        pass
+
+
 def main():
-    """Точка входа"""
+    """Точка входа; код возврата 0 - успех, 1 - ошибки, 130 - прервано"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Анализ файлов текущей папки в КаталогФайлов.xlsx")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="Do not wait for Enter before exit (for scheduled runs)")
+    args = parser.parse_args()
+    
     analyzer = FileAnalyzer()
     
     try:
         success = analyzer.run()
-        if success:
-            # Ждем немного перед закрытием (если запущено двойным кликом)
-            input("\nНажмите Enter для выхода...")
-        else:
-            input("\nНажмите Enter для выхода...")
+        wait_for_exit(args.no_wait)
+        return 0 if success else 1
             
     except KeyboardInterrupt:
         print("\n\nПрограмма прервана пользователем")
+        return 130
     except Exception as e:
         print(f"\nКритическая ошибка: {e}")
         import traceback
         traceback.print_exc()
-        input("\nНажмите Enter для выхода...")
+        wait_for_exit(args.no_wait)
+        return 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Бенчмарк асинхронного обхода на "медленной" файловой системе
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_async_scan [--files 5000] [--latency 0.002]
+                                          [--concurrency 1 16 128]
+
+Каждый листинг папки и каждый stat задерживается на latency секунд
+(DelayedFS), как на сетевом диске. concurrency=1 - последовательный
+обход с той же задержкой. Набор записей обязан совпасть с FileScanner.
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+from benchmarks.tree_generator import make_tree
+from model.file_scanner import FileScanner
+from model.async_scanner import AsyncFileScanner, DelayedFS
+
+
+def snapshot(records):
+    """Записи без учета порядка"""
+    return sorted((r['relative_path'], r['size_bytes'], r['mtime_ns']) for r in records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async scan benchmark")
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 128])
+    parser.add_argument("--root", default=None, help="existing tree (default: temporary)")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="bench_async_")
+    try:
+        if not args.root:
+            dirs = make_tree(root, files=args.files, fanout=5, files_per_dir=50)
+            print(f"Tree: {args.files:,} files in {dirs:,} dirs, latency {args.latency * 1000:.1f} ms")
+
+        expected = snapshot(FileScanner().iter_directory(root, max_seconds=3600))
+
+        baseline = None
+        for concurrency in args.concurrency:
+            scanner = FileScanner()
+            async_scanner = AsyncFileScanner(scanner, concurrency, DelayedFS(args.latency))
+            start = time.perf_counter()
+            records = list(async_scanner.iter_directory(root, max_seconds=3600))
+            elapsed = time.perf_counter() - start
+
+            assert not scanner.errors, scanner.errors[:5]
+            assert snapshot(records) == expected, f"records differ at concurrency={concurrency}"
+            baseline = baseline or elapsed
+            print(f"concurrency={concurrency:<4} {elapsed:7.2f} s  "
+                  f"{len(records) / elapsed:>9,.0f} files/s  x{baseline / elapsed:.1f}")
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print("Records are identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Бенчмарк памяти: список словарей FileScanner против колоночного FileCatalog
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_catalog [--files 1000000]
+
+Файлы не создаются: записи строятся из синтетических stat_result,
+память считается через tracemalloc (байт на файл).
+"""
+
+import os
+import gc
+import time
+import random
+import argparse
+import tracemalloc
+
+from model.catalog import FileCatalog
+from model.file_scanner import FileScanner
+
+EXTENSIONS = ['.pdf', '.docx', '.xlsx', '.jpg', '.png', '.txt', '.py', '.zip', '.dat', '']
+
+
+def synthetic_entries(count, seed=7):
+    """(относительный путь, stat) в духе реального дерева: 100 файлов на папку"""
+    rng = random.Random(seed)
+    now = time.time()
+    for i in range(count):
+        rel_dir = os.path.join(f"dir_{i // 10_000:03d}", f"sub_{i // 100 % 100:02d}")
+        name = f"file_{i:07d}{rng.choice(EXTENSIONS)}"
+        mtime = now - rng.randint(0, 10 ** 8)
+        stat = os.stat_result((0o100644, 10_000 + i, 0, 1, 0, 0, rng.randint(0, 10 ** 9),
+                               int(mtime), int(mtime), int(mtime),
+                               mtime, mtime, mtime,
+                               int(mtime * 1e9), int(mtime * 1e9), int(mtime * 1e9)))
+        yield os.path.join(rel_dir, name), stat
+
+
+def measure(build):
+    """Память (байт), занятая результатом build(), и время построения"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog memory benchmark")
+    parser.add_argument("--files", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    root = "/data/share"
+    entries = list(synthetic_entries(args.files))
+    scanner = FileScanner()
+
+    def build_dicts():
+        return [scanner._analyze_file(os.path.join(root, rel_path), root, rel_path, stat)
+                for rel_path, stat in entries]
+
+    def build_catalog():
+        catalog = FileCatalog(root)
+        for rel_path, stat in entries:
+            catalog.add(rel_path, stat)
+        return catalog
+
+    print(f"Files: {args.files:,}")
+    results = {}
+    for name, build in (("list of dicts", build_dicts), ("FileCatalog", build_catalog)):
+        results[name], used, elapsed = measure(build)
+        print(f"{name:<14} {used / args.files:8.1f} bytes/file  "
+              f"{used / 2 ** 20:8.1f} MB  build {elapsed:6.2f} s")
+
+    # Каталог отдает те же записи, что и сканер
+    dicts, catalog = results["list of dicts"], results["FileCatalog"]
+    for index in range(0, args.files, max(1, args.files // 1000)):
+        record = catalog[index]
+        assert {key: record[key] for key in dicts[index]} == dicts[index], \
+            f"record {index} differs"
+    print("Records are identical")
+
+
+if __name__ == "__main__":
+    main()
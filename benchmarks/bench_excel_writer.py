@@ -0,0 +1,68 @@
+"""
+Бенчмарк ExcelWriter: время add_file_data + save в зависимости от числа строк
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_excel_writer [--rows 10000 25000 50000 100000]
+
+Время на строку должно оставаться примерно постоянным (линейный рост).
+"""
+
+import os
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+from model.excel_writer import ExcelWriter
+
+
+def make_row(i):
+    return {
+        'filename': f"document_{i:07d}.pdf",
+        'path': os.path.join("projects", f"dir_{i % 100:03d}", f"document_{i:07d}.pdf"),
+        'size_kb': round(i * 1.37 % 10_000, 2),
+        'extension': '.pdf',
+        'created': datetime(2024, 1, 1),
+        'modified': datetime(2024, 6, 1),
+        'tags': ['проект_разное', 'расширение.pdf'],
+        'category': 'документ',
+        'duplicate_group': '',
+    }
+
+
+def run(rows, write_only, target_dir):
+    writer = ExcelWriter(write_only=write_only)
+
+    start = time.perf_counter()
+    for i in range(rows):
+        writer.add_file_data(make_row(i))
+    add_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    path = writer.save(target_dir, f"bench_{rows}")
+    save_time = time.perf_counter() - start
+
+    os.remove(path)
+    return add_time, save_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ExcelWriter benchmark")
+    parser.add_argument("--rows", type=int, nargs="+",
+                        default=[10_000, 25_000, 50_000, 100_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, "target")
+        for write_only in (False, True):
+            mode = "write_only" if write_only else "normal"
+            print(f"\nMode: {mode}")
+            print(f"{'rows':>10} {'add, s':>10} {'save, s':>10} {'us/row':>10}")
+            for rows in args.rows:
+                add_time, save_time = run(rows, write_only, target)
+                per_row = (add_time + save_time) / rows * 1e6
+                print(f"{rows:>10} {add_time:>10.2f} {save_time:>10.2f} {per_row:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
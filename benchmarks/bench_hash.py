@@ -0,0 +1,61 @@
+"""
+Бенчмарк алгоритмов хеширования: МБ/с для каждого алгоритма и размера блока
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_hash [--size-mb 256] [--repeat 3]
+
+Файл лежит в кэше ОС, поэтому измеряется скорость хеширования, а не диска.
+Звездочкой отмечен размер блока, выбранный в HASH_ALGORITHMS.
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+from model.hash_engine import available_algorithms, chunk_size_for, hash_file
+
+CHUNK_SIZES = [4 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024]
+
+
+def measure(path, algorithm, chunk_size, repeat):
+    """Лучшее время из repeat запусков"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hash_file(path, algorithm, chunk_size)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash algorithms benchmark")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        for _ in range(args.size_mb):
+            f.write(os.urandom(1024 * 1024))
+        path = f.name
+
+    try:
+        # Прогрев кэша ОС
+        hash_file(path, "md5")
+
+        header = "".join(f"{size // 1024:>9}K" for size in CHUNK_SIZES)
+        print(f"File: {args.size_mb} MB, MB/s by read chunk size")
+        print(f"{'algorithm':<10}{header}")
+        for algorithm in available_algorithms():
+            cells = []
+            for chunk_size in CHUNK_SIZES:
+                elapsed = measure(path, algorithm, chunk_size, args.repeat)
+                mark = "*" if chunk_size == chunk_size_for(algorithm) else " "
+                cells.append(f"{args.size_mb / elapsed:>9.0f}{mark}")
+            print(f"{algorithm:<10}{''.join(cells)}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
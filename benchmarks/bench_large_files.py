@@ -0,0 +1,70 @@
+"""
+Бенчмарк хеширования больших файлов: read() блоками против readinto и mmap
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_large_files [--sizes-mb 10 100 1024] [--algorithm sha1]
+
+Для 10 ГБ добавьте 10240 в --sizes-mb (нужно столько же свободного места).
+Файлы лежат в кэше ОС, если помещаются в память, поэтому в основном
+измеряются накладные расходы Python на каждый блок.
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+from model.hash_engine import hash_file
+
+
+def make_file(directory, size_mb):
+    path = os.path.join(directory, f"large_{size_mb}mb.bin")
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+    return path
+
+
+def legacy_hash(path, algorithm):
+    """Исходный вариант: блоки по 4 КБ"""
+    return hash_file(path, algorithm, chunk_size=4096, large_file_threshold=float("inf"))
+
+
+MODES = {
+    "read 4K (old)": legacy_hash,
+    "read chunk": lambda p, a: hash_file(p, a, large_file_threshold=float("inf")),
+    "readinto": lambda p, a: hash_file(p, a, large_file_threshold=0),
+    "mmap": lambda p, a: hash_file(p, a, large_file_threshold=0, use_mmap=True),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Large file hashing benchmark")
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[10, 100, 1024])
+    parser.add_argument("--algorithm", default="sha1")
+    parser.add_argument("--dir", default=tempfile.gettempdir(),
+                        help="Where to create the test files")
+    args = parser.parse_args()
+
+    print(f"Algorithm: {args.algorithm}, MB/s")
+    print(f"{'size':>8}" + "".join(f"{mode:>16}" for mode in MODES))
+
+    for size_mb in args.sizes_mb:
+        path = make_file(args.dir, size_mb)
+        try:
+            hash_file(path, args.algorithm)  # прогрев кэша ОС
+            digests = set()
+            cells = []
+            for func in MODES.values():
+                start = time.perf_counter()
+                digests.add(func(path, args.algorithm))
+                cells.append(f"{size_mb / (time.perf_counter() - start):>16.0f}")
+            assert len(digests) == 1, "modes produced different hashes"
+            print(f"{size_mb:>6}MB" + "".join(cells))
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
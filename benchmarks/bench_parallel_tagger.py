@@ -0,0 +1,84 @@
+"""
+Бенчмарк SmartTagEngine.analyze_batch: один процесс против пула процессов
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_parallel_tagger [--files 200000] [--workers 1 2 4 8]
+    python -m benchmarks.bench_parallel_tagger --check   # только проверка совпадения
+
+Корпус тот же, что в bench_tagger. Теги и статистика каждого
+параллельного прогона обязаны совпасть с последовательным. Перед замерами
+то же проверяется на маленьком корпусе с пониженным PARALLEL_MIN_FILES -
+быстро и с пулом на каждом размере пачки.
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+from model.tag_engine import SmartTagEngine
+from benchmarks.bench_tagger import build_corpus
+
+
+def run(corpus, workers, history_db, parallel_min_files=None):
+    """
+    Размечает корпус, возвращает (время, теги файлов, статистика)
+    parallel_min_files: порог пула вместо SmartTagEngine.PARALLEL_MIN_FILES
+    """
+    engine = SmartTagEngine(history_db=history_db, history_file="")
+    if parallel_min_files is not None:
+        engine.PARALLEL_MIN_FILES = parallel_min_files
+    files = [{'filename': name, 'relative_path': path} for name, path in corpus]
+    start = time.perf_counter()
+    result, stats = engine.analyze_batch(files, workers=workers)
+    elapsed = time.perf_counter() - start
+    engine.history.close()
+    return elapsed, [f['tags'] for f in result], stats
+
+
+def check_equivalence(sizes=(20, 101, 500), workers=2):
+    """Пул и один процесс дают одинаковые теги и статистику на маленьких корпусах"""
+    with tempfile.TemporaryDirectory() as tmp:
+        history_db = os.path.join(tmp, "history.sqlite")
+        for size in sizes:
+            corpus = build_corpus(size, seed=size)
+            _, expected_tags, expected_stats = run(corpus, 1, history_db)
+            _, tags, stats = run(corpus, workers, history_db, parallel_min_files=1)
+            assert tags == expected_tags, f"tags differ on {len(corpus)} files"
+            assert stats == expected_stats, f"stats differ on {len(corpus)} files"
+    print(f"Serial and parallel outputs match on {', '.join(map(str, sizes))} files")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel tagging benchmark")
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--check", action="store_true",
+                        help="only check serial/parallel equivalence on small inputs")
+    args = parser.parse_args()
+
+    check_equivalence()
+    if args.check:
+        return
+
+    corpus = build_corpus(args.files)
+    print(f"Files: {len(corpus):,}  CPU: {os.cpu_count()}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history_db = os.path.join(tmp, "history.sqlite")
+        baseline, expected_tags, expected_stats = run(corpus, 1, history_db)
+        print(f"workers={1:<3} {baseline:7.2f} s  {len(corpus) / baseline:>10,.0f} files/s")
+
+        for workers in sorted(set(args.workers) - {1}):
+            elapsed, tags, stats = run(corpus, workers, history_db)
+            assert tags == expected_tags, f"tags differ with workers={workers}"
+            assert stats == expected_stats, f"stats differ with workers={workers}"
+            print(f"workers={workers:<3} {elapsed:7.2f} s  {len(corpus) / elapsed:>10,.0f} files/s  "
+                  f"x{baseline / elapsed:.2f}")
+
+    print("Outputs are identical")
+
+
+if __name__ == "__main__":
+    main()
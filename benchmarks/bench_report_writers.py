@@ -0,0 +1,50 @@
+"""
+Бенчмарк форматов отчета: xlsx (write_only) против CSV, JSONL и Parquet
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_report_writers [--rows 100000] [--formats xlsx csv jsonl]
+
+Parquet участвует, если установлен pyarrow.
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+from model.report_writer import create_writer, available_formats
+from benchmarks.bench_excel_writer import make_row
+
+
+def run(fmt, rows, target_dir):
+    """Время записи rows строк и размер файла"""
+    writer = create_writer(fmt, write_only=True) if fmt == "xlsx" else create_writer(fmt)
+
+    start = time.perf_counter()
+    writer.begin(target_dir, f"bench_{fmt}")
+    for i in range(rows):
+        writer.add_file_data(make_row(i))
+    path = writer.save(target_dir, f"bench_{fmt}")
+    elapsed = time.perf_counter() - start
+
+    size = os.path.getsize(path)
+    os.remove(path)
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report writers benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--formats", nargs="+", default=available_formats())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, "target")
+        print(f"{'format':>8} {'total, s':>10} {'rows/s':>12} {'MB':>8}")
+        for fmt in args.formats:
+            elapsed, size = run(fmt, args.rows, target)
+            print(f"{fmt:>8} {elapsed:>10.2f} {args.rows / elapsed:>12,.0f} {size / 2 ** 20:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
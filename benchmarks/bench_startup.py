@@ -0,0 +1,119 @@
+"""
+Бенчмарк запуска: время импорта main.py и "пустого" сканирования
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_startup [--repeat 5] [--target-ms 200]
+
+1. python -X importtime -c "import main" - сколько стоит импорт и какие
+   модули проекта тяжелее всего (лучший из repeat запусков).
+2. Тяжелые зависимости (openpyxl, asyncio, multiprocessing, ...) не должны
+   загружаться при импорте - только на этапе, которому они нужны.
+3. main.py на пустой папке с отчетом CSV - то, что делает cron-проверка
+   "появилось ли что-то новое". Время сравнивается с --target-ms.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые должны импортироваться лениво
+HEAVY_MODULES = [
+    "openpyxl", "pyarrow", "pypdf", "asyncio", "multiprocessing",
+    "concurrent.futures.process", "cProfile", "tracemalloc", "sqlite3", "mmap",
+    "model.excel_writer", "model.async_scanner", "model.catalog_db",
+    "model.content_tagger", "model.scan_cache", "model.tag_history",
+]
+PROJECT_PREFIXES = ("model.", "controller.", "view.", "utils.", "config", "main")
+
+
+def import_times(repeat):
+    """
+    Лучший из repeat запусков: (общее время импорта main в мс,
+    {модуль проекта: накопленное время в мс})
+    """
+    best_total, best_modules = None, {}
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                              cwd=ROOT, capture_output=True, text=True)
+        modules = {}
+        for line in proc.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = line.split("|")
+            if len(parts) != 3 or not parts[1].strip().isdigit():
+                continue
+            name = parts[2].strip()
+            modules[name] = int(parts[1]) / 1000
+        total = modules.get("main")
+        if total is not None and (best_total is None or total < best_total):
+            best_total, best_modules = total, modules
+    return best_total, {name: ms for name, ms in best_modules.items()
+                        if name.startswith(PROJECT_PREFIXES)}
+
+
+def eager_heavy_modules():
+    """Тяжелые модули, загруженные уже при импорте main"""
+    code = ("import sys, main; "
+            f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    return proc.stdout.split()
+
+
+def noop_scan(repeat):
+    """Лучшее время (мс) запуска main.py на пустой папке"""
+    best = float("inf")
+    with tempfile.TemporaryDirectory() as tmp:
+        empty = os.path.join(tmp, "empty")
+        os.mkdir(empty)
+        report = os.path.join(tmp, "report.csv")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "main.py", empty, "-o", report],
+                           cwd=ROOT, capture_output=True, check=True)
+            best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def interpreter_startup(repeat):
+    """Лучшее время (мс) запуска пустого интерпретатора - нижняя граница"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=200,
+                        help="Target wall time of a no-op scan")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    total, modules = import_times(args.repeat)
+    print(f"import main: {total:.1f} ms (cumulative, -X importtime)")
+    for name, ms in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<28} {ms:8.1f} ms")
+
+    eager = eager_heavy_modules()
+    print(f"Heavy modules loaded at import: {', '.join(eager) if eager else 'none'}")
+
+    baseline = interpreter_startup(args.repeat)
+    scan = noop_scan(args.repeat)
+    status = "OK" if scan <= args.target_ms else "ABOVE TARGET"
+    print(f"python -c pass:  {baseline:8.1f} ms")
+    print(f"no-op scan:      {scan:8.1f} ms  (target {args.target_ms:.0f} ms) {status}")
+
+    if eager or scan > args.target_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Набор бенчмарков горячих путей на синтетическом дереве
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_suite [--files 20000] [--depth 4] [--fanout 8]
+        [--file-size 16384] [--sizes lognormal] [--names mixed] [--repeat 3]
+    python -m benchmarks.bench_suite --compare OLD.json NEW.json [--threshold 0.1]
+
+Этапы замеряются по отдельности: обход (FileScanner.scan_directory),
+хеширование (calculate_hashes), разметка (SmartTagEngine.analyze_batch),
+запись отчета (ExcelWriter.add_file_data и save). Для каждого этапа -
+время, пропускная способность и пиковый RSS процесса после этапа.
+Результаты пишутся в JSON (по умолчанию data/benchmarks/), два файла
+можно сравнить ключом --compare.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+from config import DATA_DIR
+from benchmarks.tree_generator import make_tree, NAME_STYLES, SIZE_DISTRIBUTIONS
+from model.file_scanner import FileScanner
+from model.tag_engine import SmartTagEngine
+from model.excel_writer import ExcelWriter
+from utils.helpers import get_category
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ["walk", "hash", "tag", "excel_add", "excel_save"]
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса в МБ (None, если ОС не сообщает)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    divisor = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+    return round(peak / divisor, 1)
+
+
+def git_revision():
+    """Текущий коммит - чтобы было видно, какую версию мерили"""
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, timeout=10)
+        return proc.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def make_row(file_info):
+    """Строка отчета, как ее строит MainController._process_file"""
+    return {
+        'filename': file_info['filename'],
+        'path': file_info['relative_path'],
+        'size_kb': round(file_info['size_bytes'] / 1024, 2),
+        'extension': file_info['extension'],
+        'created': file_info['created_date'],
+        'modified': datetime.fromtimestamp(file_info['mtime_ns'] / 1e9),
+        'tags': file_info.get('tags', []),
+        'category': get_category(file_info['extension']),
+        'duplicate_group': '',
+    }
+
+
+class Stage:
+    """Результат этапа: лучшее время из повторов и объем обработанного"""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = float("inf")
+        self.items = 0
+        self.bytes = 0
+
+    def measure(self, func, repeat):
+        """Запускает func() repeat раз, возвращает результат последнего запуска"""
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            self.seconds = min(self.seconds, time.perf_counter() - start)
+        return result
+
+    def to_dict(self):
+        seconds = self.seconds or 1e-9
+        return {
+            'seconds': round(self.seconds, 4),
+            'items': self.items,
+            'items_per_second': round(self.items / seconds, 1),
+            'mb_per_second': round(self.bytes / 2 ** 20 / seconds, 1) if self.bytes else None,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+
+def run_suite(root, repeat, workdir):
+    """Замеряет все этапы на дереве root"""
+    stages = {}
+
+    # Обход: без кэша и без сохранения позиции, лимит времени не мешает
+    scanner = FileScanner()
+    stage = Stage("walk")
+    files = stage.measure(
+        lambda: scanner.scan_directory(root, max_seconds=10 ** 9, resume=False), repeat
+    )
+    stage.items = len(files)
+    total_bytes = sum(f['size_bytes'] for f in files)
+    stages["walk"] = stage.to_dict()
+
+    stage = Stage("hash")
+    stage.measure(lambda: scanner.calculate_hashes(files), repeat)
+    stage.items, stage.bytes = len(files), total_bytes
+    stages["hash"] = stage.to_dict()
+
+    # Разметка - с отдельной базой истории, чтобы не трогать рабочую
+    engine = SmartTagEngine(history_db=os.path.join(workdir, "history.sqlite"),
+                            history_file="")
+    stage = Stage("tag")
+    stage.measure(lambda: engine.analyze_batch(files), repeat)
+    stage.items = len(files)
+    engine.history.close()
+    stages["tag"] = stage.to_dict()
+
+    rows = [make_row(f) for f in files]
+    add_stage, save_stage = Stage("excel_add"), Stage("excel_save")
+    for i in range(repeat):
+        writer = ExcelWriter(write_only=True)
+        add_stage.measure(lambda: [writer.add_file_data(row) for row in rows], 1)
+        path = save_stage.measure(lambda: writer.save(workdir, f"bench_{i}"), 1)
+        os.remove(path)
+    add_stage.items = save_stage.items = len(rows)
+    stages["excel_add"] = add_stage.to_dict()
+    stages["excel_save"] = save_stage.to_dict()
+
+    return stages, len(files), total_bytes
+
+
+def compare(old_path, new_path, threshold):
+    """Печатает изменение времени этапов; возвращает число регрессий"""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    if old.get('params') != new.get('params'):
+        print("Warning: runs used different parameters, comparison is approximate")
+    print(f"{'stage':<12} {'old, s':>10} {'new, s':>10} {'change':>9}  "
+          f"({old.get('revision')} -> {new.get('revision')})")
+
+    regressions = 0
+    for name in STAGES:
+        if name not in old['stages'] or name not in new['stages']:
+            continue
+        before = old['stages'][name]['seconds']
+        after = new['stages'][name]['seconds']
+        change = (after - before) / before if before else 0.0
+        mark = ""
+        if change > threshold:
+            mark = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<12} {before:>10.3f} {after:>10.3f} {change:>+8.1%}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite for the hot paths")
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--depth", type=int, default=4, help="Max tree depth")
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--files-per-dir", type=int, default=50)
+    parser.add_argument("--file-size", type=int, default=16 * 1024,
+                        help="File size in bytes (median for lognormal)")
+    parser.add_argument("--sizes", choices=SIZE_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--names", choices=NAME_STYLES, default="mixed")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs per stage")
+    parser.add_argument("--root", help="Existing tree to measure instead of generating one")
+    parser.add_argument("--output", help="Results JSON (default: data/benchmarks/...)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="Compare two results files and exit")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Slowdown treated as a regression in --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    params = {key: getattr(args, key) for key in
+              ("files", "depth", "fanout", "files_per_dir", "file_size", "sizes", "names", "seed")}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        root = args.root
+        generate_seconds = None
+        if not root:
+            root = os.path.join(workdir, "tree")
+            print(f"Creating {args.files} files in {root}...")
+            start = time.perf_counter()
+            make_tree(root, files=args.files, fanout=args.fanout,
+                      files_per_dir=args.files_per_dir, file_size=args.file_size,
+                      seed=args.seed, max_depth=args.depth,
+                      size_distribution=args.sizes, names=args.names)
+            generate_seconds = round(time.perf_counter() - start, 2)
+        else:
+            params = {'root': os.path.abspath(root)}
+
+        stages, files, total_bytes = run_suite(root, args.repeat, workdir)
+
+    result = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': params,
+        'repeat': args.repeat,
+        'files': files,
+        'total_mb': round(total_bytes / 2 ** 20, 1),
+        'generate_seconds': generate_seconds,
+        'stages': stages,
+    }
+
+    print(f"Files: {files:,}  Total: {result['total_mb']} MB")
+    print(f"{'stage':<12} {'seconds':>9} {'items/s':>12} {'MB/s':>8} {'peak RSS, MB':>13}")
+    for name in STAGES:
+        stage = stages[name]
+        mb_per_second = f"{stage['mb_per_second']:.1f}" if stage['mb_per_second'] else "-"
+        print(f"{name:<12} {stage['seconds']:>9.3f} {stage['items_per_second']:>12,.0f} "
+              f"{mb_per_second:>8} {stage['peak_rss_mb'] or '-':>13}")
+
+    output = args.output
+    if not output:
+        directory = DATA_DIR / "benchmarks"
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = directory / f"suite_{stamp}_{result['revision'] or 'norev'}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
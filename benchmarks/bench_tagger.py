@@ -0,0 +1,127 @@
+"""
+Микробенчмарк токенизатора тегов: теги в секунду на корпусе имен файлов
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_tagger [--files 50000]
+
+Корпус - смесь кириллических и латинских имен в духе tag_history.json.
+Сравнивается исходная реализация (цепочка replace + re на каждый вызов)
+с TagTokenizer; результаты обеих обязаны совпадать.
+"""
+
+import os
+import re
+import json
+import time
+import random
+import argparse
+
+from model.tag_engine import TagTokenizer, CATEGORY_PATTERNS, CATEGORY_KEYWORDS
+
+STOP_WORDS = {'в', 'на', 'для', 'из', 'от', 'по', 'и', 'или', 'не'}
+
+WORDS = [
+    'Отчет', 'отчёт', 'Иванов', 'Петрова', 'Сидоровский', 'договор', 'контракт',
+    'проект', 'клиент', 'заказчик', 'подписан', 'черновик', 'итоговый', 'квартал',
+    'Q1', 'Q3', 'report', 'project', 'customer', 'final', 'draft', 'scan',
+    'fromNoute', 'PB1', 'IMG', 'DSC', 'копия', 'новый', 'для', 'на', 'v2',
+    '2019', '2023', '№1234', '00017', 'смета', 'счет', 'акт', 'invoice',
+]
+EXTENSIONS = ['.pdf', '.docx', '.doc', '.xlsx', '.jpg', '.JPG', '.png', '.txt', '.py', '.zip']
+SEPARATORS = ['_', '-', ' ', '.', ', ']
+DIRS = ['Документы', 'Проекты/Альфа', 'Клиенты/ООО Ромашка', 'photos/2023', 'archive/old', '.']
+
+
+def build_corpus(count, seed=1):
+    """Список (имя файла, относительный путь)"""
+    rng = random.Random(seed)
+    corpus = []
+
+    # Примеры из истории тегов, если она есть
+    if os.path.exists("tag_history.json"):
+        with open("tag_history.json", encoding="utf-8") as f:
+            for name in json.load(f).get("file_examples", {}).values():
+                corpus.append((name, name))
+
+    while len(corpus) < count:
+        parts = rng.sample(WORDS, rng.randint(1, 5))
+        name = rng.choice(SEPARATORS).join(parts) + rng.choice(EXTENSIONS)
+        path = os.path.join(rng.choice(DIRS), name)
+        corpus.append((name, path))
+    return corpus
+
+
+class LegacyTokenizer:
+    """Копия исходной логики SmartTagEngine до прекомпиляции шаблонов"""
+
+    def __init__(self):
+        self.stop_words = STOP_WORDS
+        self.category_patterns = CATEGORY_PATTERNS
+
+    def extract(self, filename, filepath):
+        tags = []
+        name_without_ext = os.path.splitext(filename)[0]
+        tags.extend([p.lower() for p in self.split(name_without_ext) if len(p) > 2])
+        for part in filepath.split(os.sep)[-3:]:
+            if part and part not in {'.', '..'}:
+                tags.extend([p.lower() for p in self.split(part) if len(p) > 2])
+        ext = os.path.splitext(filename)[1].lower()
+        if ext and ext not in {'.txt', '.log', '.tmp'}:
+            tags.append(f"расширение{ext}")
+        return tags
+
+    def split(self, text):
+        if not text:
+            return []
+        for sep in ['_', '-', '.', ' ', ';', ',']:
+            text = text.replace(sep, '|')
+        parts = [p.strip() for p in text.split('|') if p.strip()]
+        filtered = []
+        for part in parts:
+            if (len(part) > 2 and part.lower() not in self.stop_words and
+                    not part.isdigit() and not re.match(r'^\d+$', part)):
+                filtered.append(part)
+        return filtered
+
+    def categorize(self, tag):
+        for category, pattern in self.category_patterns.items():
+            if re.search(pattern, tag, re.IGNORECASE):
+                return category
+        category_keywords = {k: list(v) for k, v in CATEGORY_KEYWORDS.items()}
+        for category, keywords in category_keywords.items():
+            if any(keyword in tag.lower() for keyword in keywords):
+                return f"{category}_разное"
+        return ""
+
+
+def run(tokenizer, corpus):
+    """Извлекает и категоризирует теги всего корпуса"""
+    result = []
+    for filename, path in corpus:
+        tags = tokenizer.extract(filename, path)
+        result.append([(tag, tokenizer.categorize(tag)) for tag in tags])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag tokenizer benchmark")
+    parser.add_argument("--files", type=int, default=50_000)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.files)
+    results = {}
+    for name, tokenizer in (("legacy", LegacyTokenizer()),
+                            ("TagTokenizer", TagTokenizer(STOP_WORDS))):
+        start = time.perf_counter()
+        results[name] = run(tokenizer, corpus)
+        elapsed = time.perf_counter() - start
+        tags = sum(len(r) for r in results[name])
+        print(f"{name:<14} {elapsed:7.2f} s  {tags / elapsed:>12,.0f} tags/s  "
+              f"{len(corpus) / elapsed:>10,.0f} files/s")
+
+    assert results["legacy"] == results["TagTokenizer"], "tokenizers disagree"
+    print("Outputs are identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Бенчмарк обхода: os.walk + isfile + stat + getctime против fs_walker.walk_files
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_walker [--files 100000] [--root /tmp/bench_tree]
+
+Если установлен strace, считаются реальные stat-вызовы ядра,
+иначе - вызовы os.stat на уровне Python и счетчики WalkStats.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.tree_generator import make_tree
+from model.fs_walker import walk_files, WalkStats
+
+
+def legacy_walk(root):
+    """Обход в том виде, в каком он был в FileScanner.scan_directory"""
+    count = 0
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for filename in files:
+            if filename.startswith('.'):
+                continue
+            full_path = os.path.join(dirpath, filename)
+            if not os.path.isfile(full_path):
+                continue
+            stat = os.stat(full_path)
+            os.path.getctime(full_path)
+            os.path.relpath(full_path, root)
+            count += stat.st_size >= 0
+    return count
+
+
+def scandir_walk(root, stats=None):
+    """Обход через walk_files"""
+    count = 0
+    for entry in walk_files(root, stats=stats):
+        count += entry.stat.st_size >= 0
+    return count
+
+
+def count_python_stats(root):
+    """Считает stat-вызовы без strace"""
+    calls = [0]
+    original_stat = os.stat
+
+    def counting_stat(*args, **kwargs):
+        calls[0] += 1
+        return original_stat(*args, **kwargs)
+
+    os.stat = counting_stat
+    try:
+        legacy_walk(root)
+    finally:
+        os.stat = original_stat
+
+    stats = WalkStats()
+    scandir_walk(root, stats)
+    return calls[0], stats.stat_calls
+
+
+def count_strace_stats(root):
+    """Считает stat-вызовы ядра через strace -c"""
+    results = []
+    for mode in ("legacy", "scandir"):
+        cmd = [
+            "strace", "-f", "-c", "-e", "trace=%stat",
+            sys.executable, "-m", "benchmarks.bench_walker",
+            "--root", root, "--only", mode
+        ]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        total = 0
+        for line in proc.stderr.splitlines():
+            parts = line.split()
+            # % time, seconds, usecs/call, calls, [errors], total
+            if parts and parts[-1] == "total":
+                total = int(parts[3])
+        results.append(total)
+    return tuple(results)
+
+
+def timed(func, root):
+    start = time.perf_counter()
+    count = func(root)
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walker benchmark")
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--root", help="Existing or target tree directory")
+    parser.add_argument("--only", choices=["legacy", "scandir"],
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.only:
+        func = legacy_walk if args.only == "legacy" else scandir_walk
+        func(args.root)
+        return
+
+    root = args.root or os.path.join(tempfile.gettempdir(), "file_analyzer_bench_tree")
+    created_here = not os.path.exists(root)
+    if created_here:
+        print(f"Creating {args.files} files in {root}...")
+        make_tree(root, files=args.files)
+
+    try:
+        # Прогрев кэша ОС, чтобы сравнивать только работу Python и ядра
+        scandir_walk(root)
+
+        count, legacy_time = timed(legacy_walk, root)
+        _, scandir_time = timed(scandir_walk, root)
+        print(f"Files: {count}")
+        print(f"os.walk + stat:  {legacy_time:8.3f} s")
+        print(f"walk_files:      {scandir_time:8.3f} s "
+              f"({legacy_time / scandir_time:.1f}x)")
+
+        if shutil.which("strace"):
+            legacy_calls, scandir_calls = count_strace_stats(root)
+            source = "kernel (strace)"
+        else:
+            legacy_calls, scandir_calls = count_python_stats(root)
+            source = "Python-level os.stat / DirEntry.stat"
+        print(f"stat calls, {source}:")
+        print(f"  os.walk + stat: {legacy_calls} ({legacy_calls / count:.2f} per file)")
+        print(f"  walk_files:     {scandir_calls} ({scandir_calls / count:.2f} per file)")
+    finally:
+        if created_here:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Генератор синтетических деревьев файлов для бенчмарков
+"""
+
+import os
+import math
+import random
+from typing import Optional
+
+from benchmarks.bench_tagger import WORDS, EXTENSIONS, SEPARATORS
+
+NAME_STYLES = ["plain", "latin", "cyrillic", "mixed"]
+SIZE_DISTRIBUTIONS = ["fixed", "lognormal"]
+
+# Верхняя граница размера для lognormal - один большой файл не должен
+# занимать весь бюджет диска
+MAX_FILE_SIZE = 64 * 1024 * 1024
+
+
+def _words(style):
+    """Слова для имен файлов в нужном алфавите"""
+    if style == "latin":
+        return [w for w in WORDS if w.isascii()]
+    if style == "cyrillic":
+        return [w for w in WORDS if not w.isascii() or w.isdigit()]
+    return WORDS
+
+
+def make_name(rng: random.Random, index: int, style: str = "plain", words=None) -> str:
+    """
+    Имя файла номер index.
+    plain - file_0000001.dat; latin/cyrillic/mixed - слова в духе
+    tag_history.json (Отчет_Иванов_2023.docx), номер в конце делает имя уникальным
+    """
+    if style == "plain":
+        return f"file_{index:07d}.dat"
+    words = words or _words(style)
+    parts = rng.sample(words, rng.randint(1, 4))
+    separator = rng.choice(SEPARATORS)
+    return separator.join(parts) + f"_{index}" + rng.choice(EXTENSIONS)
+
+
+def make_size(rng: random.Random, file_size: int, distribution: str = "fixed") -> int:
+    """
+    Размер файла.
+    fixed - всегда file_size; lognormal - медиана file_size, длинный хвост
+    крупных файлов (как в реальных папках с документами и фото)
+    """
+    if distribution == "fixed" or not file_size:
+        return file_size
+    size = int(rng.lognormvariate(math.log(file_size), 1.5))
+    return min(size, MAX_FILE_SIZE)
+
+
+def make_tree(root: str, files: int = 100_000, fanout: int = 10,
+              files_per_dir: int = 100, file_size: int = 0,
+              seed: int = 42, max_depth: Optional[int] = None,
+              size_distribution: str = "fixed", names: str = "plain") -> int:
+    """
+    Создает в root дерево из files файлов.
+
+    fanout: сколько подпапок у каждой папки
+    files_per_dir: сколько файлов кладется в каждую папку
+    file_size: размер файла в байтах (0 = пустые файлы), для lognormal - медиана
+    max_depth: глубина дерева (None = без ограничения); когда папки
+        нижнего уровня заполнены, файлы добавляются в них по кругу
+    size_distribution: fixed или lognormal
+    names: plain, latin, cyrillic или mixed
+    Возвращает число созданных папок.
+    Одинаковые параметры и seed дают одинаковое дерево.
+    """
+    rng = random.Random(seed)
+    words = _words(names)
+    max_size = file_size if size_distribution == "fixed" else MAX_FILE_SIZE
+    payload = rng.randbytes(max_size) if max_size else b""
+
+    os.makedirs(root, exist_ok=True)
+    queue = [(root, 0)]
+    leaves = []
+    created = 0
+    dirs = 1
+
+    while created < files:
+        if not queue:
+            # Глубина исчерпана - снова проходим по нижним папкам
+            queue, leaves = leaves, []
+        directory, depth = queue.pop(0)
+        for i in range(min(files_per_dir, files - created)):
+            path = os.path.join(directory, make_name(rng, created, names, words))
+            size = make_size(rng, file_size, size_distribution)
+            with open(path, "wb") as f:
+                # Номер файла в начале - у файлов одного размера разное содержимое
+                if size:
+                    f.write(created.to_bytes(8, "little")[:size])
+                    f.write(payload[:max(0, size - 8)])
+            created += 1
+
+        if created >= files:
+            break
+        if max_depth is not None and depth >= max_depth:
+            leaves.append((directory, depth))
+            continue
+        for i in range(fanout):
+            sub = os.path.join(directory, f"dir_{i:02d}")
+            os.makedirs(sub, exist_ok=True)
+            queue.append((sub, depth + 1))
+            dirs += 1
+
+    return dirs
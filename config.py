@@ -11,16 +11,48 @@ BASE_DIR = Path(__file__).parent.absolute()
 DATA_DIR = BASE_DIR / "data"
 LOG_DIR = BASE_DIR / "logs"
 
-# Создаем необходимые папки
-for directory in [DATA_DIR, LOG_DIR]:
-    directory.mkdir(exist_ok=True)
+
+def ensure_directories():
+    """
+    Создает папки данных и логов. Вызывается перед первой записью
+    в них, а не при импорте - импорт конфигурации ничего не пишет на диск.
+    """
+    for directory in [DATA_DIR, LOG_DIR]:
+        directory.mkdir(exist_ok=True)
+
 
 # Настройки анализа
 DEFAULT_SETTINGS = {
     "max_analysis_time": 30,  # секунд
+    "resume_scans": True,  # продолжать остановленное по времени сканирование с места остановки
     "ignore_hidden": True,
     "min_file_size": 0,  # байт (0 = все файлы)
     "max_file_size": 1024 * 1024 * 100,  # 100 МБ
+    "hash_algorithm": "md5",  # md5, sha1, sha256, blake2b (+ xxh64, xxh3_128, blake3 если установлены)
+    "hash_workers": 8,  # потоков для вычисления хешей (1 = последовательно)
+    "hash_use_processes": False,  # пул процессов вместо потоков
+    "hash_large_file_threshold": 8 * 1024 * 1024,  # байт; крупнее - чтение без копий блоков
+    "hash_use_mmap": False,  # большие файлы через mmap (не для сетевых дисков)
+    # Колонка "Duplicate Group": для поиска нужны размеры всех файлов, поэтому
+    # записи сначала собираются целиком (память растет с деревом, отчет пишется
+    # после обхода). Выключено - сканер, теги и отчет идут потоком в постоянной
+    # памяти. Включить для запуска: main.py --duplicates
+    "find_duplicates": False,
+    "scan_cache": True,  # кэш хешей и сырых тегов между запусками (data/scan_cache.sqlite)
+    "tag_chunk_size": 1000,  # файлов в пачке при потоковой разметке тегами
+    "tag_memory_files": 100_000,  # записей для пересчета тегов в памяти, остальные - во временной базе
+    "content_tags": False,  # теги по содержимому .txt/.py/.docx/.xlsx (.pdf - если есть pypdf)
+    "content_max_bytes": 64 * 1024,  # сколько байт текста читать с начала файла
+    "content_max_pages": 2,  # сколько страниц читать из PDF
+    "content_workers": 4,  # потоков для чтения содержимого
+    "async_scan": False,  # асинхронный обход (для сетевых дисков SMB/NFS)
+    "async_concurrency": 128,  # вызовов ФС одновременно в асинхронном режиме
+    "root_workers": 4,  # сколько корней обходить одновременно (main.py папка1 папка2 ...)
+    "persist_catalog": False,  # сохранять результаты в базу каталога для поиска (main.py query)
+    "catalog_db": None,  # путь к базе каталога (None = data/catalog.sqlite)
+    "metrics_dump": True,  # метрики запуска (время этапов, счетчики) в logs/metrics_*.json
+    "profile": False,  # профиль cProfile запуска (logs/metrics_*.prof)
+    "trace_memory": False,  # tracemalloc: пик памяти и главные места выделений
     "supported_extensions": [
         '.pdf', '.doc', '.docx', '.xls', '.xlsx',
         '.txt', '.jpg', '.png', '.zip', '.py'
@@ -49,7 +81,8 @@ TAG_SETTINGS = {
 EXCEL_SETTINGS = {
     "default_output": "КаталогФайлов_с_тегами.xlsx",
     "backup_before_write": True,
-    "auto_adjust_columns": True
+    "auto_adjust_columns": True,
+    "write_only": True  # потоковая запись отчета без хранения листа в памяти
 }
 
 # Настройки логирования
@@ -61,6 +94,7 @@ LOG_SETTINGS = {
 
 class Config:
     # Настройки вывода отчетов
+    OUTPUT_FORMAT = "xlsx"  # xlsx, csv, jsonl, parquet (нужен pyarrow)
     OUTPUT_STRATEGY = "PARENT_DIR"  # PARENT_DIR, SAME_DIR, CUSTOM
     
     # Можно задать кастомную папку для отчетов
@@ -1,125 +1,467 @@
 import os
+from bisect import bisect_left
 from collections import Counter
 from model.file_scanner import FileScanner
-from model.tag_engine import TagEngine
-from model.excel_writer import ExcelWriter
-from utils.helpers import format_size, get_category
+from model.tag_engine import SmartTagEngine
+from model.report_writer import create_writer
+from model.duplicate_finder import DuplicateFinder
+from utils.helpers import format_size, get_category, unique_roots
+from utils.instrumentation import Instrumentation
+from config import DEFAULT_SETTINGS, EXCEL_SETTINGS
 from datetime import datetime
 
 class MainController:
     def __init__(self, view):
         self.view = view
         self.file_scanner = FileScanner()
-        self.tag_engine = TagEngine()
-        self.excel_writer = ExcelWriter()
+        self._tag_engine = None
+        self.duplicate_finder = DuplicateFinder(self.file_scanner.hash_engine)
+        self.report_writer = None
+        self.catalog_db = None
+        self.content_tagger = None
+        self.metrics = None
     
-    def analyze_directory(self, directory_path):
-        """Основной метод анализа директории"""
-        if not os.path.exists(directory_path):
-            self.view.show_error(f"Directory not found: {directory_path}")
+    @property
+    def tag_engine(self) -> SmartTagEngine:
+        """Движок тегов - создается при первом анализе, а не при запуске"""
+        if self._tag_engine is None:
+            self._tag_engine = SmartTagEngine()
+        return self._tag_engine
+    
+    def analyze_directory(self, directory_path, async_scan=None, concurrency=None,
+                          output=None, output_format=None, persist=None, workers=None,
+                          find_duplicates=None):
+        """
+        Основной метод анализа директории.
+        Файлы проходят конвейером сканер -> теги -> отчет, поэтому память
+        не растет с размером дерева, а при остановке по времени или
+        прерывании уже обработанные файлы все равно попадают в отчет.
+        
+        directory_path: папка или список папок - несколько корней обходятся
+            одновременно, и результаты пишутся в один общий отчет
+        async_scan: асинхронный обход для сетевых дисков (по умолчанию из настроек)
+        concurrency: сколько вызовов ФС держать в работе в асинхронном режиме
+        output: файл отчета (формат - по расширению) или папка для него
+        output_format: xlsx, csv, jsonl или parquet (по умолчанию Config.OUTPUT_FORMAT)
+        persist: сохранить результаты в базу каталога для поиска (query),
+            по умолчанию DEFAULT_SETTINGS["persist_catalog"]
+        workers: сколько корней обходить одновременно
+            (по умолчанию DEFAULT_SETTINGS["root_workers"])
+        find_duplicates: заполнять "Duplicate Group" - записи собираются
+            целиком до разметки (по умолчанию DEFAULT_SETTINGS["find_duplicates"])
+        
+        Время этапов (walk, stat, hash, tag, write) и счетчики запуска
+        собираются в self.metrics и выгружаются в logs/metrics_*.json.
+        Возвращает сводку анализа (None - анализ не запускался).
+        """
+        roots = [directory_path] if isinstance(directory_path, str) else list(directory_path)
+        missing = [root for root in roots if not os.path.exists(root)]
+        if missing or not roots:
+            self.view.show_error(f"Directory not found: {', '.join(missing)}")
             return
+        # Один корень, указанный дважды, обходился бы дважды
+        roots = unique_roots(roots)
+        multi_root = len(roots) > 1
+        directory_path = self._common_directory(roots) if multi_root else roots[0]
         
-        self.view.show_message(f"Starting analysis of: {directory_path}")
+        self.view.show_message(f"Starting analysis of: {', '.join(roots)}")
         self.view.show_message(f"Analysis started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # Сканирование файлов
-        files = self.file_scanner.scan_directory(directory_path)
-        self.view.show_message(f"Found {len(files)} files")
+        metrics = self.metrics = Instrumentation(
+            profile=DEFAULT_SETTINGS["profile"],
+            trace_memory=DEFAULT_SETTINGS["trace_memory"]
+        )
+        metrics.start()
         
-        analysis_results = []
+        # Отчет - на каждый анализ свой; потоковые форматы пишут строки сразу
+        try:
+            self.report_writer = create_writer(
+                output_format, output,
+                write_only=EXCEL_SETTINGS["write_only"],
+                auto_adjust_columns=EXCEL_SETTINGS["auto_adjust_columns"]
+            )
+        except (ValueError, ImportError) as e:
+            self.view.show_error(str(e))
+            return
+        self.report_writer.begin(directory_path, "report", output)
         
-        # Обработка каждого файла
-        for idx, filepath in enumerate(files, 1):
-            try:
-                file_data = self._process_file(filepath, directory_path)
-                analysis_results.append(file_data)
-                
-                # Обновление прогресса
-                if idx % 10 == 0:
-                    self.view.show_progress(idx, len(files))
+        if persist is None:
+            persist = DEFAULT_SETTINGS["persist_catalog"]
+        self.catalog_db = None
+        if persist:
+            from model.catalog_db import CatalogDB
+            self.catalog_db = CatalogDB(DEFAULT_SETTINGS["catalog_db"])
+            self.catalog_db.begin_scan(*roots)
+        
+        # Кэш хешей и сырых тегов: неизмененные файлы не читаются заново
+        self.file_scanner.cache = None
+        if DEFAULT_SETTINGS["scan_cache"]:
+            from model.scan_cache import ScanCache
+            self.file_scanner.cache = ScanCache()
+        
+        if async_scan is None:
+            async_scan = DEFAULT_SETTINGS["async_scan"]
+        if async_scan and DEFAULT_SETTINGS["resume_scans"]:
+            self.view.show_warning(
+                "Async walk cannot resume: if it hits the time limit "
+                f"({DEFAULT_SETTINGS['max_analysis_time']}s), the next run starts over"
+            )
+        if find_duplicates is None:
+            find_duplicates = DEFAULT_SETTINGS["find_duplicates"]
+        scanner = source = self.file_scanner
+        if multi_root:
+            # Корни обходятся в общем пуле, записи сливаются в один поток
+            from model.multi_root_scanner import MultiRootScanner
+            scanner = source = MultiRootScanner(roots, workers, async_scan, concurrency,
+                                                cache=self.file_scanner.cache)
+        elif async_scan:
+            from model.async_scanner import AsyncFileScanner
+            scanner = AsyncFileScanner(self.file_scanner, concurrency)
+        
+        # Для поиска дубликатов нужны размеры всех файлов сразу,
+        # поэтому в этом режиме записи собираются в колоночный каталог
+        catalog = None
+        if find_duplicates and not async_scan and not multi_root:
+            with metrics.stage("walk"):
+                catalog = self.file_scanner.scan_catalog(
+                    directory_path,
+                    max_seconds=DEFAULT_SETTINGS["max_analysis_time"]
+                )
+            files = catalog
+        else:
+            walk_args = [] if multi_root else [directory_path]
+            files = metrics.timed_iter("walk", scanner.iter_directory(
+                *walk_args,
+                max_seconds=DEFAULT_SETTINGS["max_analysis_time"]
+            ))
+            if find_duplicates:
+                files = list(files)
+        
+        if find_duplicates:
+            with metrics.stage("hash"):
+                self._find_duplicates(files)
+        
+        tagged_files = metrics.timed_iter("tag", self.tag_engine.analyze_stream(
+            files,
+            chunk_size=DEFAULT_SETTINGS["tag_chunk_size"],
+            cache=self.file_scanner.cache,
+            max_memory_files=DEFAULT_SETTINGS["tag_memory_files"]
+        ))
+        
+        # Теги по содержимому - отдельным пулом, пока обход идет дальше
+        self.content_tagger = None
+        if DEFAULT_SETTINGS["content_tags"]:
+            from model.content_tagger import ContentTagger
+            self.content_tagger = ContentTagger(
+                max_bytes=DEFAULT_SETTINGS["content_max_bytes"],
+                max_pages=DEFAULT_SETTINGS["content_max_pages"],
+                workers=DEFAULT_SETTINGS["content_workers"]
+            )
+            tagged_files = metrics.timed_iter("content",
+                                              self.content_tagger.tag_stream(tagged_files))
+        
+        summary = self._new_summary()
+        processed = 0
+        completed = False
+        # Номера файлов потока, не попавших в отчет (ошибка обработки)
+        skipped = []
+        
+        try:
+            # Обработка каждого файла
+            for idx, file_info in enumerate(tagged_files, 1):
+                rows_before = self.report_writer.rows_written
+                try:
+                    with metrics.stage("write"):
+                        file_data = self._process_file(file_info)
+                        self.report_writer.add_file_data(file_data)
+                        if self.catalog_db:
+                            self.catalog_db.add_file(file_data, seq=idx - 1)
+                    processed = idx
+                    if catalog is None:
+                        self._update_summary(summary, file_data)
                     
-            except Exception as e:
-                self.view.show_warning(f"Error processing {filepath}: {str(e)}")
+                    # Обновление прогресса
+                    if idx % 1000 == 0:
+                        self.view.show_message(f"Processed {idx} files")
+                        
+                except Exception as e:
+                    metrics.count("process_errors")
+                    self.view.show_warning(f"Error processing {file_info.get('full_path')}: {str(e)}")
+                    if self.report_writer.rows_written == rows_before:
+                        skipped.append(idx - 1)
+            
+            with metrics.stage("tag"):
+                self._apply_tag_corrections(summary, catalog, skipped)
+            completed = True
+        
+        except KeyboardInterrupt:
+            self.view.show_warning("Analysis interrupted, saving partial report")
+            completed = False
+        
+        finally:
+            # Отчет из того, что успели обработать
+            with metrics.stage("write"):
+                self._generate_report(directory_path)
+                # Позиция обхода - только когда отданные файлы уже в отчете
+                if completed:
+                    source.commit_checkpoint()
+                if self.catalog_db:
+                    self._save_catalog_db(completed, source)
+            if self.content_tagger:
+                self._finish_content_tags()
+            if completed:
+                self._show_deleted(directory_path, source)
+            if self.file_scanner.cache:
+                self.file_scanner.cache.close()
+                self.file_scanner.cache = None
         
-        # Генерация отчета Excel
-        self._generate_report(analysis_results, directory_path)
+        # Сводка по каталогу считается по колонкам, а не по строкам отчета
+        if catalog is not None:
+            summary = catalog.summary(stop=processed)
+        
+        self._finish_metrics(roots, summary, async_scan, source, find_duplicates)
         
         # Отображение результатов
-        self._display_summary(analysis_results)
+        self._display_summary(summary)
+        return summary
+    
+    def _finish_metrics(self, roots, summary, async_scan, source, find_duplicates):
+        """
+        Дополняет метрики счетчиками компонентов и выгружает их.
+        source: сканер, обходивший корни (FileScanner или MultiRootScanner)
+        """
+        metrics = self.metrics
+        metrics.stop()
+        multi_root = len(roots) > 1
+        
+        metrics.count("files", summary['total_files'])
+        metrics.count("bytes", summary['total_size'])
+        metrics.count("scan_errors", len(source.errors))
+        if not async_scan:
+            # Асинхронный обход идет мимо walk_files и своих счетчиков не ведет
+            walk_stats = source.walk_stats
+            metrics.count("dirs_listed", walk_stats.dirs_listed)
+            metrics.count("stat_calls", walk_stats.stat_calls)
+            metrics.count("walk_errors", walk_stats.errors)
+            # Корни обходятся параллельно: время stat в потоках обхода
+            # не вложено в ожидание записей этапом walk
+            metrics.add_time("stat", walk_stats.stat_seconds, walk_stats.stat_calls,
+                             moved_from=None if multi_root else "walk")
+        if find_duplicates:
+            stats = self.duplicate_finder.stats
+            metrics.count("bytes_read", stats.get('bytes_read', 0))
+            metrics.count("files_hashed", stats.get('fully_hashed', 0))
+        if self.content_tagger:
+            for name, value in self.content_tagger.stats.items():
+                metrics.count(f"content_{name}", value)
+        metrics.info['directory'] = os.path.abspath(roots[0])
+        if multi_root:
+            metrics.info['directories'] = source.roots
+            metrics.info['root_workers'] = source.workers
+        metrics.info['async_scan'] = bool(async_scan)
+        metrics.info['timed_out'] = source.timed_out
+        
+        self.view.show_message("\n=== TIME BY STAGE ===")
+        self.view.show_message(metrics.summary())
+        
+        if DEFAULT_SETTINGS["metrics_dump"]:
+            name = os.path.basename(os.path.normpath(roots[0])) or "root"
+            if multi_root:
+                name = f"{name}_and_{len(roots) - 1}_more"
+            try:
+                path = metrics.dump(name)
+                self.view.show_message(f"Metrics saved to: {path}")
+            except OSError as e:
+                self.view.show_warning(f"Could not save metrics: {e}")
     
-    def _process_file(self, filepath, base_dir):
-        """Обработка одного файла"""
-        stats = os.stat(filepath)
+    def _apply_tag_corrections(self, summary, catalog=None, skipped=()):
+        """
+        Переносит в отчет, сводку (или каталог) и базу поправки финального
+        прохода разметки: файлы, размеченные по предварительной частотности
+        тегов, получают те же теги, что дал бы analyze_batch.
+        skipped: номера файлов потока (по возрастанию), не попавших в отчет
+        """
+        corrections = self.tag_engine.last_corrections
+        if not corrections:
+            return
         
-        # Относительный путь для отображения
-        rel_path = os.path.relpath(filepath, base_dir)
+        # Теги по содержимому не зависят от частотности - сохраняем их
+        added = {}
+        if self.content_tagger:
+            added = self.content_tagger.added_tags(index for index, _, _ in corrections)
+        tags_by_row = {}
+        for index, old_tags, new_tags in corrections:
+            if index in added:
+                old_tags = self.content_tagger.merge(old_tags, added[index])
+                new_tags = self.content_tagger.merge(new_tags, added[index])
+            # Строки отчета идут подряд: без файлов, не попавших в отчет
+            position = bisect_left(skipped, index)
+            if position == len(skipped) or skipped[position] != index:
+                tags_by_row[index - position] = new_tags
+            if self.catalog_db:
+                self.catalog_db.retag(index, new_tags)
+            if catalog is not None:
+                catalog.set_tags(index, new_tags)
+                continue
+            summary['tags'].subtract(old_tags)
+            summary['tags'].update(new_tags)
+        summary['tags'] = +summary['tags']
+        self.report_writer.retag(tags_by_row)
+        self.view.show_message(f"Retagged {len(corrections)} files after the final frequency pass")
+    
+    def _save_catalog_db(self, completed, source):
+        """Завершает запись в базу каталога"""
+        # Файлы, пропавшие с прошлого сканирования, удаляются из базы только
+        # после полного обхода за один запуск
+        if hasattr(source, 'complete_roots'):
+            self.catalog_db.finish_scan(completed, roots=source.complete_roots())
+        else:
+            complete = completed and not source.timed_out and not source.resumed
+            self.catalog_db.finish_scan(complete)
+        self.view.show_message(
+            f"Catalog database updated: {self.catalog_db.files_added} files in {self.catalog_db.db_path}"
+        )
+        self.catalog_db.close()
+    
+    def _finish_content_tags(self):
+        """Сохраняет кэш тегов по содержимому и сообщает итог"""
+        content_tagger = self.content_tagger
+        content_tagger.close()
+        stats = content_tagger.stats
+        self.view.show_message(
+            f"Content tags added to {stats['files_tagged']} files "
+            f"(read {stats['files_read']}, from cache {stats['cache_hits']})"
+        )
+        if content_tagger.errors:
+            self.view.show_warning(f"Could not read content of {len(content_tagger.errors)} files")
+    
+    def query_catalog(self, limit=100, **filters):
+        """
+        Поиск по базе каталога без повторного сканирования.
+        filters - условия CatalogDB.query (extension, min_size, tags, ...)
+        """
+        from model.catalog_db import CatalogDB
         
+        catalog_db = CatalogDB(DEFAULT_SETTINGS["catalog_db"])
+        try:
+            results = catalog_db.query(limit=limit, **filters)
+        finally:
+            catalog_db.close()
+        self.view.show_query_results(results)
+        return results
+    
+    def _show_deleted(self, directory_path, source):
+        """Файлы, удаленные с прошлого полного сканирования (по кэшу)"""
+        if hasattr(source, 'deleted'):
+            deleted = [path for paths in source.deleted.values() for path in paths]
+        else:
+            deleted = source.collect_deleted(directory_path)
+        if not deleted:
+            return
+        self.metrics.count("deleted_files", len(deleted))
+        self.view.show_message(f"\nDeleted since last scan: {len(deleted)} files")
+        for path in deleted[:10]:
+            self.view.show_message(f"  - {path}")
+        if len(deleted) > 10:
+            self.view.show_message(f"  ... and {len(deleted) - 10} more")
+    
+    def _find_duplicates(self, files):
+        """Заполняет 'duplicate_group' у найденных дубликатов"""
+        self.view.show_message("Searching for duplicates...")
+        duplicates = self.duplicate_finder.find(files)
+        # Новые хеши - в кэш, следующий запуск их не пересчитает
+        self.file_scanner.store_hashes(self.duplicate_finder.hashed)
+        stats = self.duplicate_finder.stats
+        self.view.show_message(
+            f"Found {stats['duplicate_files']} duplicate files in {len(duplicates)} groups "
+            f"(fully hashed {stats['fully_hashed']} of {stats['files']} files)"
+        )
+    
+    def _process_file(self, file_info):
+        """Преобразует запись сканера в строку отчета"""
+        # В общем отчете по нескольким корням путь начинается с имени корня
+        path = file_info['relative_path']
+        if file_info.get('root_label'):
+            path = os.path.join(file_info['root_label'], path)
         file_data = {
-            'filename': os.path.basename(filepath),
-            'path': rel_path,
-            'full_path': filepath,
-            'size': stats.st_size,
-            'size_kb': round(stats.st_size / 1024, 2),
-            'created': datetime.fromtimestamp(stats.st_ctime),
-            'modified': datetime.fromtimestamp(stats.st_mtime),
-            'extension': os.path.splitext(filepath)[1].lower(),
+            'filename': file_info['filename'],
+            'path': path,
+            'relative_path': file_info['relative_path'],
+            'root': file_info.get('root'),
+            'full_path': file_info['full_path'],
+            'size': file_info['size_bytes'],
+            'size_kb': round(file_info['size_bytes'] / 1024, 2),
+            'created': file_info['created_date'],
+            'modified': datetime.fromtimestamp(file_info['mtime_ns'] / 1e9),
+            'extension': file_info['extension'],
+            'tags': file_info.get('tags', []),
+            'duplicate_group': file_info.get('duplicate_group', ''),
+            'hash': file_info.get('hash'),
+            'mtime_ns': file_info['mtime_ns'],
         }
         
         # Определение категории
         file_data['category'] = get_category(file_data['extension'])
         
-        # Добавление тегов
-        tags = self.tag_engine.get_tags(
-            file_data['filename'],
-            file_data['extension'],
-            file_data['size']
-        )
-        file_data['tags'] = tags
-        
         return file_data
     
-    def _generate_report(self, analysis_results, target_directory):
-        """Генерация Excel отчета"""
-        self.view.show_message("\nGenerating Excel report...")
-        
-        for file_data in analysis_results:
-            self.excel_writer.add_file_data(file_data)
+    @staticmethod
+    def _common_directory(roots):
+        """Общая папка корней - рядом с ней сохраняется общий отчет"""
+        try:
+            return os.path.commonpath([os.path.abspath(root) for root in roots])
+        except ValueError:
+            # Корни на разных дисках
+            return os.getcwd()
+    
+    def _generate_report(self, target_directory):
+        """Сохранение отчета"""
+        self.view.show_message(f"\nGenerating {self.report_writer.EXTENSION.lstrip('.')} report...")
         
-        # Сохраняем Excel рядом с анализируемой папкой
-        excel_path = self.excel_writer.save(target_directory, "report")
+        # Сохраняем отчет рядом с анализируемой папкой (или по пути output)
+        report_path = self.report_writer.save(target_directory, "report")
         
-        self.view.show_message(f"Excel report saved to: {excel_path}")
-        self.view.show_message(f"Report size: {os.path.getsize(excel_path) / 1024:.2f} KB")
+        self.view.show_message(f"Report saved to: {report_path}")
+        self.view.show_message(f"Report size: {os.path.getsize(report_path) / 1024:.2f} KB")
     
-    def _display_summary(self, analysis_results):
+    def _new_summary(self):
+        """Пустая сводка - накапливается по мере обработки файлов"""
+        return {
+            'total_files': 0,
+            'total_size': 0,
+            'extensions': Counter(),
+            'categories': Counter(),
+            'tags': Counter(),
+        }
+    
+    def _update_summary(self, summary, file_data):
+        """Учитывает файл в сводке"""
+        summary['total_files'] += 1
+        summary['total_size'] += file_data['size']
+        summary['extensions'][file_data['extension']] += 1
+        summary['categories'][file_data['category']] += 1
+        summary['tags'].update(file_data['tags'])
+    
+    def _display_summary(self, summary):
         """Отображение сводки по анализу"""
-        if not analysis_results:
+        if not summary['total_files']:
             self.view.show_message("No files to analyze")
             return
         
-        total_size = sum(f['size'] for f in analysis_results)
-        extensions = Counter(f['extension'] for f in analysis_results)
-        
         self.view.show_message("\n=== ANALYSIS SUMMARY ===")
-        self.view.show_message(f"Total files: {len(analysis_results)}")
-        self.view.show_message(f"Total size: {format_size(total_size)}")
+        self.view.show_message(f"Total files: {summary['total_files']}")
+        self.view.show_message(f"Total size: {format_size(summary['total_size'])}")
         self.view.show_message("\nFiles by extension:")
-        for ext, count in extensions.most_common():
+        for ext, count in summary['extensions'].most_common():
             self.view.show_message(f"  {ext or 'no extension'}: {count} files")
         
         # Распределение по категориям
-        categories = Counter(f['category'] for f in analysis_results)
         self.view.show_message("\nFiles by category:")
-        for category, count in categories.most_common():
+        for category, count in summary['categories'].most_common():
             self.view.show_message(f"  {category}: {count} files")
         
         # Статистика по тегам
-        all_tags = []
-        for f in analysis_results:
-            all_tags.extend(f['tags'])
-        
-        if all_tags:
-            tag_counter = Counter(all_tags)
+        if summary['tags']:
             self.view.show_message("\nMost common tags:")
-            for tag, count in tag_counter.most_common(10):
+            for tag, count in summary['tags'].most_common(10):
                 self.view.show_message(f"  {tag}: {count} files")
\ No newline at end of file
@@ -7,16 +7,25 @@ def main():
     view = CLIView()
     controller = MainController(view)
     
-    # Получаем директорию для анализа и опционально папку для вывода
-    directory, output_dir = view.get_analysis_directory()
+    # Поиск по базе каталога: main.py query --ext .pdf --min-size 50MB --tag договор_разное
+    if len(sys.argv) > 1 and sys.argv[1] == "query":
+        controller.query_catalog(**view.get_query_filters(sys.argv[2:]))
+        return
     
-    # Проверяем существование директории
-    if not os.path.exists(directory):
-        view.show_error(f"Directory '{directory}' does not exist!")
+    # Папки для анализа и параметры: main.py папка1 папка2 -o отчет.csv -j 4
+    options = view.get_analysis_options()
+    directories = options.pop('directories')
+    
+    # Проверяем существование директорий
+    missing = [directory for directory in directories if not os.path.exists(directory)]
+    if missing:
+        for directory in missing:
+            view.show_error(f"Directory '{directory}' does not exist!")
         sys.exit(1)
     
-    # Анализируем директорию
-    controller.analyze_directory(directory)
+    # Анализируем директории - несколько корней в один общий отчет
+    if controller.analyze_directory(directories, **options) is None:
+        sys.exit(1)
     
     view.show_message("\nAnalysis completed successfully!")
 
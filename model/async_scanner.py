@@ -0,0 +1,202 @@
+"""
+МОДЕЛЬ: Асинхронный обход для сетевых файловых систем (SMB/NFS)
+Листинги папок и stat выполняются в пуле потоков, одновременно
+в работе держится до concurrency системных вызовов
+"""
+
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from config import DEFAULT_SETTINGS
+
+# Признак конца обхода в очереди результатов
+_DONE = object()
+
+
+class LocalFS:
+    """Блокирующие вызовы файловой системы, которые выполняет пул"""
+
+    def scandir(self, path: str) -> List[os.DirEntry]:
+        with os.scandir(path) as it:
+            return list(it)
+
+    def stat(self, entry: os.DirEntry) -> os.stat_result:
+        return entry.stat()
+
+
+class DelayedFS(LocalFS):
+    """
+    Локальная ФС с искусственной задержкой каждого вызова -
+    чтобы проверять и измерять асинхронный режим без сетевого диска
+    """
+
+    def __init__(self, latency: float = 0.005, fs: Optional[LocalFS] = None):
+        """
+        latency: задержка одного вызова в секундах (время ответа сервера)
+        fs: оборачиваемая ФС (по умолчанию LocalFS)
+        """
+        self.latency = latency
+        self.fs = fs or LocalFS()
+
+    def scandir(self, path: str) -> List[os.DirEntry]:
+        time.sleep(self.latency)
+        return self.fs.scandir(path)
+
+    def stat(self, entry: os.DirEntry) -> os.stat_result:
+        time.sleep(self.latency)
+        return self.fs.stat(entry)
+
+
+class AsyncFileScanner:
+    """
+    Асинхронный режим FileScanner.iter_directory.
+    Записи те же, что у FileScanner, но отдаются в порядке готовности,
+    а не в порядке обхода, поэтому позиция для продолжения не сохраняется:
+    остановленный по времени обход следующий запуск начинает сначала.
+    """
+
+    def __init__(self, scanner, concurrency: Optional[int] = None,
+                 fs: Optional[LocalFS] = None):
+        """
+        scanner: FileScanner - формирует записи, хранит ошибки, кэш и timed_out
+        concurrency: сколько вызовов ФС держать в работе одновременно
+        fs: источник вызовов ФС (по умолчанию LocalFS, для проверки - DelayedFS)
+        """
+        self.scanner = scanner
+        self.concurrency = concurrency or DEFAULT_SETTINGS["async_concurrency"]
+        self.fs = fs or LocalFS()
+
+    def iter_directory(self, directory: str,
+                       max_seconds: int = 30,
+                       max_depth: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Синхронный интерфейс: отдает записи по мере готовности.
+        Цикл событий крутится только пока вызывающий код ждет следующую
+        запись; вызовы ФС, уже отданные пулу, выполняются и в это время.
+        """
+        scanner = self.scanner
+        scanner.timed_out = False
+        start_time = time.time()
+
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        queue = asyncio.Queue(maxsize=self.concurrency * 4)
+        producer = loop.create_task(self._walk(directory, max_depth, queue, executor))
+
+        try:
+            while True:
+                file_info = loop.run_until_complete(queue.get())
+                if file_info is _DONE:
+                    break
+
+                # Проверяем лимит времени
+                if time.time() - start_time > max_seconds:
+                    print(f"Достигнут лимит времени ({max_seconds}с)")
+                    print("Асинхронный обход не сохраняет позицию - "
+                          "следующий запуск начнет обход сначала")
+                    scanner.timed_out = True
+                    return
+
+                if scanner.cache:
+                    file_info['hash'] = scanner.cached_hash(file_info['full_path'],
+                                                            file_info['size_bytes'],
+                                                            file_info['mtime_ns'],
+                                                            file_info['inode'])
+                yield file_info
+
+            loop.run_until_complete(producer)
+
+        except Exception as e:
+            scanner.errors.append(f"Ошибка сканирования: {str(e)}")
+
+        finally:
+            if not producer.done():
+                producer.cancel()
+                loop.run_until_complete(asyncio.gather(producer, return_exceptions=True))
+            executor.shutdown(wait=False, cancel_futures=True)
+            loop.close()
+
+    async def _walk(self, root: str, max_depth: Optional[int],
+                    queue: asyncio.Queue, executor: ThreadPoolExecutor):
+        """
+        Обходит дерево: каждая папка и каждый файл - отдельная задача.
+        calls ограничивает число вызовов ФС в работе, file_slots - число
+        задач по файлам, чтобы огромная папка не превращалась в миллион задач.
+        """
+        loop = asyncio.get_running_loop()
+        calls = asyncio.Semaphore(self.concurrency)
+        file_slots = asyncio.Semaphore(self.concurrency * 4)
+        tasks = set()
+        errors = self.scanner.errors
+        ignore_hidden = DEFAULT_SETTINGS["ignore_hidden"]
+
+        def track(task: asyncio.Task):
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        async def fs_call(func, arg):
+            async with calls:
+                return await loop.run_in_executor(executor, func, arg)
+
+        async def list_dir(dir_path: str, rel_dir: str, depth: int):
+            try:
+                entries = await fs_call(self.fs.scandir, dir_path)
+            except OSError as e:
+                errors.append(f"Ошибка чтения папки {dir_path}: {str(e)}")
+                return
+            for entry in entries:
+                name = entry.name
+                if ignore_hidden and name.startswith('.'):
+                    continue
+                rel_path = os.path.join(rel_dir, name) if rel_dir else name
+                try:
+                    # Тип известен из readdir, отдельный вызов не нужен
+                    if entry.is_dir():
+                        if not entry.is_symlink() and (max_depth is None or depth < max_depth):
+                            track(asyncio.create_task(
+                                list_dir(entry.path, rel_path, depth + 1)))
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError as e:
+                    errors.append(f"Ошибка анализа {entry.path}: {str(e)}")
+                    continue
+                await file_slots.acquire()
+                task = asyncio.create_task(stat_file(entry, rel_path))
+                task.add_done_callback(lambda _: file_slots.release())
+                track(task)
+
+        async def stat_file(entry: os.DirEntry, rel_path: str):
+            try:
+                stat = await fs_call(self.fs.stat, entry)
+            except OSError as e:
+                errors.append(f"Ошибка анализа {entry.path}: {str(e)}")
+                return
+            file_info = self.scanner._analyze_file(entry.path, root, rel_path, stat)
+            if file_info:
+                await queue.put(file_info)
+
+        try:
+            track(asyncio.create_task(list_dir(root, '', 0)))
+            while tasks:
+                await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            # Потребитель остановился (лимит времени, прерывание) - очередь
+            # никто не читает, поэтому _DONE не кладем
+            await self._cancel(tasks)
+            raise
+        except Exception:
+            await self._cancel(tasks)
+            await queue.put(_DONE)
+            raise
+        await queue.put(_DONE)
+
+    @staticmethod
+    async def _cancel(tasks: set):
+        pending = list(tasks)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,232 @@
+"""
+МОДЕЛЬ: Колоночный каталог файлов
+Вместо словаря на файл - массивы чисел и таблицы повторяющихся строк
+"""
+
+import os
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.helpers import get_category
+
+# Номер строки в таблице, означающий "нет значения"
+NO_VALUE = -1
+
+
+class StringTable:
+    """Таблица уникальных значений: значение хранится один раз, в колонке - его номер"""
+
+    __slots__ = ('values', '_ids')
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def intern(self, value) -> int:
+        """Номер значения (добавляет его, если нового)"""
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def __getitem__(self, value_id: int):
+        return self.values[value_id]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class CatalogRecord:
+    """
+    Запись каталога с интерфейсом словаря записи FileScanner.
+    Хранит только номер строки - данные читаются из колонок по запросу,
+    поэтому записи можно передавать в DuplicateFinder, SmartTagEngine
+    и контроллер без изменения их кода.
+    """
+
+    __slots__ = ('catalog', 'index')
+
+    def __init__(self, catalog: 'FileCatalog', index: int):
+        self.catalog = catalog
+        self.index = index
+
+    def __getitem__(self, key: str):
+        try:
+            getter = _GETTERS[key]
+        except KeyError:
+            raise KeyError(key) from None
+        return getter(self.catalog, self.index)
+
+    def __setitem__(self, key: str, value):
+        try:
+            setter = _SETTERS[key]
+        except KeyError:
+            raise KeyError(f"Поле '{key}' нельзя изменить в каталоге") from None
+        setter(self.catalog, self.index, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _GETTERS
+
+    def get(self, key: str, default=None):
+        value = self[key] if key in _GETTERS else None
+        return default if value is None else value
+
+    def keys(self) -> List[str]:
+        return list(_GETTERS)
+
+    def to_dict(self) -> Dict:
+        """Обычный словарь записи (как у FileScanner._analyze_file)"""
+        return {key: self[key] for key in _GETTERS}
+
+    def __repr__(self) -> str:
+        return f"CatalogRecord({self.catalog.relative_path(self.index)!r})"
+
+
+class FileCatalog:
+    """
+    Каталог файлов одного корня в колонках.
+    Числа - в array('q'/'d'/'l'), папки, расширения, наборы тегов и группы
+    дубликатов - номерами в StringTable. Имя файла - единственная строка на файл.
+    """
+
+    def __init__(self, root: str):
+        """root: корень сканирования (из него собираются полные пути)"""
+        self.root = root
+        self.names: List[str] = []
+        self.dir_ids = array('l')
+        self.ext_ids = array('l')
+        self.sizes = array('q')
+        self.mtimes_ns = array('q')
+        self.ctimes = array('d')
+        self.inodes = array('q')
+        self.hashes: List[Optional[str]] = []
+        self.tag_ids = array('l')
+        self.raw_tag_counts = array('l')
+        self.group_ids = array('l')
+
+        self.dirs = StringTable()
+        self.extensions = StringTable()
+        self.tag_sets = StringTable()
+        self.groups = StringTable()
+
+    def add(self, rel_path: str, stat: os.stat_result) -> int:
+        """Добавляет файл по пути относительно корня, возвращает его номер"""
+        rel_dir, name = os.path.split(rel_path)
+        self.names.append(name)
+        self.dir_ids.append(self.dirs.intern(rel_dir))
+        self.ext_ids.append(self.extensions.intern(os.path.splitext(name)[1].lower()))
+        self.sizes.append(stat.st_size)
+        self.mtimes_ns.append(stat.st_mtime_ns)
+        self.ctimes.append(stat.st_ctime)
+        self.inodes.append(stat.st_ino)
+        self.hashes.append(None)
+        self.tag_ids.append(NO_VALUE)
+        self.raw_tag_counts.append(0)
+        self.group_ids.append(NO_VALUE)
+        return len(self.names) - 1
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index: int) -> CatalogRecord:
+        if index < 0:
+            index += len(self.names)
+        if not 0 <= index < len(self.names):
+            raise IndexError(index)
+        return CatalogRecord(self, index)
+
+    def __iter__(self) -> Iterator[CatalogRecord]:
+        return (CatalogRecord(self, index) for index in range(len(self.names)))
+
+    def relative_path(self, index: int) -> str:
+        rel_dir = self.dirs[self.dir_ids[index]]
+        name = self.names[index]
+        return os.path.join(rel_dir, name) if rel_dir else name
+
+    def full_path(self, index: int) -> str:
+        return os.path.join(self.root, self.relative_path(index))
+
+    def tags(self, index: int) -> List[str]:
+        tag_id = self.tag_ids[index]
+        return list(self.tag_sets[tag_id]) if tag_id != NO_VALUE else []
+
+    def set_tags(self, index: int, tags: Sequence[str]):
+        self.tag_ids[index] = self.tag_sets.intern(tuple(tags))
+
+    def duplicate_group(self, index: int) -> str:
+        group_id = self.group_ids[index]
+        return self.groups[group_id] if group_id != NO_VALUE else ''
+
+    def set_duplicate_group(self, index: int, group: str):
+        self.group_ids[index] = self.groups.intern(group) if group else NO_VALUE
+
+    def summary(self, stop: Optional[int] = None) -> Dict:
+        """
+        Сводка по первым stop файлам (по всем, если None) в формате
+        MainController: счетчики считаются по номерам, а не по строкам
+        """
+        stop = len(self.names) if stop is None else min(stop, len(self.names))
+        extensions = Counter()
+        categories = Counter()
+        for ext_id, count in Counter(self.ext_ids[:stop]).items():
+            ext = self.extensions[ext_id]
+            extensions[ext] += count
+            categories[get_category(ext)] += count
+
+        tags = Counter()
+        for tag_id, count in Counter(self.tag_ids[:stop]).items():
+            if tag_id != NO_VALUE:
+                for tag in self.tag_sets[tag_id]:
+                    tags[tag] += count
+
+        return {
+            'total_files': stop,
+            'total_size': sum(self.sizes[:stop]),
+            'extensions': extensions,
+            'categories': categories,
+            'tags': tags,
+        }
+
+
+def _set_hash(catalog: FileCatalog, index: int, value: Optional[str]):
+    catalog.hashes[index] = value
+
+
+def _set_raw_tags_count(catalog: FileCatalog, index: int, value: int):
+    catalog.raw_tag_counts[index] = value
+
+
+def _ignore(catalog: FileCatalog, index: int, value):
+    pass
+
+
+# Поля записи FileScanner -> чтение из колонок
+_GETTERS = {
+    'full_path': FileCatalog.full_path,
+    'filename': lambda c, i: c.names[i],
+    'relative_path': FileCatalog.relative_path,
+    'created_date': lambda c, i: datetime.fromtimestamp(c.ctimes[i]),
+    'size_bytes': lambda c, i: c.sizes[i],
+    'size_mb': lambda c, i: round(c.sizes[i] / (1024 * 1024), 2),
+    'extension': lambda c, i: c.extensions[c.ext_ids[i]],
+    'directory': lambda c, i: c.root,
+    'mtime_ns': lambda c, i: c.mtimes_ns[i],
+    'inode': lambda c, i: c.inodes[i],
+    'hash': lambda c, i: c.hashes[i],
+    'tags': FileCatalog.tags,
+    'raw_tags_count': lambda c, i: c.raw_tag_counts[i],
+    'smart_tags_count': lambda c, i: len(c.tags(i)),
+    'duplicate_group': FileCatalog.duplicate_group,
+}
+
+# Поля, которые заполняют хеширование, поиск дубликатов и разметка тегами
+_SETTERS = {
+    'hash': _set_hash,
+    'tags': FileCatalog.set_tags,
+    'raw_tags_count': _set_raw_tags_count,
+    'smart_tags_count': _ignore,  # вычисляется из тегов
+    'duplicate_group': FileCatalog.set_duplicate_group,
+}
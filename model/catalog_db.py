@@ -0,0 +1,295 @@
+"""
+МОДЕЛЬ: База каталога файлов для поиска после сканирования
+SQLite с индексами по расширению, размеру, дате изменения, хешу и тегам
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+from config import DATA_DIR, ensure_directories
+
+
+class CatalogDB:
+    """
+    Результаты анализа в SQLite.
+    Файл определяется парой (корень, относительный путь): повторное
+    сканирование того же корня обновляет записи, а не дублирует их.
+    Теги - в отдельной таблице связей, поэтому поиск по тегу идет по индексу.
+    """
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, db_path: Union[str, Path, None] = None):
+        """db_path: файл базы (по умолчанию DATA_DIR/catalog.sqlite)"""
+        if db_path is None:
+            ensure_directories()
+        self.db_path = str(db_path or DATA_DIR / "catalog.sqlite")
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS scans (
+                id INTEGER PRIMARY KEY,
+                root TEXT NOT NULL,
+                started TEXT NOT NULL,
+                finished TEXT,
+                files INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                root TEXT NOT NULL,
+                path TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                extension TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER,
+                created TEXT,
+                hash TEXT,
+                category TEXT,
+                duplicate_group TEXT,
+                scan_id INTEGER NOT NULL REFERENCES scans(id),
+                seq INTEGER NOT NULL,
+                UNIQUE (root, path)
+            );
+            CREATE INDEX IF NOT EXISTS idx_files_extension_size ON files(extension, size);
+            CREATE INDEX IF NOT EXISTS idx_files_size ON files(size);
+            CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime_ns);
+            CREATE INDEX IF NOT EXISTS idx_files_hash ON files(hash);
+            CREATE INDEX IF NOT EXISTS idx_files_scan_seq ON files(scan_id, seq);
+            CREATE TABLE IF NOT EXISTS tags (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS file_tags (
+                tag_id INTEGER NOT NULL REFERENCES tags(id),
+                file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+                PRIMARY KEY (tag_id, file_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_file_tags_file ON file_tags(file_id);
+        """)
+        self.conn.commit()
+
+        self.scan_id = None
+        self.root = None
+        self.roots = []
+        self._tag_ids = {}
+        self._batch = []
+        self.files_added = 0
+
+    # --- Запись -----------------------------------------------------------
+
+    def begin_scan(self, root: str, *more_roots: str) -> int:
+        """
+        Начинает запись результатов сканирования root.
+        more_roots: другие корни того же запуска - их строки передают
+        корень в поле 'root' (иначе строка относится к root)
+        """
+        self.roots = [os.path.abspath(path) for path in (root,) + more_roots]
+        self.root = self.roots[0]
+        cursor = self.conn.execute(
+            "INSERT INTO scans (root, started) VALUES (?, ?)",
+            (os.pathsep.join(self.roots), datetime.now().isoformat(timespec='seconds'))
+        )
+        self.conn.commit()
+        self.scan_id = cursor.lastrowid
+        self.files_added = 0
+        return self.scan_id
+
+    def add_file(self, file_data: Dict, seq: int):
+        """
+        Добавляет строку отчета (как у ExcelWriter.add_file_data).
+        seq - номер файла в потоке разметки: по нему применяются поправки тегов.
+        """
+        self._batch.append((file_data, seq))
+        if len(self._batch) >= self.BATCH_SIZE:
+            self._flush()
+
+    def retag(self, seq: int, tags: Sequence[str]):
+        """Заменяет теги файла с номером seq текущего сканирования"""
+        self._flush()
+        row = self.conn.execute(
+            "SELECT id FROM files WHERE scan_id = ? AND seq = ?", (self.scan_id, seq)
+        ).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM file_tags WHERE file_id = ?", (row[0],))
+            self._insert_tags([(row[0], tags)])
+
+    def finish_scan(self, complete: bool = True, roots: Optional[Sequence[str]] = None):
+        """
+        Завершает запись. complete - обход прошел целиком за этот запуск:
+        тогда записи корня, не встретившиеся в нем, удаляются как удаленные файлы.
+        roots: корни, обойденные целиком (по умолчанию все корни сканирования)
+        """
+        self._flush()
+        if complete:
+            complete_roots = self.roots if roots is None else [os.path.abspath(r) for r in roots]
+            self.conn.executemany(
+                "DELETE FROM files WHERE root = ? AND scan_id != ?",
+                ((root, self.scan_id) for root in complete_roots)
+            )
+        self.conn.execute(
+            "UPDATE scans SET finished = ?, files = ? WHERE id = ?",
+            (datetime.now().isoformat(timespec='seconds'), self.files_added, self.scan_id)
+        )
+        self.conn.commit()
+
+    def _flush(self):
+        """Записывает накопленные строки одной транзакцией"""
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+
+        rows = []
+        for file_data, seq in batch:
+            created = file_data.get('created')
+            rows.append((
+                file_data.get('root') or self.root,
+                file_data.get('relative_path', file_data.get('path', '')),
+                file_data.get('filename', ''),
+                file_data.get('extension', ''),
+                file_data.get('size', 0),
+                file_data.get('mtime_ns'),
+                created.isoformat(timespec='seconds') if created else None,
+                file_data.get('hash') or None,
+                file_data.get('category', ''),
+                file_data.get('duplicate_group') or None,
+                self.scan_id,
+                seq,
+            ))
+
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO files (root, path, filename, extension, size, mtime_ns, created,
+                                   hash, category, duplicate_group, scan_id, seq)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (root, path) DO UPDATE SET
+                    filename = excluded.filename, extension = excluded.extension,
+                    size = excluded.size, mtime_ns = excluded.mtime_ns,
+                    created = excluded.created, hash = excluded.hash,
+                    category = excluded.category, duplicate_group = excluded.duplicate_group,
+                    scan_id = excluded.scan_id, seq = excluded.seq
+            """, rows)
+
+            seqs = [seq for _, seq in batch]
+            ids = dict(self.conn.execute(
+                "SELECT seq, id FROM files WHERE scan_id = ? AND seq BETWEEN ? AND ?",
+                (self.scan_id, min(seqs), max(seqs))
+            ).fetchall())
+            file_ids = [ids[seq] for seq in seqs]
+
+            self.conn.executemany(
+                "DELETE FROM file_tags WHERE file_id = ?", ((file_id,) for file_id in file_ids)
+            )
+            self._insert_tags(
+                (file_id, file_data.get('tags', []))
+                for file_id, (file_data, _) in zip(file_ids, batch)
+            )
+        self.files_added += len(batch)
+
+    def _insert_tags(self, file_tags):
+        """Связи файл-тег; номера тегов кэшируются на время жизни объекта"""
+        pairs = []
+        for file_id, tags in file_tags:
+            for tag in set(tags):
+                tag_id = self._tag_ids.get(tag)
+                if tag_id is None:
+                    self.conn.execute("INSERT OR IGNORE INTO tags (name) VALUES (?)", (tag,))
+                    tag_id = self.conn.execute(
+                        "SELECT id FROM tags WHERE name = ?", (tag,)
+                    ).fetchone()[0]
+                    self._tag_ids[tag] = tag_id
+                pairs.append((tag_id, file_id))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO file_tags (tag_id, file_id) VALUES (?, ?)", pairs
+        )
+
+    # --- Поиск ------------------------------------------------------------
+
+    def query(self, extension: Optional[str] = None,
+              min_size: Optional[int] = None, max_size: Optional[int] = None,
+              tags: Optional[Sequence[str]] = None,
+              modified_after: Optional[datetime] = None,
+              modified_before: Optional[datetime] = None,
+              file_hash: Optional[str] = None,
+              root: Optional[str] = None,
+              name_like: Optional[str] = None,
+              limit: Optional[int] = 100) -> List[Dict]:
+        """
+        Ищет файлы по условиям (все условия - через И).
+        tags: файл должен иметь все перечисленные теги
+        name_like: шаблон имени в синтаксисе LIKE ('%отчет%')
+        Возвращает записи с тегами, крупные файлы - первыми.
+        """
+        where = []
+        params = []
+        if extension:
+            ext = extension.lower()
+            where.append("f.extension = ?")
+            params.append(ext if ext.startswith('.') else '.' + ext)
+        if min_size is not None:
+            where.append("f.size >= ?")
+            params.append(min_size)
+        if max_size is not None:
+            where.append("f.size <= ?")
+            params.append(max_size)
+        if modified_after:
+            where.append("f.mtime_ns >= ?")
+            params.append(int(modified_after.timestamp() * 1e9))
+        if modified_before:
+            where.append("f.mtime_ns < ?")
+            params.append(int(modified_before.timestamp() * 1e9))
+        if file_hash:
+            where.append("f.hash = ?")
+            params.append(file_hash.lower())
+        if root:
+            where.append("f.root = ?")
+            params.append(os.path.abspath(root))
+        if name_like:
+            where.append("f.filename LIKE ?")
+            params.append(name_like)
+        for tag in tags or []:
+            where.append(
+                "f.id IN (SELECT ft.file_id FROM file_tags ft "
+                "JOIN tags t ON t.id = ft.tag_id WHERE t.name = ?)"
+            )
+            params.append(tag)
+
+        sql = "SELECT f.* FROM files f"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY f.size DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        results = [dict(row) for row in self.conn.execute(sql, params)]
+        self._attach_tags(results)
+        return results
+
+    def _attach_tags(self, results: List[Dict]):
+        """Добавляет к найденным записям списки тегов"""
+        by_id = {record['id']: record for record in results}
+        for record in results:
+            record['tags'] = []
+        ids = list(by_id)
+        # Ограничение SQLite на число параметров запроса
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self.conn.execute(
+                "SELECT ft.file_id, t.name FROM file_tags ft JOIN tags t ON t.id = ft.tag_id "
+                f"WHERE ft.file_id IN ({','.join('?' * len(chunk))}) ORDER BY t.name",
+                chunk
+            )
+            for file_id, name in rows:
+                by_id[file_id]['tags'].append(name)
+
+    def close(self):
+        """Сохраняет изменения и закрывает базу"""
+        self._flush()
+        self.conn.commit()
+        self.conn.close()
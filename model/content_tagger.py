@@ -0,0 +1,297 @@
+"""
+МОДЕЛЬ: Теги по содержимому файлов
+Читается только начало файла (ограничение в байтах или страницах),
+разбор идет в пуле потоков, результаты кэшируются по файлу и его хешу
+"""
+
+import os
+import re
+import html
+import codecs
+import sqlite3
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from config import DATA_DIR, ensure_directories
+from model.hash_engine import HASH_ERROR
+from model.tag_engine import TagTokenizer
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+TEXT_EXTENSIONS = {'.txt', '.py', '.md', '.csv', '.log'}
+OFFICE_EXTENSIONS = {'.docx', '.xlsx'}
+
+# Слова текста: только буквы, от 3 символов; цифры - отдельно (годы, номера)
+WORD = re.compile(r'[^\W\d_]{3,}|№?\d{3,}')
+DOCX_PARAGRAPH_END = re.compile(r'</w:p>')
+DOCX_TEXT = re.compile(r'<w:t(?:\s[^>]*)?>([^<]*)</w:t>')
+XLSX_TEXT = re.compile(r'<t(?:\s[^>]*)?>([^<]*)</t>')
+XLSX_TEXT_PARTS = ['xl/sharedStrings.xml', 'xl/worksheets/sheet1.xml']
+
+# XML разметка занимает больше места, чем сам текст
+XML_OVERHEAD = 8
+
+# Версия извлечения текста и подсчета категорий: увеличить при изменении
+# read_text/tags_for_text, чтобы кэш не отдавал теги по старым правилам
+CONTENT_RULES_VERSION = 1
+
+
+def pdf_available() -> bool:
+    """Можно ли извлекать текст из PDF (нужен pypdf)"""
+    return PdfReader is not None
+
+
+def supported_extensions() -> List[str]:
+    """Расширения, для которых есть извлечение текста"""
+    extensions = sorted(TEXT_EXTENSIONS | OFFICE_EXTENSIONS)
+    if pdf_available():
+        extensions.append('.pdf')
+    return extensions
+
+
+def read_text(path: str, extension: str, max_bytes: int, max_pages: int) -> str:
+    """Начало текста файла; выполняется в потоках пула"""
+    if extension in TEXT_EXTENSIONS:
+        with open(path, 'rb') as f:
+            data = f.read(max_bytes)
+        # Хвост может оборваться посреди символа - декодер его не требует
+        try:
+            return codecs.getincrementaldecoder('utf-8')().decode(data)
+        except UnicodeDecodeError:
+            return data.decode('cp1251', errors='replace')
+
+    if extension == '.docx':
+        with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as f:
+            xml = f.read(max_bytes * XML_OVERHEAD).decode('utf-8', errors='ignore')
+        # Слово бывает разбито на несколько фрагментов <w:t> внутри абзаца
+        paragraphs = (''.join(DOCX_TEXT.findall(part)) for part in DOCX_PARAGRAPH_END.split(xml))
+        return html.unescape('\n'.join(paragraphs))[:max_bytes]
+
+    if extension == '.xlsx':
+        # Текст ячеек - в общей таблице строк (Excel) или прямо
+        # в ячейках листа (inlineStr, так пишет openpyxl)
+        texts = []
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+            for name in XLSX_TEXT_PARTS:
+                if name not in names:
+                    continue
+                with archive.open(name) as f:
+                    xml = f.read(max_bytes * XML_OVERHEAD).decode('utf-8', errors='ignore')
+                texts.extend(XLSX_TEXT.findall(xml))
+        return html.unescape(' '.join(texts))[:max_bytes]
+
+    if extension == '.pdf' and PdfReader is not None:
+        reader = PdfReader(path)
+        pages = []
+        for page in reader.pages[:max_pages]:
+            pages.append(page.extract_text() or '')
+        return '\n'.join(pages)[:max_bytes]
+
+    return ''
+
+
+class ContentTagger:
+    """
+    Добавляет к тегам файла категории, найденные в его тексте
+    (договор, отчет, фамилии, годы, номера документов) - те же,
+    что SmartTagEngine находит в именах файлов.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024, max_pages: int = 2,
+                 workers: int = 4, max_tags: int = 5, min_hits: int = 2,
+                 cache_db: Union[str, Path, None] = None,
+                 tokenizer: Optional[TagTokenizer] = None):
+        """
+        max_bytes: сколько байт текста читать с начала файла
+        max_pages: сколько страниц читать из PDF
+        workers: потоков для чтения и разбора файлов
+        max_tags: не больше стольких тегов по содержимому на файл
+        min_hits: сколько раз категория должна встретиться в тексте
+        cache_db: кэш результатов (по умолчанию DATA_DIR/content_tags.sqlite)
+        tokenizer: категоризация слов (по умолчанию как в SmartTagEngine)
+        """
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.workers = max(1, workers)
+        self.max_tags = max_tags
+        self.min_hits = min_hits
+        self.tokenizer = tokenizer or TagTokenizer(
+            {'в', 'на', 'для', 'из', 'от', 'по', 'и', 'или', 'не'}
+        )
+        self.extensions = set(supported_extensions())
+        self.errors = []
+        self.stats = Counter()
+        # Результат из кэша годится, только если он получен с теми же
+        # ограничениями чтения и правилами
+        self.params = (f"v{CONTENT_RULES_VERSION}:{max_bytes}:{max_pages}:"
+                       f"{max_tags}:{min_hits}:{self.tokenizer.version}")
+        self._added_batch = []
+
+        if cache_db is None:
+            ensure_directories()
+        self.db_path = str(cache_db or DATA_DIR / "content_tags.sqlite")
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS content_tags (
+                key TEXT PRIMARY KEY,
+                tags TEXT NOT NULL,
+                params TEXT
+            )
+        """)
+        # Кэш до учета параметров: записи без params не совпадут и перечитаются
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(content_tags)")}
+        if 'params' not in columns:
+            self.conn.execute("ALTER TABLE content_tags ADD COLUMN params TEXT")
+        # Теги по содержимому файлов потока (номер -> теги) - во временной
+        # таблице, а не в памяти: нужны только для поправок финального прохода
+        self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS added (position INTEGER PRIMARY KEY, tags TEXT)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def cache_keys(file_info: Dict) -> List[str]:
+        """
+        Ключи кэша: размер, mtime и путь файла, а если хеш уже посчитан -
+        еще и хеш (одинаковые файлы разбираются один раз)
+        """
+        keys = [f"{file_info['size_bytes']}:{file_info['mtime_ns']}:"
+                f"{os.path.abspath(file_info['full_path'])}"]
+        file_hash = file_info.get('hash')
+        if file_hash and file_hash != HASH_ERROR:
+            keys.append(f"hash:{file_hash}")
+        return keys
+
+    @staticmethod
+    def merge(tags: Sequence[str], content_tags: Optional[Sequence[str]]) -> List[str]:
+        """
+        Теги по имени + теги по содержимому без повторов.
+        "прочее" ставится, когда тегов мало, - с тегами из текста оно не нужно.
+        """
+        if not content_tags:
+            return list(tags)
+        merged = [tag for tag in tags if tag != "прочее"]
+        merged.extend(tag for tag in content_tags if tag not in merged)
+        return merged
+
+    def tags_for_text(self, text: str) -> List[str]:
+        """Категории, встретившиеся в тексте не меньше min_hits раз"""
+        categorize = self.tokenizer.categorize
+        hits = Counter()
+        words = Counter(WORD.findall(text))
+        for word, count in words.items():
+            category = categorize(word)
+            # Шаблон фамилий без учета регистра ловит и обычные слова
+            # ("новая", "которая") - в тексте фамилия пишется с большой буквы
+            if category == 'человек_фамилия' and not word[0].isupper():
+                continue
+            if category:
+                hits[category] += count
+        return [tag for tag, count in hits.most_common(self.max_tags) if count >= self.min_hits]
+
+    def _extract(self, path: str, extension: str) -> Optional[List[str]]:
+        """Теги одного файла (в потоке пула); None - файл не прочитан"""
+        try:
+            return self.tags_for_text(read_text(path, extension, self.max_bytes, self.max_pages))
+        except Exception as e:
+            self.errors.append(f"Ошибка чтения содержимого {path}: {str(e)}")
+            return None
+
+    def tag_stream(self, files: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Дополняет теги файлов потока тегами по содержимому.
+        Порядок файлов сохраняется; в работе держится не больше
+        workers * 4 файлов, поэтому обход и разметка по именам идут дальше,
+        пока пул читает содержимое.
+        Добавленные теги по номеру файла в потоке - added_tags().
+        """
+        self.conn.execute("DELETE FROM added")
+        window = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for position, file_info in enumerate(files):
+                window.append((position, file_info, self._submit(executor, file_info)))
+                while len(window) > self.workers * 4:
+                    yield self._finish(*window.popleft())
+            while window:
+                yield self._finish(*window.popleft())
+        self._flush_added()
+        self.conn.commit()
+
+    def added_tags(self, positions: Iterable[int]) -> Dict[int, List[str]]:
+        """Теги по содержимому, добавленные файлам потока с номерами positions"""
+        self._flush_added()
+        positions = list(positions)
+        found = {}
+        # Параметров в одном запросе SQLite - не больше 999
+        for start in range(0, len(positions), 900):
+            batch = positions[start:start + 900]
+            rows = self.conn.execute(
+                f"SELECT position, tags FROM added WHERE position IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            for position, tags in rows:
+                found[position] = tags.split('\t')
+        return found
+
+    def _flush_added(self):
+        """Сбрасывает накопленные добавленные теги во временную таблицу"""
+        if self._added_batch:
+            self.conn.executemany("INSERT OR REPLACE INTO added (position, tags) VALUES (?, ?)",
+                                  self._added_batch)
+            self._added_batch = []
+
+    def _submit(self, executor, file_info: Dict):
+        """Кэшированный результат или задание пулу (None - файл не разбирается)"""
+        extension = file_info['extension']
+        if extension not in self.extensions or not file_info['size_bytes']:
+            return None
+
+        keys = self.cache_keys(file_info)
+        rows = self.conn.execute(
+            f"SELECT tags FROM content_tags WHERE key IN ({','.join('?' * len(keys))}) "
+            "AND params = ?",
+            keys + [self.params]
+        ).fetchall()
+        if rows:
+            self.stats['cache_hits'] += 1
+            return rows[0][0].split('\t') if rows[0][0] else []
+
+        self.stats['files_read'] += 1
+        return keys, executor.submit(self._extract, file_info['full_path'], extension)
+
+    def _finish(self, position: int, file_info: Dict, pending) -> Dict:
+        """Дожидается результата файла и дополняет его теги"""
+        if isinstance(pending, tuple):
+            keys, future = pending
+            content_tags = future.result()
+            if content_tags is not None:
+                tags = '\t'.join(content_tags)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO content_tags (key, tags, params) VALUES (?, ?, ?)",
+                    ((key, tags, self.params) for key in keys)
+                )
+        else:
+            content_tags = pending
+
+        if content_tags:
+            file_info['tags'] = self.merge(file_info.get('tags', []), content_tags)
+            file_info['smart_tags_count'] = len(file_info['tags'])
+            self._added_batch.append((position, '\t'.join(content_tags)))
+            if len(self._added_batch) >= 1000:
+                self._flush_added()
+            self.stats['files_tagged'] += 1
+        return file_info
+
+    def close(self):
+        """Сохраняет кэш и закрывает базу"""
+        self.conn.commit()
+        self.conn.close()
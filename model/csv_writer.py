@@ -0,0 +1,50 @@
+"""
+МОДЕЛЬ: Отчет в CSV
+"""
+
+import csv
+from typing import Dict, List
+
+from model.report_writer import StreamingReportWriter
+
+
+class CsvWriter(StreamingReportWriter):
+    """
+    Потоковый CSV: строка пишется сразу при добавлении, без предела
+    строк Excel. UTF-8 с BOM - чтобы Excel открывал кириллицу без настройки.
+    """
+
+    EXTENSION = ".csv"
+
+    def __init__(self, delimiter: str = ','):
+        """delimiter: разделитель колонок (';' - для Excel с русской локалью)"""
+        super().__init__()
+        self.delimiter = delimiter
+        self._file = None
+        self._writer = None
+
+    def _open(self, path: str):
+        self._file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file, delimiter=self.delimiter)
+        self._writer.writerow(self.HEADERS)
+
+    def _write(self, file_data: Dict):
+        self._writer.writerow(self._build_row(file_data))
+
+    def _rewrite(self, source: str, target: str, tags_by_row: Dict[int, List[str]]):
+        tags_column = self.HEADERS.index("Tags")
+        with open(source, 'r', encoding='utf-8-sig', newline='') as src, \
+                open(target, 'w', encoding='utf-8-sig', newline='') as dst:
+            reader = csv.reader(src, delimiter=self.delimiter)
+            writer = csv.writer(dst, delimiter=self.delimiter)
+            writer.writerow(next(reader))
+            for row_number, row in enumerate(reader):
+                tags = tags_by_row.get(row_number)
+                if tags is not None:
+                    row[tags_column] = ', '.join(tags)
+                writer.writerow(row)
+
+    def _close(self):
+        self._file.close()
+        self._file = None
+        self._writer = None
@@ -0,0 +1,127 @@
+"""
+МОДЕЛЬ: Поиск дубликатов файлов
+Поэтапно: размер -> хеш начала и конца -> полный хеш
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from model.hash_engine import HashEngine, HASH_ERROR
+
+
+class DuplicateFinder:
+    """
+    Находит группы одинаковых файлов и заполняет у записей 'duplicate_group'.
+    Полностью читаются только файлы, совпавшие по размеру и по частичному хешу.
+    """
+
+    def __init__(self, hash_engine: Optional[HashEngine] = None,
+                 partial_bytes: int = 64 * 1024, min_size: int = 1):
+        """
+        hash_engine: пул для хеширования (по умолчанию - новый HashEngine)
+        partial_bytes: сколько байт читать с начала и с конца файла на втором этапе
+        min_size: файлы меньше этого размера не сравниваются (пустые файлы)
+        """
+        self.hash_engine = hash_engine or HashEngine()
+        self.partial_bytes = partial_bytes
+        self.min_size = min_size
+        self.stats = {}
+        self.hashed = []
+
+    def find(self, files: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        Ищет дубликаты среди записей сканера (нужны 'full_path' и 'size_bytes').
+        Возвращает {id группы: записи}. Id группы - начало полного хеша,
+        поэтому он не меняется между запусками.
+        Уже известные хеши (из кэша сканирования) не пересчитываются;
+        записи с хешами, посчитанными здесь, - в self.hashed.
+        """
+        self.hashed = []
+        # 1. Группировка по размеру - без чтения файлов
+        by_size = defaultdict(list)
+        for file_info in files:
+            if file_info['size_bytes'] >= self.min_size:
+                by_size[file_info['size_bytes']].append(file_info)
+        size_candidates = [group for group in by_size.values() if len(group) > 1]
+
+        # 2. Хеш начала и конца файла. Если у кого-то в группе полный хеш
+        # уже известен, сравнивать придется по полному - частичный не нужен
+        by_path = {}
+        full_candidates = []
+        for group in size_candidates:
+            if any(_known_hash(file_info) for file_info in group):
+                full_candidates.append(group)
+                continue
+            for file_info in group:
+                by_path[file_info['full_path']] = file_info
+
+        partial = {}
+        for path, digest in self.hash_engine.partial_hash_files(by_path, self.partial_bytes):
+            partial[path] = digest
+
+        for group in size_candidates:
+            if group[0]['full_path'] not in by_path:
+                continue
+            by_partial = defaultdict(list)
+            for file_info in group:
+                digest = partial[file_info['full_path']]
+                if digest != HASH_ERROR:
+                    by_partial[digest].append(file_info)
+            full_candidates.extend(g for g in by_partial.values() if len(g) > 1)
+
+        # 3. Полный хеш только для оставшихся кандидатов.
+        # Маленькие файлы частичный хеш уже прочитал целиком.
+        to_hash = {}
+        full = {}
+        for group in full_candidates:
+            for file_info in group:
+                path = file_info['full_path']
+                if _known_hash(file_info):
+                    full[path] = file_info['hash']
+                elif path in partial and file_info['size_bytes'] <= 2 * self.partial_bytes:
+                    full[path] = partial[path]
+                    file_info['hash'] = partial[path]
+                    self.hashed.append(file_info)
+                else:
+                    to_hash[path] = file_info
+
+        for path, digest in self.hash_engine.hash_files(to_hash):
+            full[path] = digest
+            if digest != HASH_ERROR:
+                to_hash[path]['hash'] = digest
+                self.hashed.append(to_hash[path])
+
+        duplicates = {}
+        for group in full_candidates:
+            by_full = defaultdict(list)
+            for file_info in group:
+                digest = full[file_info['full_path']]
+                if digest != HASH_ERROR:
+                    by_full[digest].append(file_info)
+
+            for digest, same in by_full.items():
+                if len(same) < 2:
+                    continue
+                group_id = digest[:12]
+                for file_info in same:
+                    file_info['duplicate_group'] = group_id
+                duplicates[group_id] = same
+
+        self.stats = {
+            'files': len(files),
+            'size_candidates': len(by_path),
+            'full_candidates': sum(len(g) for g in full_candidates),
+            'fully_hashed': len(to_hash),
+            'duplicate_groups': len(duplicates),
+            'duplicate_files': sum(len(g) for g in duplicates.values()),
+            # Прочитано с диска: начало и конец кандидатов + полные хеши
+            'bytes_read': sum(min(f['size_bytes'], 2 * self.partial_bytes)
+                              for f in by_path.values())
+                          + sum(f['size_bytes'] for f in to_hash.values()),
+        }
+        return duplicates
+
+
+def _known_hash(file_info: Dict) -> bool:
+    """Полный хеш файла уже посчитан"""
+    return file_info.get('hash') not in (None, '', HASH_ERROR)
@@ -1,99 +1,171 @@
 import os
+import json
+import tempfile
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
-from datetime import datetime
+from openpyxl.utils import get_column_letter
 
-class ExcelWriter:
-    def __init__(self):
-        self.wb = Workbook()
-        self.ws = self.wb.active
-        self.ws.title = "File Analysis"
-        self._setup_header()
+from model.report_writer import ReportWriter
+from utils.helpers import ColumnWidthTracker
+
+# Предел строк на листе Excel (включая заголовок)
+EXCEL_MAX_ROWS = 1_048_576
+
+
+class ExcelWriter(ReportWriter):
+    SHEET_TITLE = "File Analysis"
+    EXTENSION = ".xlsx"
+    
+    def __init__(self, write_only: bool = False, max_rows: int = EXCEL_MAX_ROWS,
+                 auto_adjust_columns: bool = True, width_sample_rows: int = 1000):
+        """
+        write_only: потоковая запись (openpyxl write_only) - строки не держатся
+            в памяти: до save() они копятся во временном файле (чтобы retag
+            мог исправить теги), а в книгу пишутся при сохранении
+        max_rows: строк на листе, включая заголовок; при переполнении
+            создается следующий лист (только в режиме write_only)
+        auto_adjust_columns: подгонять ширину колонок под содержимое
+        width_sample_rows: в режиме write_only ширина задается до записи
+            первой строки, поэтому считается по первым width_sample_rows строкам
+        """
+        super().__init__()
+        self.write_only = write_only
+        self.max_rows = max_rows
+        self.auto_adjust_columns = auto_adjust_columns
+        self.width_sample_rows = width_sample_rows
+        self.width_tracker = ColumnWidthTracker(len(self.HEADERS))
+        self.width_tracker.update(self.HEADERS)
+        
+        self._retags = {}
+        if write_only:
+            self.wb = Workbook(write_only=True)
+            self.sheet_count = 0
+            self._widths = None
+            self._spool = None
+            self._new_sheet()
+        else:
+            self.wb = Workbook()
+            self.ws = self.wb.active
+            self.ws.title = self.SHEET_TITLE
+            self._setup_header()
+    
+    def _new_sheet(self):
+        """Создает очередной лист в режиме write_only"""
+        self.sheet_count += 1
+        title = self.SHEET_TITLE
+        if self.sheet_count > 1:
+            title = f"{self.SHEET_TITLE} ({self.sheet_count})"
+        
+        self.ws = self.wb.create_sheet(title)
+        self.rows_in_sheet = 1
+        
+        # Заголовок пишется, когда ширина колонок уже известна
+        if self._widths is not None:
+            self._start_sheet()
+    
+    def _start_sheet(self):
+        """Задает ширину колонок и пишет заголовок write_only листа"""
+        self._apply_widths(self._widths)
+        self.ws.append(self._header_cells())
+    
+    def _header_cells(self):
+        """Стилизованные ячейки заголовка для write_only листа"""
+        cells = []
+        for header in self.HEADERS:
+            cell = WriteOnlyCell(self.ws, value=header)
+            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+            cell.font = Font(color="FFFFFF", bold=True)
+            cell.alignment = Alignment(horizontal="center")
+            cells.append(cell)
+        return cells
     
     def _setup_header(self):
         """Настройка заголовков таблицы"""
-        headers = [
-            "File Name", "Path", "Size (KB)", 
-            "Extension", "Created", "Modified",
-            "Tags", "Category", "Duplicate Group"
-        ]
-        
-        for col, header in enumerate(headers, 1):
+        for col, header in enumerate(self.HEADERS, 1):
             cell = self.ws.cell(row=1, column=col, value=header)
             cell.font = Font(bold=True)
             cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
             cell.font = Font(color="FFFFFF", bold=True)
             cell.alignment = Alignment(horizontal="center")
     
+    def _apply_widths(self, widths):
+        """Применяет ширину колонок к текущему листу"""
+        for col, width in enumerate(widths, 1):
+            self.ws.column_dimensions[get_column_letter(col)].width = width
+    
     def add_file_data(self, file_data):
         """Добавление данных о файле в таблицу"""
-        row = self.ws.max_row + 1
-        
-        self.ws.cell(row=row, column=1, value=file_data.get('filename', ''))
-        self.ws.cell(row=row, column=2, value=file_data.get('path', ''))
-        self.ws.cell(row=row, column=3, value=file_data.get('size_kb', 0))
-        self.ws.cell(row=row, column=4, value=file_data.get('extension', ''))
-        
-        # Форматирование дат
-        created = file_data.get('created')
-        if created:
-            self.ws.cell(row=row, column=5, value=created.strftime('%Y-%m-%d %H:%M:%S'))
-        
-        modified = file_data.get('modified')
-        if modified:
-            self.ws.cell(row=row, column=6, value=modified.strftime('%Y-%m-%d %H:%M:%S'))
+        row = self._build_row(file_data)
+        self.rows_written += 1
         
-        self.ws.cell(row=row, column=7, value=', '.join(file_data.get('tags', [])))
-        self.ws.cell(row=row, column=8, value=file_data.get('category', ''))
-        self.ws.cell(row=row, column=9, value=file_data.get('duplicate_group', ''))
+        if not self.write_only:
+            self.ws.append(row)
+            if self.auto_adjust_columns:
+                self.width_tracker.update(row)
+            return
         
-        # Автоматическая подгонка ширины колонок
-        for column in self.ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            self.ws.column_dimensions[column_letter].width = adjusted_width
+        # Ширина колонок - по первым width_sample_rows строкам
+        if self.rows_written <= self.width_sample_rows:
+            self.width_tracker.update(row)
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._spool.write(json.dumps(row, ensure_ascii=False))
+        self._spool.write('\n')
+    
+    def retag(self, tags_by_row):
+        """Заменяет теги уже добавленных строк (номер строки - с нуля)"""
+        if self.write_only:
+            # Строки еще во временном файле - теги заменятся при записи в книгу
+            self._retags.update(tags_by_row)
+            return
+        tags_column = self.HEADERS.index("Tags") + 1
+        for row_number, tags in tags_by_row.items():
+            value = ', '.join(tags)
+            self.ws.cell(row=row_number + 2, column=tags_column, value=value)
+            if self.auto_adjust_columns:
+                self.width_tracker.update([None] * (tags_column - 1) + [value])
+    
+    def _append_row(self, row):
+        """Добавляет строку в write_only лист, при переполнении начинает новый"""
+        if self.rows_in_sheet >= self.max_rows:
+            self._new_sheet()
+        self.ws.append(row)
+        self.rows_in_sheet += 1
+    
+    def _write_spooled(self):
+        """Записывает накопленные строки в write_only книгу с исправленными тегами"""
+        self._widths = self.width_tracker.widths() if self.auto_adjust_columns else []
+        self._start_sheet()
+        if self._spool is None:
+            return
+        tags_column = self.HEADERS.index("Tags")
+        self._spool.seek(0)
+        for row_number, line in enumerate(self._spool):
+            row = json.loads(line)
+            tags = self._retags.get(row_number)
+            if tags is not None:
+                row[tags_column] = ', '.join(tags)
+            self._append_row(row)
+        self._spool.close()
+        self._spool = None
+        self._retags = {}
     
     def save(self, target_directory, analysis_name=None):
         """
         Сохраняет Excel файл рядом с анализируемой папкой
+        (или по пути, переданному в begin)
         
         Args:
             target_directory: путь к анализируемой папке
             analysis_name: название анализа (необязательно)
         """
-        # Генерируем имя файла с временной меткой
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        if analysis_name:
-            filename = f"file_analysis_{analysis_name}_{timestamp}.xlsx"
-        else:
-            # Используем имя папки для названия файла
-            folder_name = os.path.basename(os.path.normpath(target_directory))
-            filename = f"file_analysis_{folder_name}_{timestamp}.xlsx"
-        
-        # Сохраняем в той же директории, где находится анализируемая папка
-        # (на уровень выше, если нужно прямо рядом)
-        parent_dir = os.path.dirname(target_directory)
-        
-        # Если анализируется корневая директория, сохраняем в нее
-        if parent_dir == '':
-            parent_dir = target_directory
-        
-        filepath = os.path.join(parent_dir, filename)
+        if self.write_only:
+            if self._widths is None:
+                self._write_spooled()
+        elif self.auto_adjust_columns:
+            # Ширина колонок применяется один раз, а не после каждой строки
+            self._apply_widths(self.width_tracker.widths())
         
-        try:
-            self.wb.save(filepath)
-            return filepath
-        except Exception as e:
-            # Если не удалось сохранить в указанную директорию,
-            # сохраняем в текущей рабочей директории
-            print(f"Warning: Could not save to {parent_dir}: {e}")
-            fallback_path = os.path.join(os.getcwd(), filename)
-            self.wb.save(fallback_path)
-            return fallback_path
\ No newline at end of file
+        filepath = self.report_path(target_directory, analysis_name)
+        return self._save_with_fallback(filepath, self.wb.save)
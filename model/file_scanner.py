@@ -3,72 +3,176 @@
 """
 
 import os
-import hashlib
 import time
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional
+
+from config import DEFAULT_SETTINGS
+from model.hash_engine import HashEngine, HASH_ERROR
+from model.fs_walker import walk_files, FileEntry, WalkState, WalkStats
+from model.catalog import FileCatalog
+from model.scan_checkpoint import ScanCheckpoint
 
 
 class FileScanner:
     """Сканирование файловой системы"""
     
-    def __init__(self):
+    def __init__(self, hash_workers: Optional[int] = None,
+                 hash_use_processes: Optional[bool] = None,
+                 cache=None,
+                 hash_algorithm: Optional[str] = None):
+        """
+        cache: ScanCache - кэш прошлых сканирований, неизмененные файлы не хешируются
+        hash_algorithm: алгоритм хеширования (по умолчанию из DEFAULT_SETTINGS)
+        """
         self.errors = []
+        self.cache = cache
+        self.timed_out = False
+        self.resumed = False
+        self.walk_stats = WalkStats()
+        self._checkpoint = None
+        self._walk_state = None
+        if hash_algorithm is None:
+            hash_algorithm = DEFAULT_SETTINGS["hash_algorithm"]
+        if hash_workers is None:
+            hash_workers = DEFAULT_SETTINGS["hash_workers"]
+        if hash_use_processes is None:
+            hash_use_processes = DEFAULT_SETTINGS["hash_use_processes"]
+        self.hash_engine = HashEngine(
+            algorithm=hash_algorithm,
+            workers=hash_workers,
+            use_processes=hash_use_processes,
+            errors=self.errors,
+            large_file_threshold=DEFAULT_SETTINGS["hash_large_file_threshold"],
+            use_mmap=DEFAULT_SETTINGS["hash_use_mmap"]
+        )
     
     def scan_directory(self, directory: str, 
-                      max_seconds: int = 30) -> List[Dict]:
+                      max_seconds: int = 30,
+                      max_depth: Optional[int] = None,
+                      resume: Optional[bool] = None) -> List[Dict]:
         """
         Сканирует директорию и возвращает информацию о файлах
         """
-        results = []
+        return list(self.iter_directory(directory, max_seconds, max_depth, resume))
+    
+    def iter_directory(self, directory: str,
+                       max_seconds: int = 30,
+                       max_depth: Optional[int] = None,
+                       resume: Optional[bool] = None) -> Iterator[Dict]:
+        """
+        Потоковый вариант scan_directory: отдает информацию о файлах
+        по мере обхода, не накапливая список.
+        
+        resume: при остановке по лимиту времени сохранить позицию обхода,
+            а при следующем вызове - продолжить с нее
+            (по умолчанию из DEFAULT_SETTINGS["resume_scans"]).
+            Позиция записывается только commit_checkpoint() - после того,
+            как отданные файлы попали в отчет.
+        """
+        for entry in self._iter_entries(directory, max_seconds, max_depth, resume):
+            # Анализируем файл
+            file_info = self._analyze_file(entry.path, directory,
+                                           entry.rel_path, entry.stat)
+            if file_info:
+                if self.cache:
+                    file_info['hash'] = self.cached_hash(entry.path, entry.stat.st_size,
+                                                         entry.stat.st_mtime_ns, entry.stat.st_ino)
+                yield file_info
+    
+    def scan_catalog(self, directory: str,
+                     max_seconds: int = 30,
+                     max_depth: Optional[int] = None,
+                     resume: Optional[bool] = None) -> FileCatalog:
+        """
+        Как scan_directory, но собирает колоночный FileCatalog вместо
+        списка словарей - для случаев, когда нужны все записи сразу
+        """
+        catalog = FileCatalog(directory)
+        for entry in self._iter_entries(directory, max_seconds, max_depth, resume):
+            index = catalog.add(entry.rel_path, entry.stat)
+            if self.cache:
+                catalog.hashes[index] = self.cached_hash(entry.path, entry.stat.st_size,
+                                                         entry.stat.st_mtime_ns, entry.stat.st_ino)
+        return catalog
+    
+    def _iter_entries(self, directory: str, max_seconds: int,
+                      max_depth: Optional[int], resume: Optional[bool]) -> Iterator[FileEntry]:
+        """Обход с лимитом времени и сохранением позиции при остановке"""
         start_time = time.time()
+        self.timed_out = False
+        self.resumed = False
+        self.walk_stats = WalkStats()
+        
+        if resume is None:
+            resume = DEFAULT_SETTINGS["resume_scans"]
+        checkpoint = ScanCheckpoint(directory) if resume else None
+        state = None
+        self._checkpoint = checkpoint
+        if checkpoint:
+            state, _ = checkpoint.load()
+            if state:
+                self.resumed = True
+                print("Продолжаю сканирование с места остановки")
+            else:
+                state = WalkState()
+        self._walk_state = state
         
         try:
-            for root, dirs, files in os.walk(directory):
-                # Игнорируем скрытые папки
-                dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for index, entry in enumerate(walk_files(directory,
+                                                     ignore_hidden=DEFAULT_SETTINGS["ignore_hidden"],
+                                                     max_depth=max_depth,
+                                                     errors=self.errors,
+                                                     stats=self.walk_stats,
+                                                     state=state)):
+                # Проверяем лимит времени (хотя бы один файл за запуск -
+                # иначе продолженный обход с маленьким лимитом не сдвинется)
+                if index and time.time() - start_time > max_seconds:
+                    print(f"Достигнут лимит времени ({max_seconds}с)")
+                    self.timed_out = True
+                    return
                 
-                for filename in files:
-                    # Проверяем лимит времени
-                    if time.time() - start_time > max_seconds:
-                        print(f"Достигнут лимит времени ({max_seconds}с)")
-                        return results
-                    
-                    # Игнорируем скрытые файлы
-                    if filename.startswith('.'):
-                        continue
-                    
-                    full_path = os.path.join(root, filename)
-                    
-                    if not os.path.isfile(full_path):
-                        continue
-                    
-                    # Анализируем файл
-                    file_info = self._analyze_file(full_path, directory)
-                    if file_info:
-                        results.append(file_info)
-            
-            return results
+                yield entry
             
         except Exception as e:
             self.errors.append(f"Ошибка сканирования: {str(e)}")
-            return results
+    
+    def commit_checkpoint(self):
+        """
+        Фиксирует позицию последнего обхода. Вызывать после записи отчета:
+        если обход остановлен по времени - позиция сохраняется для
+        продолжения, если завершен - удаляется. Без вызова (ошибка записи,
+        прерывание) остается прежняя позиция, и файлы этого запуска
+        будут обработаны снова.
+        """
+        checkpoint, state = self._checkpoint, self._walk_state
+        self._checkpoint = self._walk_state = None
+        if not checkpoint:
+            return
+        if state.finished:
+            checkpoint.clear()
+        elif self.timed_out:
+            checkpoint.save(state)
+            print("Позиция сохранена, следующий запуск продолжит обход")
     
     def _analyze_file(self, full_path: str, 
-                     base_directory: str) -> Optional[Dict]:
-        """Анализирует один файл"""
+                     base_directory: str,
+                     rel_path: Optional[str] = None,
+                     stat: Optional[os.stat_result] = None) -> Optional[Dict]:
+        """
+        Анализирует один файл.
+        rel_path и stat можно передать из обхода, чтобы не делать лишних вызовов.
+        """
         try:
-            stat = os.stat(full_path)
+            if stat is None:
+                stat = os.stat(full_path)
             
             # Базовые метаданные
             filename = os.path.basename(full_path)
-            rel_path = os.path.relpath(full_path, base_directory)
-            
-            try:
-                created_date = datetime.fromtimestamp(os.path.getctime(full_path))
-            except:
-                created_date = datetime.fromtimestamp(stat.st_ctime)
+            if rel_path is None:
+                rel_path = os.path.relpath(full_path, base_directory)
             
+            created_date = datetime.fromtimestamp(stat.st_ctime)
             size_bytes = stat.st_size
             
             return {
@@ -79,21 +183,82 @@ class FileScanner:
                 'size_bytes': size_bytes,
                 'size_mb': round(size_bytes / (1024 * 1024), 2),
                 'extension': os.path.splitext(filename)[1].lower(),
-                'directory': base_directory
+                'directory': base_directory,
+                'mtime_ns': stat.st_mtime_ns,
+                'inode': stat.st_ino
             }
             
         except Exception as e:
             self.errors.append(f"Ошибка анализа {full_path}: {str(e)}")
             return None
     
+    def cached_hash(self, full_path: str, size: int, mtime_ns: int,
+                    inode: int) -> Optional[str]:
+        """
+        Хеш неизмененного файла из кэша (None - файл новый, изменился или
+        хеш еще не считался). Отмечает файл как встреченный в обходе.
+        """
+        cached = self.cache.lookup(os.path.abspath(full_path), size, mtime_ns,
+                                   inode, self.hash_engine.algorithm)
+        return cached['hash'] if cached else None
+    
+    def store_hashes(self, files: Iterable[Dict]):
+        """Сохраняет в кэш хеши, посчитанные вне calculate_hashes (поиск дубликатов)"""
+        if not self.cache:
+            return
+        for file_info in files:
+            file_hash = file_info.get('hash')
+            if file_hash and file_hash != HASH_ERROR:
+                self.cache.store(
+                    os.path.abspath(file_info['full_path']),
+                    file_info['size_bytes'],
+                    file_info['mtime_ns'],
+                    file_info['inode'],
+                    file_hash=file_hash,
+                    algorithm=self.hash_engine.algorithm
+                )
+    
     def calculate_hash(self, filepath: str) -> str:
-        """Вычисляет MD5 хеш файла"""
-        try:
-            hash_md5 = hashlib.md5()
-            with open(filepath, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except Exception as e:
-            self.errors.append(f"Ошибка MD5 для {filepath}: {str(e)}")
-            return "ОШИБКА"
\ No newline at end of file
+        """Вычисляет хеш файла выбранным алгоритмом"""
+        return self.hash_engine.hash_one(filepath)
+    
+    def calculate_hashes(self, files: List[Dict]) -> List[Dict]:
+        """
+        Параллельно вычисляет хеши для результатов scan_directory.
+        Хеш записывается в поле 'hash' каждой записи.
+        Если задан кэш, хешируются только новые и измененные файлы.
+        """
+        by_path = {}
+        for file_info in files:
+            if self.cache and not file_info.get('hash'):
+                file_info['hash'] = self.cached_hash(file_info['full_path'],
+                                                     file_info['size_bytes'],
+                                                     file_info['mtime_ns'],
+                                                     file_info['inode'])
+            if file_info.get('hash'):
+                continue
+            by_path[file_info['full_path']] = file_info
+        
+        for path, digest in self.hash_engine.hash_files(by_path):
+            file_info = by_path[path]
+            file_info['hash'] = digest
+            if self.cache and digest != HASH_ERROR:
+                self.cache.store(
+                    os.path.abspath(path),
+                    file_info['size_bytes'],
+                    file_info['mtime_ns'],
+                    file_info['inode'],
+                    file_hash=digest,
+                    algorithm=self.hash_engine.algorithm
+                )
+        return files
+    
+    def collect_deleted(self, directory: str) -> List[str]:
+        """
+        Возвращает файлы, удаленные с прошлого сканирования directory.
+        Работает только с кэшем и только после полного обхода за один запуск
+        (не прерванного и не продолженного с сохраненной позиции).
+        """
+        if not self.cache or self.timed_out or self.resumed:
+            return []
+        return self.cache.finish_run(os.path.abspath(directory))
@@ -0,0 +1,164 @@
+"""
+МОДЕЛЬ: Обход файловой системы на основе os.scandir
+Один stat на файл: тип берется из DirEntry, метаданные - из DirEntry.stat()
+"""
+
+import os
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set
+
+
+class FileEntry(NamedTuple):
+    """Найденный файл"""
+    path: str           # путь от корня обхода (root + относительный путь)
+    name: str           # имя файла
+    rel_path: str       # путь относительно корня обхода
+    depth: int          # 0 - файл лежит прямо в корне
+    stat: os.stat_result
+
+
+class WalkStats:
+    """Счетчики системных вызовов обхода и время stat-вызовов"""
+
+    __slots__ = ('dirs_listed', 'stat_calls', 'stat_seconds', 'errors')
+
+    def __init__(self):
+        self.dirs_listed = 0
+        self.stat_calls = 0
+        self.stat_seconds = 0.0
+        self.errors = 0
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class WalkState:
+    """
+    Позиция обхода, с которой его можно продолжить:
+    стек еще не открытых папок, текущая папка и уже отданные из нее файлы.
+    """
+
+    __slots__ = ('stack', 'current', 'done', 'finished')
+
+    def __init__(self):
+        self.stack = None       # None - обход еще не начинался
+        self.current = None     # (путь, относительный путь, глубина)
+        self.done = set()       # имена файлов текущей папки, уже обработанные
+        self.finished = False
+
+    def to_dict(self) -> Dict:
+        return {
+            'stack': [list(item) for item in self.stack or []],
+            'current': list(self.current) if self.current else None,
+            'done': sorted(self.done),
+            'finished': self.finished,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'WalkState':
+        state = cls()
+        state.stack = [tuple(item) for item in data['stack']]
+        state.current = tuple(data['current']) if data['current'] else None
+        state.done = set(data['done'])
+        state.finished = data['finished']
+        return state
+
+
+def walk_files(root: str,
+               ignore_hidden: bool = True,
+               max_depth: Optional[int] = None,
+               skip_names: Optional[Set[str]] = None,
+               errors: Optional[List[str]] = None,
+               stats: Optional[WalkStats] = None,
+               state: Optional[WalkState] = None) -> Iterator[FileEntry]:
+    """
+    Обходит root сверху вниз, как os.walk, и отдает только обычные файлы.
+
+    ignore_hidden: пропускать файлы и папки, начинающиеся с точки
+    max_depth: максимальная глубина вложенности (None = без ограничений)
+    skip_names: имена файлов, которые нужно пропустить
+    errors: список для сообщений о недоступных папках и файлах
+    stats: счетчики листингов и stat-вызовов
+    state: позиция обхода - продолжается с нее и обновляется по ходу.
+        Файл считается обработанным, когда вызывающий код запросил
+        следующий, поэтому при остановке посреди обхода ничего не теряется.
+    """
+    if state is None:
+        state = WalkState()
+    if state.stack is None:
+        # Стек (путь папки, путь относительно root, глубина)
+        state.stack = [(root, '', 0)]
+    stack = state.stack
+
+    while state.current or stack:
+        if state.current is None:
+            state.current = stack.pop()
+            state.done = set()
+        dir_path, rel_dir, depth = state.current
+        done = state.done
+        subdirs = []
+
+        try:
+            with os.scandir(dir_path) as it:
+                if stats:
+                    stats.dirs_listed += 1
+                entries = list(it)
+        except OSError as e:
+            if errors is not None:
+                errors.append(f"Ошибка чтения папки {dir_path}: {str(e)}")
+            if stats:
+                stats.errors += 1
+            state.current = None
+            continue
+
+        for entry in entries:
+            name = entry.name
+            if ignore_hidden and name.startswith('.'):
+                continue
+
+            try:
+                # Тип известен из readdir, отдельный stat не нужен
+                if entry.is_dir():
+                    # Как os.walk: в ссылки на папки не заходим
+                    if not entry.is_symlink() and (max_depth is None or depth < max_depth):
+                        subdirs.append(entry)
+                    continue
+
+                if not entry.is_file():
+                    continue
+                if skip_names and name in skip_names:
+                    continue
+                if name in done:
+                    continue
+
+                if stats:
+                    started = time.perf_counter()
+                    stat = entry.stat()
+                    stats.stat_seconds += time.perf_counter() - started
+                    stats.stat_calls += 1
+                else:
+                    stat = entry.stat()
+            except OSError as e:
+                if errors is not None:
+                    errors.append(f"Ошибка анализа {entry.path}: {str(e)}")
+                if stats:
+                    stats.errors += 1
+                continue
+
+            yield FileEntry(
+                entry.path,
+                name,
+                os.path.join(rel_dir, name) if rel_dir else name,
+                depth,
+                stat
+            )
+            done.add(name)
+
+        # В обратном порядке, чтобы папки обходились в порядке листинга
+        for entry in reversed(subdirs):
+            rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            stack.append((entry.path, rel, depth + 1))
+        state.current = None
+        state.done = set()
+
+    state.finished = True
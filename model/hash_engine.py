@@ -0,0 +1,243 @@
+"""
+МОДЕЛЬ: Параллельное вычисление хешей файлов
+"""
+
+import os
+import hashlib
+import threading
+from itertools import chain
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+HASH_ERROR = "ОШИБКА"
+
+# Алгоритм -> (фабрика хеш-объекта, размер блока чтения).
+# Размер блока подобран бенчмарком benchmarks/bench_hash.py: быстрым
+# алгоритмам нужны большие блоки, иначе время уходит на вызовы read().
+HASH_ALGORITHMS = {
+    "md5": (hashlib.md5, 256 * 1024),
+    "sha1": (hashlib.sha1, 256 * 1024),
+    "sha256": (hashlib.sha256, 64 * 1024),
+    "blake2b": (hashlib.blake2b, 256 * 1024),
+}
+
+# Необязательные быстрые алгоритмы - доступны, если установлены пакеты
+try:
+    import xxhash
+    HASH_ALGORITHMS["xxh64"] = (xxhash.xxh64, 1024 * 1024)
+    HASH_ALGORITHMS["xxh3_128"] = (xxhash.xxh3_128, 1024 * 1024)
+except ImportError:
+    pass
+
+try:
+    import blake3
+    HASH_ALGORITHMS["blake3"] = (blake3.blake3, 1024 * 1024)
+except ImportError:
+    pass
+
+
+# Файлы от этого размера читаются через readinto в переиспользуемый буфер
+LARGE_FILE_THRESHOLD = 8 * 1024 * 1024
+LARGE_FILE_BUFFER = 1024 * 1024
+
+# Буфер чтения больших файлов - свой у каждого потока пула
+_thread_buffers = threading.local()
+
+
+def available_algorithms() -> List[str]:
+    """Алгоритмы, доступные в текущем окружении"""
+    return list(HASH_ALGORITHMS)
+
+
+def new_hasher(algorithm: str):
+    """Создает хеш-объект по имени алгоритма"""
+    try:
+        factory, _ = HASH_ALGORITHMS[algorithm.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Неизвестный алгоритм хеширования '{algorithm}', "
+            f"доступны: {', '.join(HASH_ALGORITHMS)}"
+        ) from None
+    return factory()
+
+
+def chunk_size_for(algorithm: str) -> int:
+    """Размер блока чтения для алгоритма"""
+    return HASH_ALGORITHMS.get(algorithm.lower(), (None, 256 * 1024))[1]
+
+
+def hash_file(filepath: str, algorithm: str = "md5",
+              chunk_size: Optional[int] = None,
+              large_file_threshold: int = LARGE_FILE_THRESHOLD,
+              use_mmap: bool = False) -> str:
+    """
+    Вычисляет хеш одного файла.
+    Исключения не перехватываются - их обрабатывает вызывающий код.
+
+    Файлы от large_file_threshold байт читаются без создания нового
+    bytes на каждый блок: через readinto в буфер потока или, если
+    use_mmap, целиком через отображение в память.
+    """
+    hash_func = new_hasher(algorithm)
+    with open(filepath, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if size and size >= large_file_threshold:
+            if use_mmap:
+                _update_from_mmap(hash_func, f)
+            else:
+                _update_from_readinto(hash_func, f)
+        else:
+            chunk_size = chunk_size or chunk_size_for(algorithm)
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hash_func.update(chunk)
+    return hash_func.hexdigest()
+
+
+def _update_from_readinto(hash_func, f):
+    """Читает файл блоками в переиспользуемый буфер"""
+    buffer = getattr(_thread_buffers, "buffer", None)
+    if buffer is None:
+        buffer = memoryview(bytearray(LARGE_FILE_BUFFER))
+        _thread_buffers.buffer = buffer
+
+    while True:
+        read = f.readinto(buffer)
+        if not read:
+            break
+        hash_func.update(buffer[:read])
+
+
+def _update_from_mmap(hash_func, f):
+    """
+    Хеширует файл, отображенный в память, одним вызовом update.
+    Если файл обрежут во время чтения, процесс получит SIGBUS, поэтому
+    режим не стоит включать для сетевых дисков.
+    """
+    import mmap
+    
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        hash_func.update(mapped)
+
+
+def partial_hash_file(filepath: str, partial_bytes: int = 64 * 1024,
+                      algorithm: str = "md5") -> str:
+    """
+    Хеш начала и конца файла (по partial_bytes байт).
+    Для файлов не больше 2 * partial_bytes совпадает с полным хешем.
+    """
+    hash_func = new_hasher(algorithm)
+    with open(filepath, "rb") as f:
+        head = f.read(partial_bytes)
+        hash_func.update(head)
+        if len(head) == partial_bytes:
+            size = os.fstat(f.fileno()).st_size
+            if size > 2 * partial_bytes:
+                f.seek(-partial_bytes, os.SEEK_END)
+            hash_func.update(f.read(partial_bytes))
+    return hash_func.hexdigest()
+
+
+class HashEngine:
+    """Раздает файлы пулу потоков (или процессов) и отдает хеши по готовности"""
+
+    def __init__(self, algorithm: str = "md5", workers: Optional[int] = None,
+                 use_processes: bool = False,
+                 errors: Optional[List[str]] = None,
+                 large_file_threshold: int = LARGE_FILE_THRESHOLD,
+                 use_mmap: bool = False):
+        """
+        algorithm: имя алгоритма из HASH_ALGORITHMS
+        workers: размер пула (None = по числу ядер, но не меньше 4)
+        use_processes: пул процессов вместо потоков (для "тяжелых" алгоритмов)
+        errors: общий список ошибок, куда пишутся сбои по отдельным файлам
+        large_file_threshold: с какого размера файл читается без копирования блоков
+        use_mmap: читать большие файлы через mmap вместо readinto
+        """
+        new_hasher(algorithm)  # неизвестный алгоритм - ошибка сразу, а не на каждом файле
+        self.algorithm = algorithm.lower()
+        self.workers = workers or max(4, os.cpu_count() or 1)
+        self.use_processes = use_processes
+        self.errors = errors if errors is not None else []
+        self.large_file_threshold = large_file_threshold
+        self.use_mmap = use_mmap
+
+    def _error(self, filepath: str, error: Exception):
+        self.errors.append(
+            f"Ошибка {self.algorithm.upper()} для {filepath}: {str(error)}"
+        )
+
+    def hash_one(self, filepath: str) -> str:
+        """Хеш одного файла в текущем потоке"""
+        try:
+            return hash_file(filepath, self.algorithm, None,
+                             self.large_file_threshold, self.use_mmap)
+        except Exception as e:
+            self._error(filepath, e)
+            return HASH_ERROR
+
+    def hash_files(self, paths: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """
+        Хеширует файлы параллельно.
+        Возвращает пары (путь, хеш) в порядке готовности.
+
+        paths читается лениво: в работе держится не больше workers * 4
+        заданий, поэтому можно передавать генератор обхода директории.
+        """
+        return self._run(paths, hash_file, self.algorithm, None,
+                         self.large_file_threshold, self.use_mmap)
+
+    def partial_hash_files(self, paths: Iterable[str],
+                           partial_bytes: int = 64 * 1024) -> Iterator[Tuple[str, str]]:
+        """Как hash_files, но хеширует только начало и конец файлов"""
+        return self._run(paths, partial_hash_file, partial_bytes, self.algorithm)
+
+    def _run(self, paths: Iterable[str], func, *args) -> Iterator[Tuple[str, str]]:
+        """Применяет func(path, *args) к файлам в пуле"""
+        if self.workers <= 1:
+            for path in paths:
+                try:
+                    yield path, func(path, *args)
+                except Exception as e:
+                    self._error(path, e)
+                    yield path, HASH_ERROR
+            return
+
+        # Нечего хешировать (пустая папка, нет кандидатов в дубликаты) - пул не нужен
+        paths = iter(paths)
+        first = next(paths, None)
+        if first is None:
+            return
+        paths = chain([first], paths)
+        
+        # Пулы импортируются при первом хешировании: concurrent.futures
+        # тянет logging (а пул процессов - multiprocessing), запуску они не нужны
+        from concurrent.futures import FIRST_COMPLETED
+        if self.use_processes:
+            from concurrent.futures import ProcessPoolExecutor as executor_cls
+        else:
+            from concurrent.futures import ThreadPoolExecutor as executor_cls
+        
+        max_pending = self.workers * 4
+
+        with executor_cls(max_workers=self.workers) as executor:
+            pending = {}
+            for path in paths:
+                future = executor.submit(func, path, *args)
+                pending[future] = path
+                if len(pending) >= max_pending:
+                    yield from self._collect(pending, FIRST_COMPLETED)
+
+            while pending:
+                yield from self._collect(pending, FIRST_COMPLETED)
+
+    def _collect(self, pending: dict, return_when) -> Iterator[Tuple[str, str]]:
+        """Забирает готовые задания из pending"""
+        from concurrent.futures import wait
+        
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            path = pending.pop(future)
+            try:
+                yield path, future.result()
+            except Exception as e:
+                self._error(path, e)
+                yield path, HASH_ERROR
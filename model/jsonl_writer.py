@@ -0,0 +1,47 @@
+"""
+МОДЕЛЬ: Отчет в JSON Lines
+"""
+
+import json
+from typing import Dict, List
+
+from model.report_writer import StreamingReportWriter
+
+
+class JsonlWriter(StreamingReportWriter):
+    """
+    Потоковый JSONL: один JSON-объект на строку, поля - ReportWriter.FIELDS.
+    Теги - списком, даты - в ISO 8601.
+    """
+
+    EXTENSION = ".jsonl"
+
+    def __init__(self):
+        super().__init__()
+        self._file = None
+
+    def _open(self, path: str):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def _write(self, file_data: Dict):
+        record = self._build_record(file_data)
+        for field in ('created', 'modified'):
+            if record[field]:
+                record[field] = record[field].isoformat(timespec='seconds')
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write('\n')
+
+    def _rewrite(self, source: str, target: str, tags_by_row: Dict[int, List[str]]):
+        with open(source, 'r', encoding='utf-8') as src, \
+                open(target, 'w', encoding='utf-8') as dst:
+            for row_number, line in enumerate(src):
+                tags = tags_by_row.get(row_number)
+                if tags is not None:
+                    record = json.loads(line)
+                    record['tags'] = list(tags)
+                    line = json.dumps(record, ensure_ascii=False) + '\n'
+                dst.write(line)
+
+    def _close(self):
+        self._file.close()
+        self._file = None
@@ -0,0 +1,191 @@
+"""
+МОДЕЛЬ: Одновременный обход нескольких корней
+Каждый корень обходит свой FileScanner в потоке общего пула,
+записи сливаются в один поток через ограниченную очередь
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from config import DEFAULT_SETTINGS
+from model.file_scanner import FileScanner
+from model.fs_walker import WalkStats
+from utils.helpers import unique_roots
+
+# Признак конца обхода корня в очереди результатов
+_DONE = object()
+
+
+def root_labels(roots: Sequence[str]) -> List[str]:
+    """
+    Короткие имена корней для колонки пути в общем отчете:
+    имя папки, при совпадении имен - с номером (docs, docs_2)
+    """
+    labels = []
+    used = set()
+    for root in roots:
+        name = os.path.basename(os.path.normpath(os.path.abspath(root))) or "root"
+        label, number = name, 1
+        while label in used:
+            number += 1
+            label = f"{name}_{number}"
+        used.add(label)
+        labels.append(label)
+    return labels
+
+
+class MultiRootScanner:
+    """
+    Обход нескольких корней за один запуск с общим бюджетом потоков:
+    одновременно обходится не больше workers корней, остальные ждут
+    очереди. Записи те же, что у FileScanner, плюс 'root' (абсолютный
+    путь корня) и 'root_label'; порядок - по готовности, а не по корням.
+    """
+
+    # Записей в очереди на один поток обхода
+    QUEUE_PER_WORKER = 1000
+
+    def __init__(self, roots: Sequence[str], workers: Optional[int] = None,
+                 async_scan: bool = False, concurrency: Optional[int] = None,
+                 cache=None):
+        """
+        roots: папки для обхода (повторы одной папки обходятся один раз)
+        workers: сколько корней обходить одновременно
+            (по умолчанию DEFAULT_SETTINGS["root_workers"])
+        async_scan: обходить каждый корень AsyncFileScanner (сетевые диски)
+        concurrency: вызовов ФС в работе на все корни в асинхронном режиме -
+            делится между одновременно обходимыми корнями
+        cache: ScanCache потока, который читает записи: хеши неизмененных
+            файлов берутся из него там же, где кэш пишут теги и хеши, а
+            удаленные файлы полностью обойденных корней - в self.deleted.
+            Потоки обхода к базе не обращаются (иначе ждали бы блокировки).
+        """
+        self.roots = unique_roots(roots)
+        self.labels = root_labels(self.roots)
+        workers = workers or DEFAULT_SETTINGS["root_workers"]
+        self.workers = max(1, min(workers, len(self.roots)))
+        self.scanners = [FileScanner() for _ in self.roots]
+        self.async_scan = async_scan
+        concurrency = concurrency or DEFAULT_SETTINGS["async_concurrency"]
+        self.concurrency = max(1, concurrency // self.workers)
+        self.cache = cache
+        self.finished = set()
+        self.deleted = {}
+        self._stop = threading.Event()
+
+    @property
+    def errors(self) -> List[str]:
+        return [error for scanner in self.scanners for error in scanner.errors]
+
+    @property
+    def timed_out(self) -> bool:
+        return any(scanner.timed_out for scanner in self.scanners)
+
+    @property
+    def resumed(self) -> bool:
+        return any(scanner.resumed for scanner in self.scanners)
+
+    @property
+    def walk_stats(self) -> WalkStats:
+        """Счетчики обхода, сложенные по всем корням"""
+        total = WalkStats()
+        for scanner in self.scanners:
+            for name in WalkStats.__slots__:
+                setattr(total, name, getattr(total, name) + getattr(scanner.walk_stats, name))
+        return total
+
+    def complete_roots(self) -> List[str]:
+        """Корни, обойденные целиком за этот запуск (без лимита времени и продолжения)"""
+        return [root for index, (root, scanner) in enumerate(zip(self.roots, self.scanners))
+                if index in self.finished and not scanner.timed_out and not scanner.resumed]
+
+    def commit_checkpoint(self):
+        """Фиксирует позиции обхода всех корней (после записи отчета)"""
+        for scanner in self.scanners:
+            scanner.commit_checkpoint()
+
+    def iter_directory(self, max_seconds: int = 30,
+                       max_depth: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Отдает записи всех корней по мере готовности.
+        Лимит времени и сохранение позиции - у каждого корня свои.
+        Если вызывающий код перестал читать записи, потоки обхода
+        останавливаются на следующей записи.
+        """
+        self.finished = set()
+        self.deleted = {}
+        self._stop.clear()
+        results = queue.Queue(maxsize=self.QUEUE_PER_WORKER * self.workers)
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        for index in range(len(self.roots)):
+            executor.submit(self._walk_root, index, max_seconds, max_depth, results)
+
+        try:
+            remaining = len(self.roots)
+            while remaining:
+                item = results.get()
+                if item is _DONE:
+                    remaining -= 1
+                    continue
+                if self.cache:
+                    item['hash'] = self.cached_hash(item)
+                yield item
+            
+            # Все записи отданы - удаленные файлы по корням, обойденным целиком
+            if self.cache:
+                for root in self.complete_roots():
+                    self.deleted[root] = self.cache.finish_run(root)
+        finally:
+            self._stop.set()
+            # Освобождаем место в очереди, чтобы потоки увидели остановку
+            while True:
+                try:
+                    results.get_nowait()
+                except queue.Empty:
+                    break
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def cached_hash(self, file_info: Dict) -> Optional[str]:
+        """Хеш неизмененного файла из кэша (в потоке, читающем записи)"""
+        cached = self.cache.lookup(os.path.abspath(file_info['full_path']),
+                                   file_info['size_bytes'], file_info['mtime_ns'],
+                                   file_info['inode'], self.scanners[0].hash_engine.algorithm)
+        return cached['hash'] if cached else None
+    
+    def _walk_root(self, index: int, max_seconds: int, max_depth: Optional[int],
+                   results: queue.Queue):
+        """Обход одного корня (в потоке пула)"""
+        root, label, scanner = self.roots[index], self.labels[index], self.scanners[index]
+        try:
+            if self.async_scan:
+                from model.async_scanner import AsyncFileScanner
+                files = AsyncFileScanner(scanner, self.concurrency).iter_directory(
+                    root, max_seconds, max_depth
+                )
+            else:
+                files = scanner.iter_directory(root, max_seconds, max_depth)
+
+            for file_info in files:
+                file_info['root'] = root
+                file_info['root_label'] = label
+                if not self._put(results, file_info):
+                    files.close()
+                    return
+            self.finished.add(index)
+        except Exception as e:
+            scanner.errors.append(f"Ошибка сканирования {root}: {str(e)}")
+        finally:
+            self._put(results, _DONE)
+
+    def _put(self, results: queue.Queue, item) -> bool:
+        """Кладет запись в очередь; False - чтение остановлено"""
+        while not self._stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,285 @@
+"""
+МОДЕЛЬ: Потоковая разметка тегами с накопительной частотностью
+"""
+
+import os
+import json
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from model.tag_engine import select_tags
+
+# Флаги того, с каким статусом тег уже попадал в выданные файлы
+EMITTED_COMMON = 1
+EMITTED_RARE = 2
+
+
+class CountMinSketch:
+    """
+    Приближенный счетчик для огромных словарей: память фиксирована,
+    оценка никогда не меньше точного значения.
+    """
+
+    def __init__(self, width: int = 1 << 20, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = array('q', bytes(8 * width * depth))
+
+    def _cells(self, item: str):
+        # Двойное хеширование: depth индексов из одного hash()
+        h = hash(item)
+        h1 = h & 0xFFFFFFFF
+        h2 = ((h >> 32) & 0xFFFFFFFF) | 1
+        for row in range(self.depth):
+            yield row * self.width + (h1 + row * h2) % self.width
+
+    def add(self, item: str, count: int = 1):
+        for cell in self._cells(item):
+            self.table[cell] += count
+
+    def estimate(self, item: str) -> int:
+        return min(self.table[cell] for cell in self._cells(item))
+
+
+class OnlineTagger:
+    """
+    Размечает файлы пачками, не дожидаясь конца списка.
+
+    Частота тега = его количество / число уже прочитанных файлов, поэтому
+    ранние файлы могли получить тег по предварительной оценке. finalize()
+    пересчитывает только файлы с тегами, чей статус (частый/редкий) при
+    выдаче отличался от итогового, - результат совпадает с analyze_batch
+    по всему списку (при точных счетчиках).
+
+    Для пересчета нужны сырые и выданные теги каждого файла: в памяти
+    держится не больше max_memory_files таких записей, остальные
+    сбрасываются во временную базу SQLite и читаются в finalize()
+    последовательно. Память - O(max_memory_files + уникальных тегов),
+    а с max_exact_tokens словарь тоже ограничен.
+    """
+
+    # Записей о файлах в памяти, дальше - во временной базе
+    MAX_MEMORY_FILES = 100_000
+
+    def __init__(self, engine, max_exact_tokens: Optional[int] = None,
+                 sketch_width: int = 1 << 20, sketch_depth: int = 4, cache=None,
+                 max_memory_files: Optional[int] = None):
+        """
+        engine: SmartTagEngine - источник токенизации, категорий и истории
+        max_exact_tokens: сколько уникальных тегов считать точно; остальные
+            считаются в CountMinSketch (None = все точно)
+        cache: ScanCache - сырые теги неизмененных файлов берутся из него
+        max_memory_files: сколько записей о файлах держать в памяти
+            (по умолчанию MAX_MEMORY_FILES)
+        """
+        self.engine = engine
+        self.cache = cache
+        self.min_frequency = engine.min_frequency
+        self.max_exact_tokens = max_exact_tokens
+
+        self.vocabulary = {}
+        self.tokens = []
+        self.counts = array('q')
+        self.emitted = bytearray()
+
+        self.sketch = None
+        if max_exact_tokens is not None:
+            self.sketch = CountMinSketch(sketch_width, sketch_depth)
+        self.sketch_emitted_common = set()
+
+        self.total_files = 0
+        # Для последних выданных файлов - их сырые теги (номера в словаре
+        # или строки для тегов вне словаря) и выданные теги; более ранние
+        # лежат в self._spill с номерами от 0 до self._spilled
+        self.file_tokens: List[Tuple[Union[int, str], ...]] = []
+        self.file_tags: List[Tuple[str, ...]] = []
+        self.max_memory_files = max_memory_files or self.MAX_MEMORY_FILES
+        self._spill = None
+        self._spill_path = None
+        self._spilled = 0
+
+    def feed(self, chunk: List[Dict]) -> List[Dict]:
+        """Учитывает пачку в частотности и размечает ее текущей оценкой"""
+        chunk_keys = []
+        for raw_tags in self._raw_tags(chunk):
+            chunk_keys.append([self._count(tag) for tag in raw_tags])
+
+        self.total_files += len(chunk)
+
+        for file_data, keys in zip(chunk, chunk_keys):
+            tags = self._tags_for(keys, record=True)
+            file_data['tags'] = tags
+            file_data['raw_tags_count'] = len(keys)
+            file_data['smart_tags_count'] = len(tags)
+            self.file_tokens.append(tuple(keys))
+            self.file_tags.append(tuple(tags))
+
+        if len(self.file_tokens) >= self.max_memory_files:
+            self._spill_files()
+
+        self.engine._update_history(chunk)
+        return chunk
+
+    def _spill_files(self):
+        """Переносит записи о файлах из памяти во временную базу"""
+        if self._spill is None:
+            # sqlite3 и tempfile нужны только на больших списках - импорт здесь
+            import sqlite3
+            import tempfile
+            fd, self._spill_path = tempfile.mkstemp(suffix='.sqlite', prefix='tags_')
+            os.close(fd)
+            self._spill = sqlite3.connect(self._spill_path)
+            self._spill.execute("PRAGMA journal_mode = OFF")
+            self._spill.execute("PRAGMA synchronous = OFF")
+            self._spill.execute(
+                "CREATE TABLE files (id INTEGER PRIMARY KEY, tokens TEXT, tags TEXT)"
+            )
+
+        start = self._spilled
+        self._spill.executemany(
+            "INSERT INTO files (id, tokens, tags) VALUES (?, ?, ?)",
+            ((start + offset, json.dumps(keys, ensure_ascii=False),
+              json.dumps(tags, ensure_ascii=False))
+             for offset, (keys, tags) in enumerate(zip(self.file_tokens, self.file_tags)))
+        )
+        self._spill.commit()
+        self._spilled += len(self.file_tokens)
+        self.file_tokens = []
+        self.file_tags = []
+
+    def _iter_files(self) -> Iterator[Tuple[int, Tuple, Tuple[str, ...]]]:
+        """(номер файла, сырые теги, выданные теги) в порядке выдачи"""
+        if self._spill is not None:
+            for index, tokens, tags in self._spill.execute(
+                    "SELECT id, tokens, tags FROM files ORDER BY id"):
+                yield index, tuple(json.loads(tokens)), tuple(json.loads(tags))
+        for offset, (keys, tags) in enumerate(zip(self.file_tokens, self.file_tags)):
+            yield self._spilled + offset, keys, tags
+
+    def close(self):
+        """Удаляет временную базу (finalize вызывает сам)"""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            try:
+                os.remove(self._spill_path)
+            except OSError:
+                pass
+
+    def _raw_tags(self, chunk: List[Dict]) -> List[List[str]]:
+        """Сырые теги файлов пачки: из кэша для неизмененных, остальные - извлечением"""
+        extract = self.engine._extract_raw_tags
+        if self.cache is None:
+            return [extract(file_data['filename'], file_data['relative_path'])
+                    for file_data in chunk]
+
+        entries = [(os.path.abspath(file_data['full_path']), file_data['size_bytes'],
+                    file_data['mtime_ns'], file_data['inode'], file_data['relative_path'])
+                   for file_data in chunk]
+        cached = self.cache.lookup_tags(entries)
+        result = []
+        extracted = []
+        for file_data, entry in zip(chunk, entries):
+            raw_tags = cached.get(entry[0])
+            if raw_tags is None:
+                raw_tags = extract(file_data['filename'], file_data['relative_path'])
+                extracted.append(entry + (raw_tags,))
+            result.append(raw_tags)
+        if extracted:
+            self.cache.store_tags(extracted)
+        return result
+
+    def finalize(self) -> Tuple[List[Tuple[int, List[str], List[str]]], Dict]:
+        """
+        Финальный проход.
+        Возвращает (поправки, статистика): поправка - (номер файла в порядке
+        выдачи, выданные теги, правильные теги).
+        """
+        dirty = self._dirty_tokens()
+        corrections = []
+        removed = Counter()
+        added = Counter()
+
+        if dirty:
+            for index, keys, file_tags in self._iter_files():
+                if not any(key in dirty for key in keys):
+                    continue
+                tags = self._tags_for(keys, record=False)
+                old_tags = list(file_tags)
+                if tags != old_tags:
+                    corrections.append((index, old_tags, tags))
+                    removed.update(old_tags)
+                    added.update(tags)
+
+        self.close()
+        if corrections:
+            self.engine._correct_history(removed, added)
+
+        smart_tags_info, _, _ = self.engine._resolve_tags(
+            self.tokens, self.counts, max(self.total_files, 1)
+        )
+        return corrections, self.engine._tag_stats(smart_tags_info)
+
+    def _count(self, tag: str) -> Union[int, str]:
+        """Учитывает вхождение тега, возвращает его ключ"""
+        token_id = self.vocabulary.get(tag)
+        if token_id is None:
+            if self.max_exact_tokens is not None and len(self.tokens) >= self.max_exact_tokens:
+                self.sketch.add(tag)
+                return tag
+            token_id = self.vocabulary[tag] = len(self.tokens)
+            self.tokens.append(tag)
+            self.counts.append(0)
+            self.emitted.append(0)
+        self.counts[token_id] += 1
+        return token_id
+
+    def _is_common(self, key: Union[int, str]) -> bool:
+        count = self.counts[key] if isinstance(key, int) else self.sketch.estimate(key)
+        return count / self.total_files >= self.min_frequency
+
+    def _tags_for(self, keys, record: bool) -> List[str]:
+        """
+        Теги файла по текущей частотности (select_tags, как в analyze_batch).
+        record: запомнить, с каким статусом теги попали в выданный файл
+        """
+        is_common = self._record_common if record else self._is_common
+        return select_tags(keys, is_common, self._tag, self._category)
+
+    def _record_common(self, key: Union[int, str]) -> bool:
+        """_is_common с отметкой статуса, с которым тег выдан"""
+        common = self._is_common(key)
+        if isinstance(key, int):
+            self.emitted[key] |= EMITTED_COMMON if common else EMITTED_RARE
+        elif common:
+            self.sketch_emitted_common.add(key)
+        return common
+
+    def _tag(self, key: Union[int, str]) -> str:
+        return self.tokens[key] if isinstance(key, int) else key
+
+    def _category(self, key: Union[int, str]) -> str:
+        return self.engine._categorize_tag(self._tag(key))
+
+    def _dirty_tokens(self) -> set:
+        """Теги, выданные хотя бы раз со статусом, отличным от итогового"""
+        dirty = set()
+        for token_id in range(len(self.tokens)):
+            flags = self.emitted[token_id]
+            final = EMITTED_COMMON if self._is_common(token_id) else EMITTED_RARE
+            if flags & ~final & (EMITTED_COMMON | EMITTED_RARE):
+                dirty.add(token_id)
+
+        # Для тегов вне словаря статус при выдаче известен не полностью,
+        # поэтому проверяем их с запасом
+        for tag in self.sketch_emitted_common:
+            if not self._is_common(tag):
+                dirty.add(tag)
+        if self.sketch is not None:
+            for _, keys, _ in self._iter_files():
+                for key in keys:
+                    if isinstance(key, str) and self._is_common(key):
+                        dirty.add(key)
+
+        return dirty
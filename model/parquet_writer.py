@@ -0,0 +1,89 @@
+"""
+МОДЕЛЬ: Отчет в Parquet (нужен pyarrow)
+"""
+
+from bisect import bisect_left
+from typing import Dict, List
+
+from model.report_writer import StreamingReportWriter
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+def pyarrow_available() -> bool:
+    return pa is not None
+
+
+class ParquetWriter(StreamingReportWriter):
+    """
+    Parquet для загрузки каталога в аналитические системы.
+    Строки копятся по колонкам и сбрасываются группами по batch_size,
+    поэтому в памяти не больше одной группы.
+    """
+
+    EXTENSION = ".parquet"
+
+    def __init__(self, batch_size: int = 65_536):
+        """batch_size: строк в группе (row group) файла"""
+        if pa is None:
+            raise ImportError("Для отчета в Parquet установите pyarrow: pip install pyarrow")
+        super().__init__()
+        self.batch_size = batch_size
+        self.schema = pa.schema([
+            ('filename', pa.string()),
+            ('path', pa.string()),
+            ('size_kb', pa.float64()),
+            ('extension', pa.string()),
+            ('created', pa.timestamp('s')),
+            ('modified', pa.timestamp('s')),
+            ('tags', pa.list_(pa.string())),
+            ('category', pa.string()),
+            ('duplicate_group', pa.string()),
+        ])
+        self._writer = None
+        self._columns = None
+
+    def _open(self, path: str):
+        self._writer = pq.ParquetWriter(path, self.schema)
+        self._columns = {field: [] for field in self.FIELDS}
+
+    def _write(self, file_data: Dict):
+        for field, value in self._build_record(file_data).items():
+            self._columns[field].append(value)
+        if len(self._columns['filename']) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._columns['filename']:
+            self._writer.write_table(pa.table(self._columns, schema=self.schema))
+            self._columns = {field: [] for field in self.FIELDS}
+
+    def _rewrite(self, source: str, target: str, tags_by_row: Dict[int, List[str]]):
+        # Группы строк без исправлений копируются как есть
+        parquet_file = pq.ParquetFile(source)
+        tags_column = self.schema.get_field_index('tags')
+        rows = sorted(tags_by_row)
+        start = 0
+        with pq.ParquetWriter(target, self.schema) as writer:
+            for group in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(group)
+                end = start + table.num_rows
+                group_rows = rows[bisect_left(rows, start):bisect_left(rows, end)]
+                if group_rows:
+                    tags = table.column('tags').to_pylist()
+                    for row in group_rows:
+                        tags[row - start] = list(tags_by_row[row])
+                    table = table.set_column(tags_column, 'tags',
+                                             pa.array(tags, type=pa.list_(pa.string())))
+                writer.write_table(table)
+                start = end
+
+    def _close(self):
+        self._flush()
+        self._writer.close()
+        self._writer = None
@@ -0,0 +1,265 @@
+"""
+МОДЕЛЬ: Общий интерфейс записи отчетов
+Excel, CSV, JSONL и Parquet принимают одни и те же строки отчета
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import Config
+from utils.helpers import match_file_mode
+
+# Форматы отчета - расширения файлов, которые пишут writer'ы
+REPORT_FORMATS = ("xlsx", "csv", "jsonl", "parquet")
+
+
+def report_file_format(output: Optional[str]) -> str:
+    """
+    Формат отчета, если output - путь к файлу отчета, иначе ''.
+    Существующая папка (даже с точкой в имени: reports.2024) и путь
+    с незнакомым расширением считаются папкой для отчета.
+    """
+    if not output or os.path.isdir(output):
+        return ''
+    extension = os.path.splitext(output)[1].lower().lstrip('.')
+    return extension if extension in REPORT_FORMATS else ''
+
+
+class ReportWriter:
+    """
+    Базовый класс отчета: строки добавляются по одной (add_file_data),
+    retag() до save() исправляет теги уже добавленных строк,
+    save() записывает файл рядом с анализируемой папкой и возвращает путь.
+    """
+
+    HEADERS = [
+        "File Name", "Path", "Size (KB)",
+        "Extension", "Created", "Modified",
+        "Tags", "Category", "Duplicate Group"
+    ]
+    # Имена полей для форматов с именованными колонками (JSONL, Parquet)
+    FIELDS = [
+        "filename", "path", "size_kb",
+        "extension", "created", "modified",
+        "tags", "category", "duplicate_group"
+    ]
+    EXTENSION = ""
+
+    def __init__(self):
+        self.rows_written = 0
+        self.output = None
+
+    def begin(self, target_directory: str, analysis_name: Optional[str] = None,
+              output: Optional[str] = None):
+        """
+        Сообщает, для какой папки строится отчет, до добавления строк.
+        Потоковые форматы сразу открывают файл и пишут в него по мере
+        поступления строк.
+
+        output: файл отчета или папка для него (по умолчанию - по Config)
+        """
+        self.output = output
+
+    def add_file_data(self, file_data: Dict):
+        """Добавление данных о файле в отчет"""
+        raise NotImplementedError
+
+    def retag(self, tags_by_row: Dict[int, List[str]]):
+        """
+        Заменяет теги добавленных строк (номер строки - порядок
+        add_file_data, с нуля). Потоковая разметка узнает итоговые теги
+        ранних файлов только после конца обхода, поэтому вызывается до save().
+        """
+        raise NotImplementedError
+
+    def save(self, target_directory: str, analysis_name: Optional[str] = None) -> str:
+        """Завершает отчет и возвращает путь к файлу"""
+        raise NotImplementedError
+
+    def _build_record(self, file_data: Dict) -> Dict:
+        """Поля строки отчета (FIELDS) из данных файла"""
+        return {
+            'filename': file_data.get('filename', ''),
+            'path': file_data.get('path', ''),
+            'size_kb': file_data.get('size_kb', 0),
+            'extension': file_data.get('extension', ''),
+            'created': file_data.get('created'),
+            'modified': file_data.get('modified'),
+            'tags': list(file_data.get('tags', [])),
+            'category': file_data.get('category', ''),
+            'duplicate_group': file_data.get('duplicate_group', ''),
+        }
+
+    def _build_row(self, file_data: Dict) -> List:
+        """Значения строки отчета в порядке HEADERS (даты и теги - текстом)"""
+        created = file_data.get('created')
+        modified = file_data.get('modified')
+        return [
+            file_data.get('filename', ''),
+            file_data.get('path', ''),
+            file_data.get('size_kb', 0),
+            file_data.get('extension', ''),
+            created.strftime('%Y-%m-%d %H:%M:%S') if created else None,
+            modified.strftime('%Y-%m-%d %H:%M:%S') if modified else None,
+            ', '.join(file_data.get('tags', [])),
+            file_data.get('category', ''),
+            file_data.get('duplicate_group', ''),
+        ]
+
+    def report_path(self, target_directory: str, analysis_name: Optional[str] = None) -> str:
+        """
+        Путь отчета: output, если это файл; иначе file_analysis_<имя>_<время>
+        в папке output или в папке по Config (по умолчанию - рядом с
+        анализируемой папкой)
+        """
+        output = self.output
+        if report_file_format(output):
+            return output
+
+        # Генерируем имя файла с временной меткой
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if not analysis_name:
+            # Используем имя папки для названия файла
+            analysis_name = os.path.basename(os.path.normpath(target_directory))
+        filename = f"file_analysis_{analysis_name}_{timestamp}{self.EXTENSION}"
+
+        directory = output or Config.get_output_directory(target_directory)
+        return os.path.join(directory, filename)
+
+    def _save_with_fallback(self, filepath: str, save_func) -> str:
+        """
+        Сохраняет отчет через save_func(path); если в выбранную папку
+        записать нельзя - в текущую рабочую директорию
+        """
+        try:
+            save_func(filepath)
+            return filepath
+        except OSError as e:
+            print(f"Warning: Could not save to {os.path.dirname(filepath)}: {e}")
+            fallback_path = os.path.join(os.getcwd(), os.path.basename(filepath))
+            save_func(fallback_path)
+            return fallback_path
+
+
+class StreamingReportWriter(ReportWriter):
+    """
+    Отчет, который пишется построчно во временный файл и при save()
+    переименовывается в итоговый - строки не накапливаются в памяти,
+    а незавершенный отчет не выглядит готовым.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._path = None
+        self._tmp_path = None
+        self._retags = {}
+
+    def begin(self, target_directory: str, analysis_name: Optional[str] = None,
+              output: Optional[str] = None):
+        super().begin(target_directory, analysis_name, output)
+        self._path = self.report_path(target_directory, analysis_name)
+        directory = os.path.dirname(self._path) or '.'
+        try:
+            fd, self._tmp_path = tempfile.mkstemp(suffix=self.EXTENSION + '.part', dir=directory)
+        except OSError:
+            # В папку отчета писать нельзя - пишем во временную, при save() перенесем
+            fd, self._tmp_path = tempfile.mkstemp(suffix=self.EXTENSION + '.part')
+        os.close(fd)
+        self._open(self._tmp_path)
+
+    def add_file_data(self, file_data: Dict):
+        if self._tmp_path is None:
+            # begin() не вызывали - копим во временной папке
+            fd, self._tmp_path = tempfile.mkstemp(suffix=self.EXTENSION + '.part')
+            os.close(fd)
+            self._open(self._tmp_path)
+        self._write(file_data)
+        self.rows_written += 1
+
+    def retag(self, tags_by_row: Dict[int, List[str]]):
+        # Строки уже в файле - исправляются одним проходом при save()
+        self._retags.update(tags_by_row)
+
+    def save(self, target_directory: str, analysis_name: Optional[str] = None) -> str:
+        if self._tmp_path is None:
+            self.begin(target_directory, analysis_name, self.output)
+        self._close()
+        if self._retags:
+            self._apply_retags()
+
+        filepath = self._path or self.report_path(target_directory, analysis_name)
+        tmp_path, self._tmp_path = self._tmp_path, None
+        
+        def move(path):
+            match_file_mode(tmp_path, path)
+            shutil.move(tmp_path, path)
+        
+        return self._save_with_fallback(filepath, move)
+
+    def _apply_retags(self):
+        """Переписывает временный файл с исправленными тегами"""
+        fd, fixed_path = tempfile.mkstemp(suffix=self.EXTENSION + '.part',
+                                          dir=os.path.dirname(self._tmp_path))
+        os.close(fd)
+        try:
+            self._rewrite(self._tmp_path, fixed_path, self._retags)
+            os.replace(fixed_path, self._tmp_path)
+        except BaseException:
+            os.remove(fixed_path)
+            raise
+        self._retags = {}
+
+    def _rewrite(self, source: str, target: str, tags_by_row: Dict[int, List[str]]):
+        """Копирует отчет source в target, заменяя теги строк из tags_by_row"""
+        raise NotImplementedError
+
+    def _open(self, path: str):
+        raise NotImplementedError
+
+    def _write(self, file_data: Dict):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+def available_formats() -> List[str]:
+    """Форматы отчета, доступные в текущем окружении"""
+    from model.parquet_writer import pyarrow_available
+
+    formats = [fmt for fmt in REPORT_FORMATS if fmt != "parquet"]
+    if pyarrow_available():
+        formats.append("parquet")
+    return formats
+
+
+def create_writer(fmt: Optional[str] = None, output: Optional[str] = None,
+                  **excel_options) -> ReportWriter:
+    """
+    Создает writer нужного формата.
+    Формат берется из расширения output (report.csv), затем из fmt,
+    затем из Config.OUTPUT_FORMAT.
+    excel_options: параметры ExcelWriter (write_only, auto_adjust_columns)
+    """
+    fmt = (report_file_format(output) or fmt or Config.OUTPUT_FORMAT).lower()
+
+    # Модули форматов импортируются только при выборе формата
+    if fmt == "xlsx":
+        from model.excel_writer import ExcelWriter
+        return ExcelWriter(**excel_options)
+    if fmt == "csv":
+        from model.csv_writer import CsvWriter
+        return CsvWriter()
+    if fmt == "jsonl":
+        from model.jsonl_writer import JsonlWriter
+        return JsonlWriter()
+    if fmt == "parquet":
+        from model.parquet_writer import ParquetWriter
+        return ParquetWriter()
+
+    raise ValueError(
+        f"Неизвестный формат отчета '{fmt}', доступны: {', '.join(available_formats())}"
+    )
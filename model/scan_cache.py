@@ -0,0 +1,198 @@
+"""
+МОДЕЛЬ: Постоянный кэш результатов сканирования
+Позволяет при повторном запуске хешировать только новые и измененные файлы
+"""
+
+import os
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from config import DATA_DIR, ensure_directories
+
+
+class ScanCache:
+    """
+    Кэш метаданных файлов в SQLite.
+    Запись считается актуальной, пока у файла совпадают
+    путь, размер, mtime (в наносекундах) и inode.
+
+    Теги - сырые теги имени и пути файла (до фильтра по частотности,
+    который зависит от всего дерева). Они зависят от пути относительно
+    корня сканирования, поэтому хранятся вместе с ним (tags_path).
+
+    Каждый экземпляр - отдельный запуск (run_id): lookup и запись ставят
+    файлу seen_run, и finish_run удаляет записи корня, не встреченные
+    в этом запуске, - список встреченных путей в памяти не держится.
+    """
+
+    COMMIT_EVERY = 1000
+    # Параметров в одном запросе (ограничение SQLite - 999)
+    QUERY_BATCH = 900
+    # Условие UPSERT: сохраненная запись относится к той же версии файла
+    _UNCHANGED = ("size = excluded.size AND mtime_ns = excluded.mtime_ns "
+                  "AND inode = excluded.inode")
+
+    def __init__(self, db_path: Union[str, Path, None] = None):
+        if db_path is None:
+            ensure_directories()
+        self.db_path = str(db_path or DATA_DIR / "scan_cache.sqlite")
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                hash TEXT,
+                tags TEXT,
+                algorithm TEXT,
+                tags_path TEXT,
+                seen_run INTEGER
+            )
+        """)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY AUTOINCREMENT)"
+        )
+        # Кэш, созданный до выбора алгоритма, хранил только MD5
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}
+        if 'algorithm' not in columns:
+            self.conn.execute("ALTER TABLE files ADD COLUMN algorithm TEXT DEFAULT 'md5'")
+        if 'tags_path' not in columns:
+            self.conn.execute("ALTER TABLE files ADD COLUMN tags_path TEXT")
+        if 'seen_run' not in columns:
+            self.conn.execute("ALTER TABLE files ADD COLUMN seen_run INTEGER")
+
+        # Номер запуска - из AUTOINCREMENT, прошлые номера не повторяются
+        self.run_id = self.conn.execute("INSERT INTO runs DEFAULT VALUES").lastrowid
+        self.conn.execute("DELETE FROM runs WHERE id < ?", (self.run_id,))
+        self.conn.commit()
+
+        self._uncommitted = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, path: str, size: int, mtime_ns: int,
+               inode: int, algorithm: str = "md5") -> Optional[Dict]:
+        """
+        Возвращает сохраненные данные файла, если он не изменился.
+        None - файл новый или изменился.
+        Хеш, посчитанный другим алгоритмом, возвращается как None.
+        Файл отмечается встреченным в этом запуске.
+        """
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, inode, hash, tags, algorithm FROM files WHERE path = ?",
+            (path,)
+        ).fetchone()
+        if row is not None:
+            self.conn.execute("UPDATE files SET seen_run = ? WHERE path = ?",
+                              (self.run_id, path))
+            self._maybe_commit()
+
+        if row is None or row[:3] != (size, mtime_ns, inode):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        file_hash, tags, stored_algorithm = row[3:]
+        return {
+            'hash': file_hash if stored_algorithm == algorithm else None,
+            'tags': json.loads(tags) if tags else None
+        }
+
+    def store(self, path: str, size: int, mtime_ns: int, inode: int,
+              file_hash: Optional[str] = None,
+              algorithm: str = "md5"):
+        """
+        Сохраняет (или обновляет) хеш файла.
+        Теги записи сохраняются, если файл не изменился.
+        """
+        self.conn.execute(
+            "INSERT INTO files (path, size, mtime_ns, inode, hash, algorithm, seen_run) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET "
+            "  hash = excluded.hash, algorithm = excluded.algorithm, "
+            "  seen_run = excluded.seen_run, "
+            "  tags = CASE WHEN " + self._UNCHANGED + " THEN tags END, "
+            "  tags_path = CASE WHEN " + self._UNCHANGED + " THEN tags_path END, "
+            "  size = excluded.size, mtime_ns = excluded.mtime_ns, inode = excluded.inode",
+            (path, size, mtime_ns, inode, file_hash, algorithm, self.run_id)
+        )
+        self._maybe_commit()
+
+    def lookup_tags(self, files: Sequence[Tuple[str, int, int, int, str]]) -> Dict[str, List[str]]:
+        """
+        Сырые теги неизмененных файлов одним запросом на пачку.
+        files: (путь, размер, mtime_ns, inode, путь относительно корня).
+        Возвращает {путь: теги} только для найденных файлов.
+        """
+        expected = {path: (size, mtime_ns, inode, tags_path)
+                    for path, size, mtime_ns, inode, tags_path in files}
+        found = {}
+        paths = list(expected)
+        for start in range(0, len(paths), self.QUERY_BATCH):
+            batch = paths[start:start + self.QUERY_BATCH]
+            rows = self.conn.execute(
+                "SELECT path, size, mtime_ns, inode, tags_path, tags FROM files "
+                f"WHERE path IN ({','.join('?' * len(batch))}) AND tags IS NOT NULL",
+                batch
+            )
+            for path, size, mtime_ns, inode, tags_path, tags in rows:
+                if expected[path] == (size, mtime_ns, inode, tags_path):
+                    found[path] = json.loads(tags)
+        return found
+
+    def store_tags(self, files: Iterable[Tuple[str, int, int, int, str, List[str]]]):
+        """
+        Сохраняет сырые теги файлов.
+        files: (путь, размер, mtime_ns, inode, путь относительно корня, теги).
+        Хеш записи сохраняется, если файл не изменился.
+        """
+        rows = [(path, size, mtime_ns, inode, tags_path,
+                 json.dumps(tags, ensure_ascii=False), self.run_id)
+                for path, size, mtime_ns, inode, tags_path, tags in files]
+        self.conn.executemany(
+            "INSERT INTO files (path, size, mtime_ns, inode, tags_path, tags, seen_run) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET "
+            "  tags = excluded.tags, tags_path = excluded.tags_path, "
+            "  seen_run = excluded.seen_run, "
+            "  hash = CASE WHEN " + self._UNCHANGED + " THEN hash END, "
+            "  size = excluded.size, mtime_ns = excluded.mtime_ns, inode = excluded.inode",
+            rows
+        )
+        self._maybe_commit(len(rows))
+
+    def finish_run(self, root: str) -> List[str]:
+        """
+        Завершает полный обход root: удаляет из кэша и возвращает
+        файлы, которые были в кэше, но не встретились в этом запуске.
+        Вызывать только если обход не был прерван.
+        """
+        root = os.path.join(root, '')
+        # Диапазон [root, root + следующий символ после разделителя)
+        # эквивалентен LIKE 'root%', но использует индекс первичного ключа
+        upper = root[:-1] + chr(ord(root[-1]) + 1)
+        condition = "path >= ? AND path < ? AND seen_run IS NOT ?"
+        params = (root, upper, self.run_id)
+        deleted = [path for (path,) in self.conn.execute(
+            f"SELECT path FROM files WHERE {condition}", params
+        )]
+        self.conn.execute(f"DELETE FROM files WHERE {condition}", params)
+        self.conn.commit()
+        self._uncommitted = 0
+        return deleted
+
+    def _maybe_commit(self, changes: int = 1):
+        self._uncommitted += changes
+        if self._uncommitted >= self.COMMIT_EVERY:
+            self.conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        """Сохраняет изменения и закрывает базу"""
+        self.conn.commit()
+        self.conn.close()
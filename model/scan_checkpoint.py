@@ -0,0 +1,62 @@
+"""
+МОДЕЛЬ: Точка продолжения прерванного по времени сканирования
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from config import DATA_DIR
+from model.fs_walker import WalkState
+
+
+class ScanCheckpoint:
+    """
+    Позиция обхода одного корня в DATA_DIR/checkpoints.
+    Если сканирование остановилось по лимиту времени, позиция сохраняется,
+    и следующий запуск продолжает обход с нее, а не с начала.
+    """
+
+    def __init__(self, root: str, scope: str = "scan",
+                 directory: Union[str, Path, None] = None):
+        """
+        root: корень обхода (ключ - абсолютный путь)
+        scope: кто сканирует - у разных программ свои позиции
+        directory: папка для файлов позиций (по умолчанию DATA_DIR/checkpoints)
+        """
+        self.root = os.path.abspath(root)
+        key = hashlib.sha1(f"{scope}:{self.root}".encode("utf-8")).hexdigest()[:16]
+        directory = Path(directory or DATA_DIR / "checkpoints")
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f"{key}.json"
+
+    def load(self) -> Tuple[Optional[WalkState], Dict]:
+        """
+        Возвращает (позиция обхода, сохраненные вместе с ней данные).
+        (None, {}) - сохраненной позиции нет или она не читается.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('root') != self.root:
+                return None, {}
+            return WalkState.from_dict(data['walk']), data.get('extra', {})
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, {}
+
+    def save(self, state: WalkState, extra: Optional[Dict] = None):
+        """Сохраняет позицию атомарно: через временный файл и замену"""
+        data = {'root': self.root, 'walk': state.to_dict(), 'extra': extra or {}}
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Удаляет позицию - обход завершен"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -4,74 +4,346 @@
 
 import os
 import re
-from collections import Counter
-from typing import List, Dict, Tuple
 import json
+import hashlib
+from collections import Counter
+from functools import lru_cache
+from itertools import islice, repeat
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+# Категории редких тегов: шаблон ищется в теге, порядок задает приоритет
+CATEGORY_PATTERNS = {
+    'человек_фамилия': r'\b[А-ЯЁ][а-яё]{2,}(ов|ев|ин|ын|ский|цкий|кая|ая)\b',
+    'год_xxxx': r'\b(19|20)\d{2}\b',
+    'номер_документа': r'\b№?\s*\d{3,}\b',
+    'статус_документа': r'\b(подписан|утвержден|согласован|черновик|итоговый)\b',
+    'период': r'\b(Q[1-4]|квартал|полугодие|годовой|месячный)\b',
+}
+
+# Категории по ключевым словам (подстрока в теге) -> тег "<категория>_разное"
+CATEGORY_KEYWORDS = {
+    'человек': ['иванов', 'петров', 'сидоров', 'васильев'],
+    'проект': ['проект', 'project', 'программа'],
+    'клиент': ['клиент', 'customer', 'заказчик'],
+    'отчет': ['отчет', 'отчёт', 'report'],
+    'договор': ['договор', 'контракт', 'соглашение'],
+}
+
+
+class TagTokenizer:
+    """
+    Разбиение имен файлов на теги и категоризация редких тегов.
+    Все регулярные выражения компилируются один раз при создании.
+    """
+    
+    # Разделители частей имени (включая '|', который раньше служил заменой)
+    SEPARATORS = re.compile(r'[_\-. ;,|]+')
+    # Расширения, которые не превращаются в теги
+    IGNORED_EXTENSIONS = {'.txt', '.log', '.tmp'}
+    
+    def __init__(self, stop_words: set,
+                 category_patterns: Dict[str, str] = CATEGORY_PATTERNS,
+                 category_keywords: Dict[str, List[str]] = CATEGORY_KEYWORDS):
+        self.stop_words = stop_words
+        # Версия карты категорий - для кэшей, зависящих от категоризации
+        self.version = hashlib.sha1(json.dumps(
+            [category_patterns, category_keywords], ensure_ascii=False
+        ).encode('utf-8')).hexdigest()[:12]
+        
+        # Шаблоны по отдельности - для выбора категории по приоритету,
+        # и одной альтернацией - чтобы за один проход отсеять теги без категории
+        self._patterns = [
+            (category, re.compile(pattern, re.IGNORECASE))
+            for category, pattern in category_patterns.items()
+        ]
+        self._any_pattern = re.compile(
+            '|'.join(f'(?P<p{i}>{pattern})' for i, pattern in enumerate(category_patterns.values())),
+            re.IGNORECASE
+        )
+        
+        self._keywords = [
+            (f"{category}_разное", re.compile('|'.join(map(re.escape, keywords))))
+            for category, keywords in category_keywords.items()
+        ]
+        self._any_keyword = re.compile('|'.join(
+            f'(?P<k{i}>{"|".join(map(re.escape, keywords))})'
+            for i, keywords in enumerate(category_keywords.values())
+        ))
+    
+    def split(self, text: str) -> List[str]:
+        """Разделение текста на значимые части"""
+        if not text:
+            return []
+        
+        stop_words = self.stop_words
+        filtered = []
+        for part in self.SEPARATORS.split(text):
+            part = part.strip()
+            if (len(part) > 2 and
+                    not part.isdigit() and  # Цифры обрабатываем отдельно
+                    part.lower() not in stop_words):
+                filtered.append(part)
+        return filtered
+    
+    def extract(self, filename: str, filepath: str) -> List[str]:
+        """Сырые теги из имени файла, последних уровней пути и расширения"""
+        name_without_ext, ext = os.path.splitext(filename)
+        
+        # Из имени файла
+        tags = [p.lower() for p in self.split(name_without_ext)]
+        
+        # Из пути (только последние 2 уровня)
+        for part in filepath.split(os.sep)[-3:]:
+            if part and part not in {'.', '..'}:
+                tags.extend(p.lower() for p in self.split(part))
+        
+        # Из расширения (только если не слишком распространенное)
+        ext = ext.lower()
+        if ext and ext not in self.IGNORED_EXTENSIONS:
+            tags.append(f"расширение{ext}")
+        
+        return tags
+    
+    def categorize(self, tag: str) -> str:
+        """Категория редкого тега ('' - без категории)"""
+        match = self._any_pattern.search(tag)
+        if match:
+            return self._first_match(self._patterns, match.lastgroup, tag)
+        
+        tag_lower = tag.lower()
+        match = self._any_keyword.search(tag_lower)
+        if match:
+            return self._first_match(self._keywords, match.lastgroup, tag_lower)
+        
+        return ""
+    
+    @staticmethod
+    def _first_match(candidates, group: str, tag: str) -> str:
+        """
+        Общая альтернация нашла самое левое совпадение, но приоритет
+        у категории, которая раньше в списке. Проверяем только более ранние.
+        """
+        found = int(group[1:])
+        for category, pattern in candidates[:found]:
+            if pattern.search(tag):
+                return category
+        return candidates[found][0]
+
+
+def select_tags(token_ids: Sequence, is_common: Callable[[Any], bool],
+                tag_of: Callable[[Any], str],
+                category_of: Callable[[Any], str]) -> List[str]:
+    """
+    Итоговые теги файла по ключам его сырых тегов - общие правила
+    для пакетной, параллельной и потоковой разметки.
+    is_common(key) - частый ли тег, tag_of(key) - сам тег,
+    category_of(key) - категория редкого тега ('' - тег отбрасывается)
+    """
+    final_tags = []
+    categories_used = set()
+    
+    for key in token_ids:
+        # Если тег частый - добавляем
+        if is_common(key):
+            final_tags.append(tag_of(key))
+            continue
+        
+        # Если тег редкий - добавляем его категорию (один раз)
+        category = category_of(key)
+        if category and category not in categories_used:
+            final_tags.append(category)
+            categories_used.add(category)
+    
+    # Добавляем тег "прочее" если мало тегов
+    if len(final_tags) < 2 and token_ids:
+        final_tags.append("прочее")
+    
+    return final_tags
+
+
+def _select_resolved(token_ids: List[int], resolved: List[str],
+                     common: List[bool]) -> List[str]:
+    """
+    select_tags по готовым спискам _resolve_tags: resolved[id] - сам тег
+    (частый) или категория, common[id] - частый ли тег
+    """
+    lookup = resolved.__getitem__
+    return select_tags(token_ids, common.__getitem__, lookup, lookup)
+
+
+def _count_shard(tokenizer: TagTokenizer,
+                 names: List[Tuple[str, str]]) -> Tuple[Counter, List[List[int]]]:
+    """
+    Процесс пула: сырые теги части пакета.
+    Возвращает (счетчик тегов в порядке первого появления,
+    номера тегов каждого файла в этом счетчике).
+    """
+    counts = Counter()
+    vocabulary = {}
+    files_token_ids = []
+    for filename, filepath in names:
+        token_ids = []
+        for tag in tokenizer.extract(filename, filepath):
+            token_id = vocabulary.get(tag)
+            if token_id is None:
+                token_id = vocabulary[tag] = len(vocabulary)
+            counts[tag] += 1
+            token_ids.append(token_id)
+        files_token_ids.append(token_ids)
+    return counts, files_token_ids
+
+
+def _tag_shard(files_token_ids: List[List[int]], resolved: List[str],
+               common: List[bool]) -> List[List[str]]:
+    """Процесс пула: итоговые теги файлов части пакета (номера - локальные)"""
+    return [_select_resolved(token_ids, resolved, common) for token_ids in files_token_ids]
 
 
 class SmartTagEngine:
     """Умный генератор тегов с анализом частотности"""
     
-    def __init__(self, min_frequency: float = 0.1, history_file: str = "tag_history.json"):
+    # Меньшие пакеты быстрее разметить в одном процессе, чем запускать пул
+    PARALLEL_MIN_FILES = 20_000
+    
+    def __init__(self, min_frequency: float = 0.1, history_file: str = "tag_history.json",
+                 categorize_cache_size: int = 100_000, history_db: Optional[str] = None):
         """
         min_frequency: минимальная частота для сохранения тега (0.1 = 10%)
-        history_file: файл для сохранения истории тегов
+        history_file: старый JSON с историей тегов - импортируется в базу один раз
+        categorize_cache_size: сколько уникальных тегов помнить с их категориями
+        history_db: база истории тегов (по умолчанию DATA_DIR/tag_history.sqlite)
         """
         self.stop_words = {'в', 'на', 'для', 'из', 'от', 'по', 'и', 'или', 'не'}
         self.min_frequency = min_frequency
         self.history_file = history_file
+        self.last_corrections = []
+        self.last_stats = {}
         
-        # Загружаем историю тегов
-        self.tag_history = self._load_history()
+        # История тегов - база открывается при первой записи
+        self.history_db = history_db
+        self._history = None
         
         # Категории для группировки уникальных тегов
-        self.category_patterns = {
-            'человек_фамилия': r'\b[А-ЯЁ][а-яё]{2,}(ов|ев|ин|ын|ский|цкий|кая|ая)\b',
-            'год_xxxx': r'\b(19|20)\d{2}\b',
-            'номер_документа': r'\b№?\s*\d{3,}\b',
-            'статус_документа': r'\b(подписан|утвержден|согласован|черновик|итоговый)\b',
-            'период': r'\b(Q[1-4]|квартал|полугодие|годовой|месячный)\b',
-        }
-    
-    def _load_history(self) -> Dict:
-        """Загружает историю тегов из файла"""
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except:
-            pass
-        return {'total_files': 0, 'tag_counts': {}, 'file_examples': {}}
-    
-    def _save_history(self):
-        """Сохраняет историю тегов в файл"""
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.tag_history, f, ensure_ascii=False, indent=2)
-        except:
-            pass
+        self.category_patterns = dict(CATEGORY_PATTERNS)
+        self.tokenizer = TagTokenizer(self.stop_words, self.category_patterns)
+        self._categorize_cached = lru_cache(maxsize=categorize_cache_size)(
+            self.tokenizer.categorize
+        )
     
-    def analyze_batch(self, files_data: List[Dict]) -> Tuple[List[Dict], Dict]:
+    def analyze_batch(self, files_data: List[Dict],
+                      workers: int = 1) -> Tuple[List[Dict], Dict]:
         """
         Анализирует пакет файлов и возвращает УМНЫЕ теги
+        workers: число процессов для больших пакетов (1 - в текущем процессе)
         Возвращает: (файлы с тегами, статистика тегов)
         """
-        # 1. Сначала собираем ВСЕ потенциальные теги
-        all_potential_tags = []
+        if workers > 1 and len(files_data) >= self.PARALLEL_MIN_FILES:
+            return self._analyze_batch_parallel(files_data, workers)
+        
+        # 1. Один раз извлекаем сырые теги. Для каждого файла храним
+        # номера тегов в словаре пакета, а не сами строки
+        vocabulary = {}
+        tokens = []
+        counts = []
+        files_token_ids = []
         for file_data in files_data:
-            raw_tags = self._extract_raw_tags(
-                file_data['filename'], 
-                file_data['relative_path']
-            )
-            all_potential_tags.extend(raw_tags)
+            token_ids = []
+            for tag in self._extract_raw_tags(file_data['filename'],
+                                              file_data['relative_path']):
+                token_id = vocabulary.get(tag)
+                if token_id is None:
+                    token_id = vocabulary[tag] = len(tokens)
+                    tokens.append(tag)
+                    counts.append(0)
+                counts[token_id] += 1
+                token_ids.append(token_id)
+            files_token_ids.append(token_ids)
+        
+        # 2-3. Частотность и фильтрация
+        smart_tags_info, resolved, common = self._resolve_tags(
+            tokens, counts, len(files_data)
+        )
+        
+        # 4. Применяем теги к файлам
+        result_files = []
+        for file_data, token_ids in zip(files_data, files_token_ids):
+            file_with_tags = self._apply_smart_tags(file_data, token_ids, resolved, common)
+            result_files.append(file_with_tags)
+        
+        # 5. Обновляем историю
+        self._update_history(result_files)
         
-        # 2. Анализируем частотность
-        tag_counter = Counter(all_potential_tags)
-        total_files = len(files_data)
+        # 6. Возвращаем результат
+        return result_files, self._tag_stats(smart_tags_info)
+    
+    def _analyze_batch_parallel(self, files_data: List[Dict],
+                                workers: int) -> Tuple[List[Dict], Dict]:
+        """
+        analyze_batch на пуле процессов, результат тот же.
+        Пакет делится на непрерывные части: каждая часть считает свои теги,
+        счетчики частей складываются по порядку (поэтому номера тегов и
+        порядок статистики совпадают с последовательным вариантом),
+        затем части размечаются параллельно по общей частотности.
+        """
+        step = -(-len(files_data) // workers)
+        bounds = [(start, min(start + step, len(files_data)))
+                  for start in range(0, len(files_data), step)]
+        names = [[(file_data['filename'], file_data['relative_path'])
+                  for file_data in files_data[start:end]]
+                 for start, end in bounds]
+        
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # 1. Сырые теги и их счетчики по частям
+            shards = list(executor.map(_count_shard, repeat(self.tokenizer), names))
+            
+            # 2. Общая частотность
+            counts = Counter()
+            for shard_counts, _ in shards:
+                counts.update(shard_counts)
+            tokens = list(counts)
+            smart_tags_info, resolved, common = self._resolve_tags(
+                tokens, [counts[tag] for tag in tokens], len(files_data)
+            )
+            
+            # 3. Разметка частей: каждой - решения по ее локальным номерам тегов
+            vocabulary = {tag: token_id for token_id, tag in enumerate(tokens)}
+            local_resolved = []
+            local_common = []
+            for shard_counts, _ in shards:
+                remap = [vocabulary[tag] for tag in shard_counts]
+                local_resolved.append([resolved[token_id] for token_id in remap])
+                local_common.append([common[token_id] for token_id in remap])
+            
+            tagged = executor.map(_tag_shard,
+                                  (files_token_ids for _, files_token_ids in shards),
+                                  local_resolved, local_common)
+            
+            for (start, end), (_, files_token_ids), shard_tags in zip(bounds, shards, tagged):
+                for file_data, token_ids, final_tags in zip(files_data[start:end],
+                                                            files_token_ids, shard_tags):
+                    file_data['tags'] = final_tags
+                    file_data['raw_tags_count'] = len(token_ids)
+                    file_data['smart_tags_count'] = len(final_tags)
         
-        # 3. Фильтруем теги по частоте
+        self._update_history(files_data)
+        return files_data, self._tag_stats(smart_tags_info)
+    
+    def _resolve_tags(self, tokens: List[str], counts: List[int],
+                      total_files: int) -> Tuple[Dict, List[str], List[bool]]:
+        """
+        Решает судьбу каждого уникального сырого тега по его частоте.
+        Возвращает (smart_tags_info, resolved, common), где resolved[id] -
+        сам тег (частый), его категория или '' (отбрасывается),
+        common[id] - частый ли тег.
+        """
         smart_tags_info = {}
-        for tag, count in tag_counter.items():
+        resolved = []
+        common = []
+        for token_id, tag in enumerate(tokens):
+            count = counts[token_id]
             frequency = count / total_files
             
             if frequency >= self.min_frequency:
@@ -81,151 +353,133 @@ class SmartTagEngine:
                     'count': count,
                     'type': 'common'
                 }
+                resolved.append(tag)
+                common.append(True)
             else:
                 # Редкий тег - пытаемся категоризировать
                 category = self._categorize_tag(tag)
+                resolved.append(category)
+                common.append(False)
                 if category:
                     # Добавляем в категорию
-                    if category not in smart_tags_info:
+                    info = smart_tags_info.get(category)
+                    if info is None:
                         smart_tags_info[category] = {
                             'frequency': frequency,
                             'count': count,
                             'type': 'category',
                             'examples': [tag]
                         }
-                    else:
-                        smart_tags_info[category]['count'] += count
-                        smart_tags_info[category]['examples'].append(tag)
+                    elif info['type'] == 'category':
+                        info['count'] += count
+                        info['examples'].append(tag)
                 # else: отбрасываем совсем
         
-        # 4. Применяем теги к файлам
-        result_files = []
-        for file_data in files_data:
-            file_with_tags = self._apply_smart_tags(file_data, smart_tags_info)
-            result_files.append(file_with_tags)
-        
-        # 5. Обновляем историю
-        self._update_history(result_files)
-        
-        # 6. Возвращаем результат
-        stats = {
+        return smart_tags_info, resolved, common
+    
+    @staticmethod
+    def _tag_stats(smart_tags_info: Dict) -> Dict:
+        """Статистика тегов для отчета"""
+        return {
             'total_tags': len(smart_tags_info),
             'common_tags': sum(1 for t in smart_tags_info.values() if t['type'] == 'common'),
             'category_tags': sum(1 for t in smart_tags_info.values() if t['type'] == 'category'),
             'tag_info': smart_tags_info
         }
-        
-        return result_files, stats
     
-    def _extract_raw_tags(self, filename: str, filepath: str) -> List[str]:
-        """Извлекает сырые теги (старая логика, но улучшенная)"""
-        tags = []
-        
-        # Из имени файла
-        name_without_ext = os.path.splitext(filename)[0]
-        name_parts = self._split_into_parts(name_without_ext)
-        tags.extend([p.lower() for p in name_parts if len(p) > 2])
+    def analyze_stream(self, files: Iterable[Dict],
+                       chunk_size: int = 1000,
+                       max_exact_tokens: Optional[int] = None,
+                       cache=None,
+                       max_memory_files: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Потоковый вариант analyze_batch: читает файлы пачками по chunk_size
+        и отдает их с тегами, не дожидаясь конца обхода.
         
-        # Из пути (только последние 2 уровня)
-        path_parts = filepath.split(os.sep)[-3:]  # Берем только последние уровни
-        for part in path_parts:
-            if part and part not in {'.', '..'}:
-                part_tags = self._split_into_parts(part)
-                tags.extend([p.lower() for p in part_tags if len(p) > 2])
+        Частотность тегов накапливается по всем уже прочитанным файлам
+        (OnlineTagger). После исчерпания потока в self.last_corrections
+        лежат поправки для файлов, чьи теги изменились по итоговой
+        частотности, а в self.last_stats - статистика как у analyze_batch.
         
-        # Из расширения (только если не слишком распространенное)
-        ext = os.path.splitext(filename)[1].lower()
-        if ext and ext not in {'.txt', '.log', '.tmp'}:
-            tags.append(f"расширение{ext}")
+        cache: ScanCache - сырые теги неизмененных файлов не извлекаются заново
+        max_memory_files: сколько записей для пересчета держать в памяти,
+            остальные - во временной базе (см. OnlineTagger)
+        """
+        # online_tagger сам импортирует select_tags из этого модуля
+        from model.online_tagger import OnlineTagger
         
-        return tags
+        self.last_corrections = []
+        tagger = OnlineTagger(self, max_exact_tokens=max_exact_tokens, cache=cache,
+                              max_memory_files=max_memory_files)
+        try:
+            files = iter(files)
+            while True:
+                chunk = list(islice(files, chunk_size))
+                if not chunk:
+                    break
+                yield from tagger.feed(chunk)
+            
+            self.last_corrections, self.last_stats = tagger.finalize()
+        finally:
+            tagger.close()
+    
+    def _extract_raw_tags(self, filename: str, filepath: str) -> List[str]:
+        """Извлекает сырые теги (старая логика, но улучшенная)"""
+        return self.tokenizer.extract(filename, filepath)
     
     def _split_into_parts(self, text: str) -> List[str]:
         """Умное разделение текста на части"""
-        if not text:
-            return []
-        
-        # Заменяем разделители
-        for sep in ['_', '-', '.', ' ', ';', ',']:
-            text = text.replace(sep, '|')
-        
-        parts = [p.strip() for p in text.split('|') if p.strip()]
-        
-        # Фильтруем
-        filtered = []
-        for part in parts:
-            part_lower = part.lower()
-            if (len(part) > 2 and 
-                part_lower not in self.stop_words and
-                not part.isdigit() and  # Цифры обрабатываем отдельно
-                not re.match(r'^\d+$', part)):
-                filtered.append(part)
-        
-        return filtered
+        return self.tokenizer.split(text)
     
     def _categorize_tag(self, tag: str) -> str:
-        """Определяет категорию для редкого тега"""
-        for category, pattern in self.category_patterns.items():
-            if re.search(pattern, tag, re.IGNORECASE):
-                return category
-        
-        # Проверяем по словарю
-        category_keywords = {
-            'человек': ['иванов', 'петров', 'сидоров', 'васильев'],
-            'проект': ['проект', 'project', 'программа'],
-            'клиент': ['клиент', 'customer', 'заказчик'],
-            'отчет': ['отчет', 'отчёт', 'report'],
-            'договор': ['договор', 'контракт', 'соглашение'],
-        }
-        
-        for category, keywords in category_keywords.items():
-            if any(keyword in tag.lower() for keyword in keywords):
-                return f"{category}_разное"
-        
-        return ""
+        """Определяет категорию для редкого тега (с кэшем по уникальным тегам)"""
+        return self._categorize_cached(tag)
     
-    def _apply_smart_tags(self, file_data: Dict, smart_tags_info: Dict) -> Dict:
-        """Применяет умные теги к конкретному файлу"""
-        raw_tags = self._extract_raw_tags(
-            file_data['filename'], 
-            file_data['relative_path']
-        )
-        
-        final_tags = []
-        categories_used = set()
-        
-        for raw_tag in raw_tags:
-            # Если тег частый - добавляем
-            if raw_tag in smart_tags_info and smart_tags_info[raw_tag]['type'] == 'common':
-                final_tags.append(raw_tag)
-            
-            # Если тег редкий - проверяем категорию
-            else:
-                category = self._categorize_tag(raw_tag)
-                if category and category not in categories_used:
-                    final_tags.append(category)
-                    categories_used.add(category)
-        
-        # Добавляем тег "прочее" если мало тегов
-        if len(final_tags) < 2 and raw_tags:
-            final_tags.append("прочее")
+    def _apply_smart_tags(self, file_data: Dict, token_ids: List[int],
+                          resolved: List[str], common: List[bool]) -> Dict:
+        """
+        Применяет умные теги к конкретному файлу.
+        resolved[id] - итоговый тег для сырого тега id (сам тег, категория или ''),
+        common[id] - частый ли это тег
+        """
+        final_tags = _select_resolved(token_ids, resolved, common)
         
         # Обновляем данные файла
         file_data['tags'] = final_tags
-        file_data['raw_tags_count'] = len(raw_tags)
+        file_data['raw_tags_count'] = len(token_ids)
         file_data['smart_tags_count'] = len(final_tags)
         
         return file_data
     
+    @property
+    def history(self):
+        """TagHistoryStore (создается при первом обращении: открытие базы и перенос JSON)"""
+        if self._history is None:
+            from model.tag_history import TagHistoryStore
+            self._history = TagHistoryStore(self.history_db, legacy_json=self.history_file)
+        return self._history
+    
     def _update_history(self, files_data: List[Dict]):
-        """Обновляет историю тегов**"""
-        self.tag_history['total_files'] += len(files_data)
-        
+        """Добавляет теги пакета в историю (одна транзакция на пакет)"""
+        tag_counts = Counter()
+        examples = {}
         for file_data in files_data:
             for tag in file_data.get('tags', []):
-                if tag not in self.tag_history['tag_counts']:
-                    self.tag_history['tag_counts'][tag] = 0
-                    self.tag_history['file_examples'][tag] = file_data['filename']
-                self.tag_history['tag_counts'][tag] += 1
+                tag_counts[tag] += 1
+                examples.setdefault(tag, file_data['filename'])
         
-        self._save_history()
\ No newline at end of file
+        import sqlite3
+        try:
+            self.history.record(tag_counts, examples, len(files_data))
+        except sqlite3.Error:
+            pass  # история - вспомогательные данные, разметку не прерываем
+    
+    def _correct_history(self, removed: Counter, added: Counter):
+        """Исправляет счетчики истории после переразметки файлов"""
+        delta = Counter(added)
+        delta.subtract(removed)
+        import sqlite3
+        try:
+            self.history.adjust(delta)
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,153 @@
+"""
+МОДЕЛЬ: Хранилище истории тегов
+SQLite вместо перезаписи tag_history.json после каждого пакета
+"""
+
+import os
+import json
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from config import DATA_DIR, ensure_directories
+
+
+class TagHistoryStore:
+    """
+    История тегов: сколько раз каждый тег присваивался и пример файла.
+
+    Обновления - это инкременты внутри одной транзакции (UPSERT), а не
+    чтение-изменение-запись всего файла, поэтому несколько анализаторов
+    могут писать одновременно: SQLite сериализует транзакции, а WAL
+    не блокирует читателей.
+    """
+
+    def __init__(self, db_path: Union[str, Path, None] = None,
+                 legacy_json: Union[str, Path, None] = None):
+        """
+        db_path: файл базы (по умолчанию DATA_DIR/tag_history.sqlite)
+        legacy_json: старый tag_history.json - импортируется один раз
+        """
+        if db_path is None:
+            ensure_directories()
+        self.db_path = str(db_path or DATA_DIR / "tag_history.sqlite")
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS tags (
+                tag TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0,
+                example TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_tags_count ON tags(count DESC);
+        """)
+
+        if legacy_json:
+            self.migrate_json(legacy_json)
+
+    def record(self, tag_counts: Counter, examples: Dict[str, str], files: int):
+        """Атомарно добавляет теги пакета файлов"""
+        with self._transaction():
+            self.conn.executemany(
+                "INSERT INTO tags (tag, count, example) VALUES (?, ?, ?) "
+                "ON CONFLICT(tag) DO UPDATE SET count = count + excluded.count",
+                ((tag, count, examples.get(tag, '')) for tag, count in tag_counts.items())
+            )
+            self._add_total_files(files)
+
+    def adjust(self, delta: Counter):
+        """Атомарно корректирует счетчики (дельта может быть отрицательной)"""
+        with self._transaction():
+            self.conn.executemany(
+                "INSERT INTO tags (tag, count, example) VALUES (?, MAX(?, 0), '') "
+                "ON CONFLICT(tag) DO UPDATE SET count = MAX(count + ?, 0)",
+                ((tag, change, change) for tag, change in delta.items() if change)
+            )
+
+    def total_files(self) -> int:
+        """Сколько файлов размечено за все время"""
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'total_files'"
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def count(self, tag: str) -> int:
+        """Сколько раз присваивался тег"""
+        row = self.conn.execute(
+            "SELECT count FROM tags WHERE tag = ?", (tag,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def top(self, n: int = 10) -> List[Tuple[str, int, str]]:
+        """Самые частые теги: (тег, количество, пример файла)"""
+        return self.conn.execute(
+            "SELECT tag, count, example FROM tags ORDER BY count DESC LIMIT ?", (n,)
+        ).fetchall()
+
+    def migrate_json(self, json_path: Union[str, Path]) -> bool:
+        """
+        Импортирует старый tag_history.json.
+        Каждый файл импортируется один раз (путь запоминается в meta).
+        """
+        json_path = os.path.abspath(json_path)
+        if not os.path.exists(json_path):
+            return False
+
+        key = f"migrated:{json_path}"
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return False
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        with self._transaction():
+            # Повторная проверка внутри транзакции - на случай параллельного запуска
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return False
+            examples = history.get('file_examples', {})
+            self.conn.executemany(
+                "INSERT INTO tags (tag, count, example) VALUES (?, ?, ?) "
+                "ON CONFLICT(tag) DO UPDATE SET count = count + excluded.count",
+                ((tag, count, examples.get(tag, ''))
+                 for tag, count in history.get('tag_counts', {}).items())
+            )
+            self._add_total_files(history.get('total_files', 0))
+            self.conn.execute("INSERT INTO meta (key, value) VALUES (?, '1')", (key,))
+        return True
+
+    def _add_total_files(self, files: int):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('total_files', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value",
+            (files,)
+        )
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    def close(self):
+        self.conn.close()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK: блокировка на запись берется сразу"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
@@ -0,0 +1,129 @@
+"""
+Тесты SmartTagEngine: параллельная и потоковая разметка должны давать
+те же теги и статистику, что последовательный analyze_batch
+"""
+
+import copy
+import os
+
+import pytest
+
+from model.tag_engine import SmartTagEngine
+
+
+def make_files(count):
+    """
+    Детерминированный пакет: частые теги, редкие с категориями (включая
+    теги, подходящие под несколько категорий) и теги, впервые
+    появляющиеся во второй половине пакета - чтобы порядок частей важен
+    """
+    rare = ["смирнов", "подписан+2020", "отчет&проект", "черновик", "квартал",
+            "№12345", "заказчик", "соглашение", "петровский", "приказ"]
+    files = []
+    for i in range(count):
+        parts = ["отчет" if i % 3 else "сводка", rare[i % len(rare)]]
+        if i >= count // 2:
+            # Одинаковые счетчики: порядок задает первое появление
+            parts.append("бета" if i % 2 else "альфа")
+        folder = os.path.join(f"отдел{i % 4}", f"папка{i % 7}")
+        filename = "_".join(parts) + (".docx" if i % 5 else ".pdf")
+        files.append({
+            'filename': filename,
+            'relative_path': os.path.join(folder, filename),
+        })
+    return files
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = SmartTagEngine(history_file="", history_db=str(tmp_path / "history.sqlite"))
+    yield engine
+    if engine._history is not None:
+        engine._history.close()
+
+
+def tags_of(files):
+    return [file_data['tags'] for file_data in files]
+
+
+def test_parallel_matches_serial(engine, monkeypatch):
+    files = make_files(240)
+    serial_files, serial_stats = engine.analyze_batch(copy.deepcopy(files), workers=1)
+
+    monkeypatch.setattr(SmartTagEngine, "PARALLEL_MIN_FILES", 10)
+    parallel_files, parallel_stats = engine.analyze_batch(copy.deepcopy(files), workers=2)
+
+    assert tags_of(parallel_files) == tags_of(serial_files)
+    assert [f['raw_tags_count'] for f in parallel_files] == [f['raw_tags_count'] for f in serial_files]
+    assert parallel_stats == serial_stats
+    # Порядок статистики тоже совпадает (словари сравниваются без порядка)
+    assert list(parallel_stats['tag_info']) == list(serial_stats['tag_info'])
+
+
+def test_parallel_uneven_shards(engine, monkeypatch):
+    files = make_files(101)
+    serial_files, serial_stats = engine.analyze_batch(copy.deepcopy(files), workers=1)
+
+    monkeypatch.setattr(SmartTagEngine, "PARALLEL_MIN_FILES", 10)
+    parallel_files, parallel_stats = engine.analyze_batch(copy.deepcopy(files), workers=3)
+
+    assert tags_of(parallel_files) == tags_of(serial_files)
+    assert list(parallel_stats['tag_info'].items()) == list(serial_stats['tag_info'].items())
+
+
+def test_tie_order(engine, monkeypatch):
+    # У "бета" и "альфа" равные счетчики; "бета" встречается первой,
+    # и только во второй части пакета. Имена без расширений - без лишних тегов
+    files = [{'filename': name, 'relative_path': name} for name in
+             ["гамма_дельта", "гамма_дельта", "бета_альфа", "альфа_бета"]]
+    monkeypatch.setattr(SmartTagEngine, "PARALLEL_MIN_FILES", 2)
+
+    for workers in (1, 2):
+        result, stats = engine.analyze_batch(copy.deepcopy(files), workers=workers)
+        assert list(stats['tag_info']) == ["гамма", "дельта", "бета", "альфа"]
+        assert result[2]['tags'] == ["бета", "альфа", "бета", "альфа"]
+        assert result[3]['tags'] == ["альфа", "бета", "альфа", "бета"]
+
+
+def test_category_priority(engine):
+    categorize = engine.tokenizer.categorize
+    # Самое левое совпадение - статус, но год раньше в списке категорий
+    assert categorize("подписан+2020") == "год_xxxx"
+    # Шаблоны важнее ключевых слов
+    assert categorize("проектная") == "человек_фамилия"
+    # Среди ключевых слов - тоже по порядку категорий, а не по позиции
+    assert categorize("отчет&проект") == "проект_разное"
+    assert categorize("приказ") == ""
+
+
+def test_category_priority_in_batch(engine, monkeypatch):
+    # Редкие теги разных категорий в одном файле: каждая категория - один раз,
+    # в порядке сырых тегов
+    files = [{'filename': f"общий_{i}", 'relative_path': f"общий_{i}"}
+             for i in range(30)]
+    files.append({'filename': "подписан+2020_смирнов_отчет&проект",
+                  'relative_path': "подписан+2020_смирнов_отчет&проект"})
+    monkeypatch.setattr(SmartTagEngine, "PARALLEL_MIN_FILES", 2)
+
+    for workers in (1, 2):
+        result, stats = engine.analyze_batch(copy.deepcopy(files), workers=workers)
+        assert result[-1]['tags'] == ["год_xxxx", "человек_фамилия", "проект_разное"]
+        assert stats['tag_info']['год_xxxx']['examples'] == ["подписан+2020"]
+        assert stats['tag_info']['год_xxxx']['count'] == 2
+
+
+@pytest.mark.parametrize("max_memory_files", [None, 16])
+def test_stream_with_corrections_matches_batch(engine, max_memory_files):
+    files = make_files(240)
+    batch_files, batch_stats = engine.analyze_batch(copy.deepcopy(files))
+
+    streamed = list(engine.analyze_stream(copy.deepcopy(files), chunk_size=32,
+                                          max_memory_files=max_memory_files))
+    tags = tags_of(streamed)
+    for index, old_tags, new_tags in engine.last_corrections:
+        assert tags[index] == old_tags
+        tags[index] = new_tags
+
+    assert engine.last_corrections
+    assert tags == tags_of(batch_files)
+    assert engine.last_stats == batch_stats
@@ -5,11 +5,13 @@
 
 import os
 import re
-import hashlib
+import stat
 from datetime import datetime
 from typing import List, Union, Optional
 from pathlib import Path
 
+from config import TAG_SETTINGS
+
 
 def safe_path(path: Union[str, Path]) -> Path:
     """Безопасно создает Path объект"""
@@ -30,6 +32,51 @@ def format_size(size_bytes):
     return f"{size_bytes:.2f} {size_names[i]}"
 
 
+def parse_size(text: str) -> int:
+    """Размер из строки: '500', '50MB', '1.5 GB' -> байты"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?B?)\s*', text.upper())
+    if not match:
+        raise ValueError(f"Неверный размер: {text}")
+    number, unit = match.groups()
+    power = "BKMGT".index(unit[0]) if unit else 0
+    return int(float(number) * 1024 ** power)
+
+
+def match_file_mode(tmp_path: str, target_path: str):
+    """
+    Права временного файла перед заменой им target_path: mkstemp создает
+    файл с 0600, а замена сохраняет права. Берутся права заменяемого файла,
+    для нового - как у обычного open(): 0666 без umask.
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(target_path).st_mode)
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    os.chmod(tmp_path, mode)
+
+
+def unique_roots(roots: List[str]) -> List[str]:
+    """
+    Абсолютные пути корней без повторов: /data, /data/, ./data и ссылка
+    на /data - один корень. Порядок - по первому упоминанию.
+    """
+    result = []
+    seen = set()
+    for root in roots:
+        key = os.path.normcase(os.path.realpath(root))
+        if key not in seen:
+            seen.add(key)
+            result.append(os.path.abspath(root))
+    return result
+
+
+def get_category(extension: str) -> str:
+    """Определяет категорию файла по расширению"""
+    return TAG_SETTINGS["common_extensions"].get(extension.lower(), "другое")
+
+
 def format_date(timestamp: float) -> str:
     """Форматирует дату"""
     return datetime.fromtimestamp(timestamp).strftime("%d.%m.%Y %H:%M:%S")
@@ -38,15 +85,12 @@ def format_date(timestamp: float) -> str:
 def calculate_hash(filepath: Union[str, Path], 
                   algorithm: str = "md5") -> str:
     """Вычисляет хеш файла"""
-    hash_func = getattr(hashlib, algorithm, hashlib.md5)()
+    from model.hash_engine import hash_file, HASH_ERROR
     
     try:
-        with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_func.update(chunk)
-        return hash_func.hexdigest()
+        return hash_file(str(filepath), algorithm)
     except Exception:
-        return "ОШИБКА"
+        return HASH_ERROR
 
 
 def clean_filename(filename: str) -> str:
@@ -98,6 +142,33 @@ def is_valid_file(filepath: Union[str, Path],
     return True
 
 
+class ColumnWidthTracker:
+    """
+    Ширина колонок как нарастающий максимум длины значений.
+    Обновляется по одной строке за раз, итог применяется один раз при сохранении.
+    """
+    
+    def __init__(self, columns: int, max_width: int = 50, padding: int = 2):
+        self.max_width = max_width
+        self.padding = padding
+        self.max_lengths = [0] * columns
+    
+    def update(self, values) -> None:
+        """Учитывает значения одной строки"""
+        lengths = self.max_lengths
+        for i, value in enumerate(values):
+            if value is None:
+                continue
+            length = len(value) if isinstance(value, str) else len(str(value))
+            if length > lengths[i]:
+                lengths[i] = length
+    
+    def widths(self) -> List[int]:
+        """Итоговая ширина каждой колонки"""
+        return [min(length + self.padding, self.max_width)
+                for length in self.max_lengths]
+
+
 def timer(func):
     """Декоратор для измерения времени выполнения"""
     import time
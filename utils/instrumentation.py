@@ -0,0 +1,189 @@
+"""
+ИНСТРУМЕНТИРОВАНИЕ
+Время по этапам, счетчики и выгрузка метрик запуска в JSON
+"""
+
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+from config import LOG_DIR
+
+
+class Instrumentation:
+    """
+    Метрики одного запуска.
+
+    Время этапов - собственное: этапы работают конвейером (разметка
+    тянет файлы из обхода), поэтому вложенный этап приостанавливает
+    внешний, и время обхода не попадает в разметку.
+    """
+
+    def __init__(self, profile: bool = False, trace_memory: bool = False):
+        """
+        profile: собрать профиль cProfile (сохраняется рядом с метриками)
+        trace_memory: отслеживать выделения памяти через tracemalloc
+        """
+        self.seconds = Counter()
+        self.calls = Counter()
+        self.counters = Counter()
+        self.info = {}
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self._stack = []
+        self._mark = None
+        self._profiler = None
+        self._started = None
+        self._wall = 0.0
+        self._memory = None
+
+    # --- Запуск -----------------------------------------------------------
+
+    def start(self):
+        """Начало запуска: включает профилировщики, если заданы"""
+        self._started = time.perf_counter()
+        # Профилировщики импортируются, только если включены
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+        if self.profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        """Конец запуска: выключает профилировщики"""
+        if self._profiler:
+            self._profiler.disable()
+        if self.trace_memory:
+            self._stop_tracemalloc()
+        if self._started is not None:
+            self._wall = time.perf_counter() - self._started
+
+    def _stop_tracemalloc(self):
+        """Пик памяти и главные места выделений"""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+        tracemalloc.stop()
+        self._memory = {
+            'current_mb': round(current / 2 ** 20, 2),
+            'peak_mb': round(peak / 2 ** 20, 2),
+            'top': [{'location': str(stat.traceback), 'mb': round(stat.size / 2 ** 20, 3),
+                     'blocks': stat.count} for stat in top],
+        }
+
+    # --- Этапы ------------------------------------------------------------
+
+    def _enter(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            self.seconds[self._stack[-1]] += now - self._mark
+        self._stack.append(name)
+        self._mark = now
+
+    def _exit(self):
+        now = time.perf_counter()
+        self.seconds[self._stack.pop()] += now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def stage(self, name: str):
+        """Учитывает время блока в этапе name"""
+        self._enter(name)
+        self.calls[name] += 1
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """
+        Обертка итератора: время получения каждого элемента идет в этап name.
+        Для ленивых этапов конвейера (обход, разметка).
+        """
+        iterator = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            self.calls[name] += 1
+            yield item
+
+    def add_time(self, name: str, seconds: float, calls: int = 0,
+                 moved_from: Optional[str] = None):
+        """
+        Добавляет время, измеренное снаружи (например, stat в обходе).
+        moved_from: этап, в который это время уже вошло - из него вычитается
+        """
+        self.seconds[name] += seconds
+        self.calls[name] += calls
+        if moved_from:
+            self.seconds[moved_from] -= seconds
+
+    def count(self, name: str, value: int = 1):
+        """Увеличивает счетчик name"""
+        self.counters[name] += value
+
+    # --- Итог -------------------------------------------------------------
+
+    def to_dict(self) -> Dict:
+        """Метрики в виде словаря для JSON"""
+        stages = {
+            name: {'seconds': round(seconds, 4), 'calls': self.calls[name]}
+            for name, seconds in self.seconds.items()
+        }
+        metrics = {
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'wall_seconds': round(self._wall, 4),
+            'stages': stages,
+            'counters': dict(self.counters),
+        }
+        metrics.update(self.info)
+        if self._memory:
+            metrics['memory'] = self._memory
+        return metrics
+
+    def summary(self) -> str:
+        """Короткая текстовая сводка по этапам"""
+        total = sum(self.seconds.values()) or 1e-9
+        lines = [f"{'stage':<12} {'seconds':>9} {'share':>7}"]
+        for name, seconds in self.seconds.most_common():
+            lines.append(f"{name:<12} {seconds:>9.3f} {seconds / total:>7.1%}")
+        return "\n".join(lines)
+
+    def dump(self, name: str = "run", directory: Union[str, Path, None] = None) -> Path:
+        """
+        Записывает метрики в <directory>/metrics_<name>_<время>.json
+        (по умолчанию LOG_DIR); профиль cProfile - в .prof рядом.
+        Возвращает путь к JSON.
+        """
+        directory = Path(directory or LOG_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = directory / f"metrics_{name}_{stamp}.json"
+
+        metrics = self.to_dict()
+        if self._profiler:
+            import io
+            import pstats
+
+            profile_path = path.with_suffix(".prof")
+            self._profiler.dump_stats(str(profile_path))
+            stream = io.StringIO()
+            pstats.Stats(self._profiler, stream=stream).sort_stats("cumulative").print_stats(15)
+            metrics['profile'] = {'file': str(profile_path), 'top': stream.getvalue()}
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, ensure_ascii=False, indent=2, default=str)
+        return path
@@ -47,6 +47,14 @@ class CLIView:
         """Показывает сообщение об ошибке"""
         print(f"\n❌ Ошибка: {error_message}")
     
+    def show_message(self, message: str):
+        """Показывает информационное сообщение"""
+        print(message)
+    
+    def show_warning(self, message: str):
+        """Показывает предупреждение"""
+        print(f"⚠️  {message}")
+    
     def show_success(self, message: str):
         """Показывает сообщение об успехе"""
         print(f"\n✅ {message}")
@@ -104,27 +112,106 @@ class CLIView:
                     examples = stats['tag_info'][tag].get('examples', [])
                     example_str = ", ".join(examples[:3]) + ("..." if len(examples) > 3 else "")
                     print(f"    {tag:20} {count:3} файлов ← {example_str}")
-    def get_analysis_directory(self):
-        """Получение директории для анализа от пользователя"""
+    def show_query_results(self, results: List[Dict]):
+        """Показывает найденные в базе каталога файлы"""
+        if not results:
+            print("Ничего не найдено")
+            return
+        
+        for record in results:
+            size_mb = record['size'] / (1024 * 1024)
+            print(f"{size_mb:10.2f} МБ  {os.path.join(record['root'], record['path'])}")
+            if record['tags']:
+                print(f"{'':15}Теги: {', '.join(record['tags'])}")
+        print(f"\nНайдено файлов: {len(results)}")
+    
+    def get_query_filters(self, argv: List[str]) -> Dict:
+        """Условия поиска по базе каталога из аргументов 'main.py query ...'"""
+        from utils.helpers import parse_size
+        
+        parser = argparse.ArgumentParser(prog='main.py query',
+                                         description='Search the catalog database')
+        parser.add_argument('--ext', help='Extension, e.g. .pdf')
+        parser.add_argument('--min-size', type=parse_size, help='Minimum size, e.g. 50MB')
+        parser.add_argument('--max-size', type=parse_size, help='Maximum size')
+        parser.add_argument('--tag', action='append', help='Required tag (can be repeated)')
+        parser.add_argument('--modified-after', type=datetime.fromisoformat,
+                            help='Modified on or after date (YYYY-MM-DD)')
+        parser.add_argument('--modified-before', type=datetime.fromisoformat,
+                            help='Modified before date (YYYY-MM-DD)')
+        parser.add_argument('--hash', help='File hash')
+        parser.add_argument('--root', help='Scanned directory')
+        parser.add_argument('--name', help="Name pattern, e.g. '%%отчет%%'")
+        parser.add_argument('--limit', type=int, default=100, help='Max results (0 = all)')
+        args = parser.parse_args(argv)
+        
+        return {
+            'extension': args.ext,
+            'min_size': args.min_size,
+            'max_size': args.max_size,
+            'tags': args.tag,
+            'modified_after': args.modified_after,
+            'modified_before': args.modified_before,
+            'file_hash': args.hash,
+            'root': args.root,
+            'name_like': args.name,
+            'limit': args.limit,
+        }
+    
+    def get_analysis_options(self, argv: List[str] = None) -> Dict:
+        """
+        Параметры анализа из командной строки (без вопросов пользователю -
+        можно запускать по расписанию). Несколько папок сканируются
+        одновременно в один общий отчет.
+        """
         parser = argparse.ArgumentParser(description='File Analyzer Tool')
         parser.add_argument(
-            'directory',
-            nargs='?',
-            default='.',
-            help='Directory to analyze (default: current directory)'
+            'directories',
+            nargs='*',
+            default=['.'],
+            metavar='directory',
+            help='Directories to analyze (default: current directory); '
+                 'several directories are scanned concurrently into one report'
         )
         parser.add_argument(
             '--output',
             '-o',
-            help='Custom output directory for Excel report'
+            help='Output directory for the report, or report file '
+                 '(.xlsx, .csv, .jsonl, .parquet - format is taken from the extension)'
         )
+        parser.add_argument('--format', choices=['xlsx', 'csv', 'jsonl', 'parquet'],
+                            help='Report format (default: from --output or config)')
+        parser.add_argument('--workers', '-j', type=int,
+                            help='Directories scanned at once (default: root_workers from config)')
+        parser.add_argument('--async', dest='async_scan', action='store_true', default=None,
+                            help='Asynchronous walk for network shares (SMB/NFS); '
+                                 'a scan stopped by the time limit is not resumed')
+        parser.add_argument('--persist', action='store_true', default=None,
+                            help='Save results to the catalog database (main.py query)')
+        parser.add_argument('--duplicates', dest='find_duplicates', action='store_true',
+                            default=None,
+                            help='Fill the Duplicate Group column (collects the whole scan '
+                                 'before tagging, memory grows with the tree)')
         
-        args = parser.parse_args()
+        args = parser.parse_args(argv)
         
-        # Если указана папка для вывода, проверяем ее существование
+        # Если указана папка для вывода (или папка файла отчета), проверяем ее существование
         if args.output:
-            if not os.path.exists(args.output):
-                os.makedirs(args.output, exist_ok=True)
-                self.show_message(f"Created output directory: {args.output}")
+            from model.report_writer import report_file_format
+            
+            output_dir = args.output
+            if report_file_format(args.output):
+                output_dir = os.path.dirname(args.output)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir, exist_ok=True)
+                self.show_message(f"Created output directory: {output_dir}")
         
-        return args.directory, args.output
\ No newline at end of file
+        return {
+            'directories': args.directories,
+            'output': args.output,
+            'output_format': args.format,
+            'workers': args.workers,
+            'async_scan': args.async_scan,
+            'persist': args.persist,
+            'find_duplicates': args.find_duplicates,
+        }
\ No newline at end of file